@@ -1,6 +1,13 @@
+__all__ = (
+    'router',
+    'health_router',
+)
+
 from fastapi import APIRouter
 
 from .auth import router as auth_routers
+from .batch import router as batch_routers
+from .health import router as health_router
 from .task import router as task_routers
 
 router = APIRouter(
@@ -8,3 +15,4 @@ router = APIRouter(
 )
 router.include_router(auth_routers)
 router.include_router(task_routers)
+router.include_router(batch_routers)
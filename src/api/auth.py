@@ -1,22 +1,31 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, status
 
 from services import AuthService, get_auth_service
+from utils import rate_limit
 from schemas import (
     RegistrationOutputSchema, RegistrationInputSchema, LoginInputSchema, VerifyInputSchema, TokenSchema,
-    LoginOutputSchema
+    LoginOutputSchema, AvailabilityOutputSchema
 )
 
 router = APIRouter(tags=['Аутентификация и регистрация'])
 
+registration_ip_rate_limit = rate_limit('registration', '10/minute')
+availability_ip_rate_limit = rate_limit('registration_availability', '60/minute')
+login_ip_rate_limit = rate_limit('login', '30/minute')
+login_identity_rate_limit = rate_limit('login_identity', '10/minute', identity='body', body_field='login')
+verify_otp_ip_rate_limit = rate_limit('verify_otp', '30/minute')
+verify_otp_identity_rate_limit = rate_limit('verify_otp_identity', '5/minute', identity='body', body_field='user_id')
+
 
 @router.post(
     '/registration',
     description='Регистрация',
     summary='Регистрация',
     response_model=RegistrationOutputSchema,
-    status_code=status.HTTP_201_CREATED
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(registration_ip_rate_limit)],
 )
 async def register(
     user: RegistrationInputSchema,
@@ -27,19 +36,40 @@ async def register(
     return result
 
 
+@router.get(
+    '/registration/availability',
+    description='Проверка, свободны ли логин и email, до регистрации',
+    summary='Свободны ли логин и email',
+    response_model=AvailabilityOutputSchema,
+    response_model_exclude_none=True,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(availability_ip_rate_limit)],
+)
+async def check_availability(
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    username: Annotated[Optional[str], Query(description='Логин')] = None,
+    email: Annotated[Optional[str], Query(description='Email')] = None,
+):
+    """Проверка, свободны ли логин и email."""
+    result = await auth_service.check_availability(username, email)
+    return result
+
+
 @router.post(
     '/login',
     description='Аутентификация',
     summary='Вход',
     status_code=status.HTTP_200_OK,
-    response_model=LoginOutputSchema
+    response_model=LoginOutputSchema,
+    dependencies=[Depends(login_ip_rate_limit), Depends(login_identity_rate_limit)],
 )
 async def login(
     user: LoginInputSchema,
-    auth_service: Annotated[AuthService, Depends(get_auth_service)]
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    background_tasks: BackgroundTasks,
 ):
     """Аутентификация пользователя."""
-    result = await auth_service.login(user)
+    result = await auth_service.login(user, background_tasks)
     return result
 
 
@@ -49,6 +79,7 @@ async def login(
     summary='Подтверждение из письма',
     response_model=TokenSchema,
     status_code=status.HTTP_200_OK,
+    dependencies=[Depends(verify_otp_ip_rate_limit), Depends(verify_otp_identity_rate_limit)],
 )
 async def verify_otp(
     user: VerifyInputSchema,
@@ -0,0 +1,35 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status, Security
+from fastapi.security import APIKeyHeader
+
+from models import User
+from utils import IdempotentRoute, get_current_user, rate_limit
+from schemas import BatchInputSchema, BatchOutputSchema
+from services import BatchService, get_batch_service
+
+
+api_key_header = APIKeyHeader(name='Authorization')
+
+router = APIRouter(tags=['Пакетные запросы'], route_class=IdempotentRoute)
+
+batch_rate_limit = rate_limit('batch', '30/minute', identity='user')
+
+
+@router.post(
+    '/batch',
+    description='Выполнение нескольких операций с карточками (GET/PUT/PATCH/DELETE /tasks/{task_id}, '
+                'POST /tasks) за один запрос в одной транзакции. Результаты возвращаются в порядке операций',
+    summary='Пакетный запрос',
+    status_code=status.HTTP_200_OK,
+    response_model=BatchOutputSchema,
+    dependencies=[Depends(batch_rate_limit)],
+)
+async def execute_batch(
+    batch_data: BatchInputSchema,
+    batch_service: Annotated[BatchService, Depends(get_batch_service)],
+    current_user: User = Depends(get_current_user),
+    api_key: str = Security(api_key_header),
+):
+    results = await batch_service.execute(current_user, batch_data.operations)
+    return {'results': results}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Response, status
+
+from db.warmup import databases_ready
+from utils.redis_client import get_broker_redis
+from utils.task_metrics import PROMETHEUS_MEDIA_TYPE, collect_task_metrics
+
+
+router = APIRouter(tags=['Состояние сервиса'])
+
+
+@router.get(
+    '/healthz',
+    description='Процесс жив и обрабатывает запросы',
+    summary='Проверка живости',
+    status_code=status.HTTP_200_OK,
+)
+async def healthz():
+    return {'status': 'ok'}
+
+
+@router.get(
+    '/readyz',
+    description='Пулы соединений с БД открыты и не исчерпаны (запросы к БД не выполняются)',
+    summary='Проверка готовности',
+    status_code=status.HTTP_200_OK,
+)
+async def readyz(response: Response):
+    if not databases_ready():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {'status': 'unavailable'}
+    return {'status': 'ok'}
+
+
+@router.get(
+    '/metrics',
+    description=(
+        'Метрики очередей Celery в формате Prometheus: длина очереди, количество задач, '
+        'суммарное ожидание в очереди и время выполнения'
+    ),
+    summary='Метрики очередей задач',
+    status_code=status.HTTP_200_OK,
+)
+async def metrics():
+    return Response(content=await collect_task_metrics(get_broker_redis()), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -1,22 +1,44 @@
-from typing import Annotated, List
+from datetime import date
+from typing import Annotated, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status, Path, Security
+from fastapi import APIRouter, Depends, Header, Request, Response, status, Path, Query, Security
+from fastapi.responses import StreamingResponse
 from fastapi.security import APIKeyHeader
 
 from models import User
-from utils import get_current_user
+from config import app_settings
+from utils import IdempotentRoute, get_current_user, make_etag, negotiate_media_type, rate_limit, render_response
 from schemas import (
     TaskCreateOutputSchema, TaskCreateInputSchema, TaskListOutputSchema, TaskRetrieveOutputSchema,
-    TaskUpdateOutputSchema, TaskUpdateInputSchema
+    TaskUpdateOutputSchema, TaskUpdateInputSchema, TaskPatchInputSchema, TaskChangesOutputSchema,
+    TaskStatsOutputSchema, TaskActivityOutputSchema,
 )
-from services import TaskService, get_task_service
+from services import TaskService, get_task_service, task_event_stream
+from utils.responses import CBOR_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from utils.task_fields import TASK_FIELDS, parse_task_fields, task_fields_schema
+from utils.task_ordering import TASK_ORDERINGS, parse_task_ordering
 from paginators import TaskPaginator
 
 
 api_key_header = APIKeyHeader(name='Authorization')
 
-router = APIRouter(tags=['TODO карточки'])
+router = APIRouter(tags=['TODO карточки'], route_class=IdempotentRoute)
+
+task_write_rate_limit = rate_limit('task_write', '120/minute', identity='user')
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+BINARY_RESPONSES = {status.HTTP_200_OK: {'content': {MSGPACK_MEDIA_TYPE: {}, CBOR_MEDIA_TYPE: {}}}}
+
+FieldsQuery = Annotated[Optional[str], Query(
+    description=f'Поля ответа через запятую (остальные колонки не читаются из БД). Допустимые: {", ".join(TASK_FIELDS)}'
+)]
+
+AcceptHeader = Annotated[Optional[str], Header(
+    description='Формат ответа: application/json (по умолчанию), application/msgpack или application/cbor. '
+                'В MessagePack и CBOR id передаются 16 байтами, даты - микросекундами от начала эпохи Unix'
+)]
 
 
 @router.post(
@@ -25,6 +47,7 @@ router = APIRouter(tags=['TODO карточки'])
     summary='Создание карточки задания',
     status_code=status.HTTP_201_CREATED,
     response_model=TaskCreateOutputSchema,
+    dependencies=[Depends(task_write_rate_limit)],
 )
 async def create_task(
     task_data: TaskCreateInputSchema,
@@ -38,35 +61,143 @@ async def create_task(
 
 @router.get(
     '/tasks',
-    description='Получение списка карточек',
+    description='Получение списка карточек. Если страница заполнена, заголовок X-Next-Cursor содержит '
+                'курсор следующей страницы для параметра cursor',
     summary='Получение списка карточек',
     status_code=status.HTTP_200_OK,
     response_model=List[TaskListOutputSchema],
+    responses=BINARY_RESPONSES,
 )
 async def get_user_tasks(
     task_service: Annotated[TaskService, Depends(get_task_service)],
+    response: Response,
     paginator: TaskPaginator = Depends(TaskPaginator),
+    ordering: Annotated[Optional[str], Query(
+        description=f'Сортировка, минус - по убыванию. Допустимые: {", ".join(TASK_ORDERINGS)}'
+    )] = None,
+    fields: FieldsQuery = None,
+    accept: AcceptHeader = None,
+    current_user: User = Depends(get_current_user),
+    api_key: str = Security(api_key_header),
+):
+    task_ordering = parse_task_ordering(ordering)
+    task_fields = parse_task_fields(fields)
+    media_type = negotiate_media_type(accept)
+    if app_settings.task_list_core_read:
+        rows, next_cursor = await task_service.get_task_rows_by_user(
+            current_user, paginator, task_ordering, task_fields
+        )
+        return render_response(rows, media_type, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+    result, next_cursor = await task_service.get_all_by_user(current_user, paginator, task_ordering, task_fields)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if media_type != JSON_MEDIA_TYPE or not task_fields.is_all:
+        schema = task_fields_schema(TaskListOutputSchema, task_fields)
+        content = [schema.model_validate(task).model_dump() for task in result]
+        return render_response(content, media_type, headers=headers)
+    response.headers.update({**headers, 'Vary': 'Accept'})
+    return result
+
+
+@router.get(
+    '/tasks/stats',
+    description='Количество всех, выполненных и невыполненных карточек',
+    summary='Статистика карточек',
+    status_code=status.HTTP_200_OK,
+    response_model=TaskStatsOutputSchema,
+)
+async def get_user_task_stats(
+    task_service: Annotated[TaskService, Depends(get_task_service)],
+    current_user: User = Depends(get_current_user),
+    api_key: str = Security(api_key_header),
+):
+    result = await task_service.get_stats(current_user)
+    return result
+
+
+@router.get(
+    '/tasks/activity',
+    description='Количество созданных и выполненных карточек по дням (UTC). Данные пересчитываются '
+                'в фоне, свежие изменения появляются с задержкой до нескольких минут',
+    summary='Активность по дням',
+    status_code=status.HTTP_200_OK,
+    response_model=List[TaskActivityOutputSchema],
+)
+async def get_user_task_activity(
+    task_service: Annotated[TaskService, Depends(get_task_service)],
+    date_from: Annotated[date, Query(alias='from', description='Первый день')],
+    date_to: Annotated[date, Query(alias='to', description='Последний день (включительно)')],
     current_user: User = Depends(get_current_user),
     api_key: str = Security(api_key_header),
 ):
-    result = await task_service.get_all_by_user(current_user, paginator, (('created_at', 'asc'), ))
+    result = await task_service.get_activity(current_user, date_from, date_to)
     return result
 
 
+@router.get(
+    '/tasks/changes',
+    description='Изменения карточек с момента токена синхронизации',
+    summary='Синхронизация изменений карточек',
+    status_code=status.HTTP_200_OK,
+    response_model=TaskChangesOutputSchema,
+)
+async def get_user_task_changes(
+    task_service: Annotated[TaskService, Depends(get_task_service)],
+    since: Annotated[Optional[str], Query(description='Токен синхронизации из прошлого ответа')] = None,
+    limit: Annotated[int, Query(description='Количество изменений', ge=1, le=1000)] = 500,
+    current_user: User = Depends(get_current_user),
+    api_key: str = Security(api_key_header),
+):
+    result = await task_service.get_changes(current_user, since, limit)
+    return result
+
+
+@router.get(
+    '/tasks/stream',
+    description='Поток изменений карточек пользователя (Server-Sent Events)',
+    summary='Поток изменений карточек',
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def stream_user_tasks(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    api_key: str = Security(api_key_header),
+):
+    return StreamingResponse(
+        task_event_stream(request, current_user.id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @router.get(
     '/tasks/{task_id}',
     description='Просмотр карточки',
     summary='Просмотр карточки',
     status_code=status.HTTP_200_OK,
-    response_model=TaskRetrieveOutputSchema
+    response_model=TaskRetrieveOutputSchema,
+    responses=BINARY_RESPONSES,
 )
 async def get_user_current_task(
     task_id: Annotated[UUID, Path(description='id карточки задания')],
     task_service: Annotated[TaskService, Depends(get_task_service)],
+    response: Response,
+    fields: FieldsQuery = None,
+    accept: AcceptHeader = None,
     current_user: User = Depends(get_current_user),
     api_key: str = Security(api_key_header),
 ):
-    result = await task_service.get_user_task_by_id(current_user, task_id)
+    task_fields = parse_task_fields(fields)
+    media_type = negotiate_media_type(accept)
+    if app_settings.task_retrieve_core_read:
+        row = await task_service.get_user_task_row_by_id(current_user, task_id, task_fields)
+        return render_response(task_fields.narrow(row), media_type, headers={'ETag': make_etag(row['version'])})
+    result = await task_service.get_user_task_by_id(current_user, task_id, task_fields)
+    headers = {'ETag': make_etag(result.version)}
+    if media_type != JSON_MEDIA_TYPE or not task_fields.is_all:
+        content = task_fields_schema(TaskRetrieveOutputSchema, task_fields).model_validate(result).model_dump()
+        return render_response(content, media_type, headers=headers)
+    response.headers.update({**headers, 'Vary': 'Accept'})
     return result
 
 
@@ -75,6 +206,7 @@ async def get_user_current_task(
     description='Удаление карточки задания',
     summary='Удаление карточки задания',
     status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(task_write_rate_limit)],
 )
 async def delete_current_task(
     task_id: Annotated[UUID, Path(description='id карточки задания')],
@@ -91,13 +223,39 @@ async def delete_current_task(
     summary='Обновление карточки задания',
     status_code=status.HTTP_200_OK,
     response_model=TaskUpdateOutputSchema,
+    dependencies=[Depends(task_write_rate_limit)],
 )
 async def update_current_task(
     task_data: TaskUpdateInputSchema,
     task_id: Annotated[UUID, Path(description='id карточки задания')],
     task_service: Annotated[TaskService, Depends(get_task_service)],
+    response: Response,
     current_user: User = Depends(get_current_user),
     api_key: str = Security(api_key_header),
 ):
     result = await task_service.update_current_task(current_user, task_id, task_data)
+    response.headers['ETag'] = make_etag(result.version)
+    return result
+
+
+@router.patch(
+    '/tasks/{task_id}',
+    description='Частичное обновление карточки задания. Заголовок If-Match с ETag карточки защищает '
+                'от перезаписи чужих изменений (412, если карточка уже изменилась)',
+    summary='Частичное обновление карточки задания',
+    status_code=status.HTTP_200_OK,
+    response_model=TaskUpdateOutputSchema,
+    dependencies=[Depends(task_write_rate_limit)],
+)
+async def patch_current_task(
+    task_data: TaskPatchInputSchema,
+    task_id: Annotated[UUID, Path(description='id карточки задания')],
+    task_service: Annotated[TaskService, Depends(get_task_service)],
+    response: Response,
+    if_match: Annotated[Optional[str], Header(description='ETag карточки из прошлого ответа')] = None,
+    current_user: User = Depends(get_current_user),
+    api_key: str = Security(api_key_header),
+):
+    result = await task_service.patch_current_task(current_user, task_id, task_data, if_match)
+    response.headers['ETag'] = make_etag(result.version)
     return result
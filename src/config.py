@@ -1,3 +1,6 @@
+import os
+from typing import Dict, Optional
+
 from dotenv import load_dotenv
 
 from pydantic import EmailStr
@@ -17,6 +20,13 @@ class DataBaseSettings(BaseSettings):
     user: str
     password: str
     test_db: str
+    shards: Dict[str, str] = {}
+    shard_virtual_nodes: int = 128
+    echo: bool = True
+    pool_connections: int = 100
+    pool_timeout: int = 30
+    pool_warmup: int = 2
+    statement_cache_size: int = 100
 
 
 class AppSettings(BaseSettings):
@@ -37,6 +47,57 @@ class AppSettings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
     test_base_url: str
+    redis_cache: Optional[str] = None
+    web_concurrency: Optional[int] = None
+    web_host: str = '0.0.0.0'
+    web_port: int = 8000
+    web_preload: bool = False
+    web_graceful_timeout: int = 30
+    forwarded_allow_ips: str = '127.0.0.1'
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = 'memory'
+    rate_limits: Dict[str, str] = {}
+    idempotency_backend: str = 'memory'
+    registration_filter_capacity: int = 1_000_000
+    registration_filter_error_rate: float = 0.001
+    registration_filter_refresh_seconds: int = 10
+    registration_filter_rebuild_seconds: int = 3600
+    idempotency_ttl: int = 86400
+    idempotency_lock_timeout: int = 30
+    task_list_core_read: bool = True
+    task_retrieve_core_read: bool = True
+    task_events_enabled: bool = True
+    task_group_commit: bool = False
+    task_group_commit_window_ms: float = 2.0
+    task_group_commit_max_size: int = 100
+    task_stats_batch_size: int = 500
+    task_activity_batch_size: int = 500
+    task_activity_max_days: int = 366
+    task_partitioning: bool = False
+    task_partitions_ahead: int = 3
+    task_archive_after_days: int = 0
+    task_archive_batch_size: int = 1000
+    trace_enabled: bool = True
+    trace_sample_rate: float = 0.01
+    trace_slow_request_ms: int = 500
+    trace_slow_query_ms: int = 100
+    trace_file: str = 'traces/trace-{pid}.jsonl'
+    trace_file_max_bytes: int = 10 * 1024 * 1024
+    trace_file_backups: int = 5
+    profiling_enabled: bool = False
+    profiling_token: Optional[str] = None
+    profiling_sample_rate: float = 0.0
+    profiling_interval: float = 0.001
+    profiling_dir: str = 'profiles'
+
+    @property
+    def web_workers(self) -> int:
+        """Количество воркеров API: WEB_CONCURRENCY или по одному на доступное процессу ядро."""
+        if self.web_concurrency:
+            return self.web_concurrency
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
 
 
 db_settings = DataBaseSettings()
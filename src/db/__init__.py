@@ -1,6 +1,9 @@
 __all__ = (
     'get_async_session',
+    'get_user_shard',
+    'unit_of_work',
 )
 
 
-from .database import get_async_session
+from .database import get_async_session, unit_of_work
+from .sharding import get_user_shard
@@ -1,26 +1,79 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
-from config import db_settings
+from config import app_settings, db_settings
 
 dsn = (
     f'postgresql+asyncpg://'
     f'{db_settings.user}:{db_settings.password}@{db_settings.host}:{db_settings.port}/{db_settings.db}'
 )
-engine = create_async_engine(dsn, future=True, echo=True)
+
+
+def engine_options() -> dict:
+    """Параметры пула соединений одного воркера API.
+
+    Общий бюджет соединений POSTGRES_POOL_CONNECTIONS делится между воркерами поровну:
+    половина держится в пуле постоянно, остальное открывается при всплесках нагрузки.
+    Кэш подготовленных выражений asyncpg на соединении должен вмещать все различные
+    запросы приложения, иначе частые запросы вытесняются и заново разбираются сервером.
+
+    Returns:
+        dict: Аргументы create_async_engine.
+    """
+    per_worker = max(1, db_settings.pool_connections // app_settings.web_workers)
+    pool_size = max(1, per_worker // 2)
+    return {
+        'future': True,
+        'echo': db_settings.echo,
+        'pool_size': pool_size,
+        'max_overflow': max(0, per_worker - pool_size),
+        'pool_timeout': db_settings.pool_timeout,
+        'connect_args': {'prepared_statement_cache_size': db_settings.statement_cache_size},
+    }
+
+
+engine = create_async_engine(dsn, **engine_options())
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 sync_dsn = (
     f'postgresql://'
     f'{db_settings.user}:{db_settings.password}@{db_settings.host}:{db_settings.port}/{db_settings.db}'
 )
-sync_engine = create_engine(dsn)
-sync_session = sessionmaker(autoflush=False, bind=engine, expire_on_commit=False)
+sync_engine = create_engine(sync_dsn)
+sync_session = sessionmaker(autoflush=False, bind=sync_engine, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Единица работы: одна транзакция сессии на весь запрос.
+
+    Репозитории только отправляют изменения в БД (flush), а транзакция фиксируется один раз
+    после обработчика запроса, до отправки ответа. Если обработчик завершился ошибкой
+    (в том числе HTTPException), транзакция откатывается целиком.
+
+    Args:
+        session (AsyncSession): Сессия БД.
+
+    Yields:
+        AsyncSession: Та же сессия.
+    """
+    try:
+        yield session
+    except BaseException:
+        await session.rollback()
+        raise
+    await session.commit()
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
+    """Сессия основной БД на время запроса с одной транзакцией (см. unit_of_work).
+
+    Returns:
+        AsyncGenerator[AsyncSession, None]: Сессия основной БД.
+    """
+    async with async_session_maker() as session, unit_of_work(session):
         yield session
@@ -0,0 +1,260 @@
+"""Решардинг данных пользователей без остановки приложения.
+
+Порядок добавления шарда:
+    1. python -m db.reshard pin - закрепляем всех пользователей за текущими шардами
+       (запускается со старым значением POSTGRES_SHARDS непосредственно перед выкаткой).
+    2. Добавляем шард в POSTGRES_SHARDS и выкатываем приложение и воркеры.
+    3. python -m db.reshard create-schema - создаем таблицы на шардах, где их еще нет.
+    4. python -m db.reshard migrate - переносим пользователей, у которых по новому кольцу сменился шард,
+       и снимаем закрепление.
+
+Закрепленный пользователь продолжает работать со старым шардом, поэтому перенос идет онлайн.
+На время копирования строки счетчиков пользователей на исходном шарде блокируются
+(SELECT ... FOR UPDATE), а с ними и все изменения карточек: каждое изменение сначала блокирует
+счетчики. Изменения, сделанные на исходном шарде в окне переключения (номер изменения больше
+скопированного), после паузы grace переносятся на целевой шард с новыми номерами изменений:
+удаленные там карточки не восстанавливаются, а счетчики пересчитываются по карточкам.
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import MetaData, Table, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import app_settings
+from models import Task, TaskArchive, TaskStats, TaskTombstone, User
+from models.task import TASK_DEFAULT_PARTITION_DDL
+from repository.task_repository import task_stats_delta_stmt
+
+from .database import async_session_maker
+from .sharding import SHARDED_TABLES, shard_engines, shard_ring, shard_session_makers
+
+
+COPY_CHUNK_SIZE = 500
+
+
+def _shard_metadata() -> MetaData:
+    """Метаданные шардируемых таблиц без внешних ключей на таблицу пользователей."""
+    metadata = MetaData()
+    for table in SHARDED_TABLES:
+        shard_table = table.to_metadata(metadata)
+        for constraint in list(shard_table.foreign_key_constraints):
+            shard_table.constraints.discard(constraint)
+            for column in constraint.columns:
+                column.foreign_keys.clear()
+        shard_table.foreign_keys.clear()
+    return metadata
+
+
+async def create_schema():
+    """Создаем шардируемые таблицы на всех шардах."""
+    metadata = _shard_metadata()
+    for shard_engine in shard_engines.values():
+        async with shard_engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+            if app_settings.task_partitioning:
+                await conn.execute(TASK_DEFAULT_PARTITION_DDL)
+
+
+async def pin_users(batch_size: int):
+    """Закрепляем каждого пользователя за шардом, который ему назначает текущее кольцо.
+
+    Args:
+        batch_size (int): Размер пачки пользователей.
+    """
+    async with async_session_maker() as session:
+        while True:
+            query = select(User.id).where(User.shard.is_(None)).order_by(User.id).limit(batch_size)
+            user_ids = (await session.execute(query)).scalars().all()
+            if not user_ids:
+                return
+            by_shard: Dict[str, List[UUID]] = defaultdict(list)
+            for user_id in user_ids:
+                by_shard[shard_ring.get_shard(user_id)].append(user_id)
+            for shard, shard_user_ids in by_shard.items():
+                await session.execute(update(User).where(User.id.in_(shard_user_ids)).values(shard=shard))
+            await session.commit()
+
+
+async def _copy_rows(session: AsyncSession, table: Table, rows: Sequence[dict]):
+    """Копируем строки в таблицу шарда, пропуская уже существующие.
+
+    Args:
+        session (AsyncSession): Сессия целевого шарда.
+        table (Table): Таблица.
+        rows (Sequence[dict]): Строки.
+    """
+    for start in range(0, len(rows), COPY_CHUNK_SIZE):
+        chunk = [dict(row) for row in rows[start:start + COPY_CHUNK_SIZE]]
+        await session.execute(insert(table).values(chunk).on_conflict_do_nothing())
+
+
+async def _lock_stats(session: AsyncSession, user_ids: List[UUID]) -> Dict[UUID, int]:
+    """Блокируем счетчики пользователей и получаем последний выданный номер изменения.
+
+    Args:
+        session (AsyncSession): Сессия шарда.
+        user_ids (List[UUID]): id пользователей.
+
+    Returns:
+        Dict[UUID, int]: Последний номер изменения пользователя (0, если счетчиков нет).
+    """
+    query = select(TaskStats.user_id, TaskStats.change_seq).where(
+        TaskStats.user_id.in_(user_ids)
+    ).order_by(TaskStats.user_id).with_for_update()
+    change_seqs = dict((await session.execute(query)).all())
+    return {user_id: change_seqs.get(user_id, 0) for user_id in user_ids}
+
+
+async def _copy_late_changes(
+    source_session: AsyncSession,
+    target_session: AsyncSession,
+    user_ids: List[UUID],
+    copied_seqs: Dict[UUID, int],
+):
+    """Переносим изменения, сделанные на исходном шарде после первого копирования.
+
+    Измененные и созданные карточки записываются поверх копии, если их версия новее, кроме
+    удаленных на целевом шарде; удаления переносятся следами, архив докопируется. Перенесенным изменениям выдаются
+    номера изменений целевого шарда, чтобы синхронизация клиентов их увидела, а счетчики
+    пересчитываются по карточкам целевого шарда.
+
+    Args:
+        source_session (AsyncSession): Сессия исходного шарда (счетчики заблокированы).
+        target_session (AsyncSession): Сессия целевого шарда.
+        user_ids (List[UUID]): id пользователей.
+        copied_seqs (Dict[UUID, int]): Последний скопированный номер изменения пользователя.
+    """
+    await _lock_stats(target_session, user_ids)
+    task_table = Task.__table__
+    for user_id in sorted(user_ids):
+        after = copied_seqs[user_id]
+        tasks = (await source_session.execute(
+            select(task_table).where(Task.user_id == user_id, Task.change_seq > after)
+        )).mappings().all()
+        tombstones = (await source_session.execute(
+            select(TaskTombstone.id).where(TaskTombstone.user_id == user_id, TaskTombstone.change_seq > after)
+        )).scalars().all()
+        if tasks:
+            deleted_on_target = set((await target_session.execute(
+                select(TaskTombstone.id).where(TaskTombstone.id.in_([task['id'] for task in tasks]))
+            )).scalars())
+            tasks = [task for task in tasks if task['id'] not in deleted_on_target]
+        if not tasks and not tombstones:
+            continue
+        last_seq = (await target_session.execute(
+            task_stats_delta_stmt(user_id, change_seq=len(tasks) + len(tombstones))
+        )).scalar_one()
+        change_seq = iter(range(last_seq - len(tasks) - len(tombstones) + 1, last_seq + 1))
+        for task in tasks:
+            stmt = insert(task_table).values(dict(task, change_seq=next(change_seq)))
+            await target_session.execute(stmt.on_conflict_do_update(
+                index_elements=list(task_table.primary_key.columns),
+                set_={
+                    column.name: stmt.excluded[column.name]
+                    for column in task_table.columns if not column.primary_key
+                },
+                where=Task.version < stmt.excluded.version,
+            ))
+        if tombstones:
+            await target_session.execute(delete(Task).where(Task.user_id == user_id, Task.id.in_(tombstones)))
+            await target_session.execute(insert(TaskTombstone).values([
+                {'id': task_id, 'user_id': user_id, 'change_seq': next(change_seq)} for task_id in tombstones
+            ]).on_conflict_do_nothing())
+    archived = (await source_session.execute(
+        select(TaskArchive.__table__).where(TaskArchive.user_id.in_(user_ids))
+    )).mappings().all()
+    await _copy_rows(target_session, TaskArchive.__table__, archived)
+    counts = select(func.count()).where(Task.user_id == TaskStats.user_id)
+    await target_session.execute(update(TaskStats).where(TaskStats.user_id.in_(user_ids)).values(
+        total=counts.scalar_subquery(),
+        done=counts.where(Task.status.is_(True)).scalar_subquery(),
+    ))
+
+
+async def _unpin(user_ids: List[UUID]):
+    """Снимаем закрепление пользователей, после чего они маршрутизируются по кольцу.
+
+    Args:
+        user_ids (List[UUID]): id пользователей.
+    """
+    async with async_session_maker() as session:
+        await session.execute(update(User).where(User.id.in_(user_ids)).values(shard=None))
+        await session.commit()
+
+
+async def move_users(source: str, target: str, user_ids: List[UUID], grace: float):
+    """Переносим данные пользователей с шарда source на шард target.
+
+    Args:
+        source (str): Исходный шард.
+        target (str): Целевой шард.
+        user_ids (List[UUID]): id пользователей.
+        grace (float): Пауза в секундах после переключения для завершения запросов к старому шарду.
+    """
+    async with shard_session_makers[source]() as source_session, shard_session_makers[target]() as target_session:
+        copied_seqs = await _lock_stats(source_session, user_ids)
+        for table in SHARDED_TABLES:
+            rows = (await source_session.execute(select(table).where(table.c.user_id.in_(user_ids)))).mappings().all()
+            await _copy_rows(target_session, table, rows)
+        await target_session.commit()
+        await source_session.commit()
+        await _unpin(user_ids)
+        await asyncio.sleep(grace)
+        await _lock_stats(source_session, user_ids)
+        await _copy_late_changes(source_session, target_session, user_ids, copied_seqs)
+        await target_session.commit()
+        for table in SHARDED_TABLES:
+            await source_session.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+        await source_session.commit()
+
+
+async def migrate_users(batch_size: int, grace: float):
+    """Переносим закрепленных пользователей на шарды, назначенные текущим кольцом.
+
+    Args:
+        batch_size (int): Размер пачки пользователей.
+        grace (float): Пауза после переключения пачки.
+    """
+    while True:
+        async with async_session_maker() as session:
+            query = select(User.id, User.shard).where(User.shard.is_not(None)).order_by(User.id).limit(batch_size)
+            pinned = (await session.execute(query)).all()
+        if not pinned:
+            return
+        moves: Dict[Tuple[str, str], List[UUID]] = defaultdict(list)
+        in_place: List[UUID] = []
+        for user_id, source in pinned:
+            target = shard_ring.get_shard(user_id)
+            if source == target:
+                in_place.append(user_id)
+            else:
+                moves[(source, target)].append(user_id)
+        if in_place:
+            await _unpin(in_place)
+        for (source, target), user_ids in moves.items():
+            await move_users(source, target, user_ids, grace)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Решардинг данных пользователей')
+    parser.add_argument('command', choices=('create-schema', 'pin', 'migrate'))
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--grace', type=float, default=5.0)
+    args = parser.parse_args()
+    if shard_ring is None:
+        parser.error('Шардирование выключено: задайте POSTGRES_SHARDS')
+    if args.command == 'create-schema':
+        asyncio.run(create_schema())
+    elif args.command == 'pin':
+        asyncio.run(pin_users(args.batch_size))
+    else:
+        asyncio.run(migrate_users(args.batch_size, args.grace))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+from bisect import bisect
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from config import db_settings
+from models import Task, TaskActivity, TaskArchive, TaskTombstone, TaskStats
+
+from .database import engine_options, sync_dsn, sync_session
+
+
+# Таблицы, строки которых принадлежат пользователю (колонка user_id) и хранятся на его шарде.
+SHARDED_TABLES = (
+    Task.__table__,
+    TaskArchive.__table__,
+    TaskTombstone.__table__,
+    TaskStats.__table__,
+    TaskActivity.__table__,
+)
+
+
+def _hash(key: str) -> int:
+    """Стабильный 64-битный хэш строки, не зависящий от PYTHONHASHSEED."""
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class ShardRing:
+    """Консистентное хэширование пользователей по шардам с виртуальными узлами."""
+
+    def __init__(self, shard_names: List[str], virtual_nodes: int):
+        """Конструктор кольца шардов.
+
+        Args:
+            shard_names (List[str]): Имена шардов.
+            virtual_nodes (int): Количество виртуальных узлов на один шард.
+        """
+        points: List[Tuple[int, str]] = sorted(
+            (_hash(f'{name}#{index}'), name)
+            for name in shard_names
+            for index in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    def get_shard(self, user_id: UUID) -> str:
+        """Имя шарда пользователя.
+
+        Args:
+            user_id (UUID): id пользователя.
+
+        Returns:
+            str: Имя шарда.
+        """
+        index = bisect(self._hashes, _hash(str(user_id))) % len(self._hashes)
+        return self._names[index]
+
+
+def _sync_dsn(dsn: str) -> str:
+    """DSN для синхронного драйвера из DSN для asyncpg."""
+    return dsn.replace('+asyncpg', '')
+
+
+shard_ring: Optional[ShardRing] = (
+    ShardRing(list(db_settings.shards), db_settings.shard_virtual_nodes) if db_settings.shards else None
+)
+shard_engines = {name: create_async_engine(dsn, **engine_options()) for name, dsn in db_settings.shards.items()}
+shard_session_makers: Dict[str, async_sessionmaker] = {
+    name: async_sessionmaker(shard_engine, expire_on_commit=False) for name, shard_engine in shard_engines.items()
+}
+shard_sync_session_makers: Dict[str, sessionmaker] = {
+    name: sessionmaker(autoflush=False, bind=create_engine(_sync_dsn(dsn)), expire_on_commit=False)
+    for name, dsn in db_settings.shards.items()
+}
+
+
+def get_user_shard(user_id: UUID, pinned_shard: Optional[str] = None) -> Optional[str]:
+    """Шард, на котором хранятся данные пользователя.
+
+    Args:
+        user_id (UUID): id пользователя.
+        pinned_shard (Optional[str]): Шард, закрепленный за пользователем на время решардинга.
+
+    Returns:
+        Optional[str]: Имя шарда или None, если шардирование выключено.
+    """
+    if shard_ring is None:
+        return None
+    return pinned_shard or shard_ring.get_shard(user_id)
+
+
+def task_sync_session_makers() -> List[sessionmaker]:
+    """Фабрики синхронных сессий всех БД, в которых лежат карточки заданий."""
+    if shard_ring is None:
+        return [sync_session]
+    return list(shard_sync_session_makers.values())
+
+
+def task_database_dsns() -> List[str]:
+    """DSN (без указания драйвера) всех БД, в которых лежат карточки заданий."""
+    if shard_ring is None:
+        return [sync_dsn]
+    return [_sync_dsn(dsn) for dsn in db_settings.shards.values()]
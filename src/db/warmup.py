@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Executable
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from config import db_settings
+from repository.task_repository import warm_up_queries
+from utils.get_current_user import CURRENT_USER_QUERY
+
+from .database import engine, engine_options
+from .sharding import shard_engines
+
+
+logger = logging.getLogger(__name__)
+
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+def task_engines() -> List[AsyncEngine]:
+    """Движки всех БД, в которых лежат карточки заданий."""
+    return list(shard_engines.values()) or [engine]
+
+
+def all_engines() -> List[AsyncEngine]:
+    """Движки основной БД и всех шардов."""
+    return [engine, *shard_engines.values()]
+
+
+async def warm_up_engine(db_engine: AsyncEngine, connections: int, queries: List[Tuple[Executable, dict]]):
+    """Открываем соединения пула заранее и готовим на каждом частые запросы.
+
+    Соединения открываются одновременно и удерживаются до конца прогрева, чтобы пул создал
+    именно столько разных соединений. Первое подключение asyncpg также загружает типы БД.
+
+    Args:
+        db_engine (AsyncEngine): Движок БД.
+        connections (int): Количество соединений.
+        queries (List[Tuple[Executable, dict]]): Запросы и параметры для кэша подготовленных выражений.
+    """
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(
+            *(stack.enter_async_context(db_engine.connect()) for _ in range(connections))
+        )
+        for connection in opened:
+            for query, params in queries:
+                await connection.execute(query, params)
+
+
+async def warm_up_databases():
+    """Прогреваем пулы соединений всех БД.
+
+    Ошибка прогрева не мешает запуску API: она логируется, а /readyz сообщает о неготовности,
+    пока в пуле нет ни одного соединения.
+    """
+    user_query = (CURRENT_USER_QUERY, {'user_id': UUID(int=0)})
+    task_queries = warm_up_queries()
+    tasks_engines = task_engines()
+    for db_engine in all_engines():
+        queries = [user_query] if db_engine is engine else []
+        if db_engine in tasks_engines:
+            queries += task_queries
+        pool = db_engine.pool
+        connections = db_settings.pool_warmup
+        if isinstance(pool, QueuePool):
+            connections = min(connections, pool.size())
+        try:
+            await warm_up_engine(db_engine, connections, queries)
+        except Exception:
+            logger.exception('Не удалось прогреть пул соединений %s', db_engine.url.render_as_string())
+
+
+def _opened_connections(db_engine: AsyncEngine) -> Optional[int]:
+    """Количество открытых соединений пула (None, если пул их не учитывает)."""
+    pool = db_engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    return pool.checkedin() + pool.checkedout()
+
+
+def pool_is_ready(db_engine: AsyncEngine) -> bool:
+    """Пул готов принимать запросы: в нем есть открытые соединения и он не исчерпан.
+
+    Состояние берется из счетчиков пула, запросы к БД не выполняются.
+
+    Args:
+        db_engine (AsyncEngine): Движок БД.
+
+    Returns:
+        bool: Пул готов.
+    """
+    opened = _opened_connections(db_engine)
+    if opened is None:
+        return True
+    if opened == 0:
+        return False
+    return db_engine.pool.checkedout() < db_engine.pool.size() + engine_options()['max_overflow']
+
+
+def databases_ready() -> bool:
+    """Все пулы готовы. Если в каком-то пуле нет соединений, в фоне запускается повторный прогрев.
+
+    Returns:
+        bool: Все пулы готовы.
+    """
+    global _warm_up_task
+    engines = all_engines()
+    if any(_opened_connections(db_engine) == 0 for db_engine in engines):
+        if _warm_up_task is None or _warm_up_task.done():
+            _warm_up_task = asyncio.get_running_loop().create_task(warm_up_databases())
+    return all(pool_is_ready(db_engine) for db_engine in engines)
+
+
+async def dispose_engines():
+    """Закрываем соединения пулов всех БД."""
+    for db_engine in all_engines():
+        await db_engine.dispose()
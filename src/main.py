@@ -1,18 +1,51 @@
-import debugpy
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from api import router
+from api import router, health_router
 
 from config import app_settings
+from db.warmup import all_engines, dispose_engines, warm_up_databases
+from repository.task_repository import close_task_group_commits
+from services import task_event_broker
+from utils.redis_client import close_redis
+from utils.task_client import close_task_client
+from utils.profiling import ProfilingMiddleware
+from utils.tracing import TracingMiddleware, instrument_engine, trace_sink
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Прогреваем пулы соединений при запуске и освобождаем ресурсы при остановке."""
+    await warm_up_databases()
+    yield
+    await task_event_broker.stop()
+    await close_task_group_commits()
+    await close_redis()
+    close_task_client()
+    await dispose_engines()
+    trace_sink.close()
 
 
 app = FastAPI(
-    tile='TODO list'
+    tile='TODO list',
+    lifespan=lifespan,
 )
 
 app.include_router(router)
+app.include_router(health_router)
+if app_settings.profiling_enabled:
+    # Без PROFILING_ENABLED middleware не подключается, и запросы не платят за проверку заголовка.
+    # Подключается до трассировки, чтобы профиль получил идентификатор запроса.
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(TracingMiddleware)
+
+for db_engine in all_engines():
+    instrument_engine(db_engine)
 
 if app_settings.debug:
+    # Отладчик нужен только при DEBUG, поэтому импортируем его здесь, а не при каждом запуске.
+    import debugpy
+
     debugpy.listen(('0.0.0.0', 5678))
     debugpy.wait_for_client()
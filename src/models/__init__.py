@@ -2,9 +2,13 @@ __all__ = (
     'Base',
     'User',
     'UsersCode',
-    'Task'
+    'Task',
+    'TaskArchive',
+    'TaskTombstone',
+    'TaskStats',
+    'TaskActivity',
 )
 
 from .base import Base
 from .user import User, UsersCode
-from .task import Task
+from .task import Task, TaskArchive, TaskTombstone, TaskStats, TaskActivity
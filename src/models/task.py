@@ -1,11 +1,15 @@
-from datetime import datetime
+from datetime import date, datetime
 from uuid import uuid4
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import func, text, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import (
+    func, text, event, DDL, String, Date, DateTime, Boolean, Integer, BigInteger, ForeignKey, Index
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
+from config import app_settings
+
 from .base import Base
 
 
@@ -14,9 +18,23 @@ if TYPE_CHECKING:
 
 
 class Task(Base):
-    """Модель для карточки задания."""
+    """Модель для карточки задания.
+
+    При включенной настройке task_partitioning таблица секционируется по диапазонам created_at,
+    поэтому created_at входит в первичный ключ.
+    """
 
     __tablename__ = 'task'
+    __table_args__ = (
+        # Индексы сортировок списка карточек (utils.task_ordering.SUPPORTED_TASK_ORDERINGS).
+        Index('ix_task_user_id_created_at', 'user_id', 'created_at', 'id'),
+        Index('ix_task_user_id_updated_at', 'user_id', 'updated_at', 'id'),
+        Index('ix_task_user_id_title', 'user_id', 'title', 'id'),
+        Index('ix_task_user_id_status_created_at', 'user_id', 'status', 'created_at', 'id'),
+        Index('ix_task_user_id_status_desc_created_at', 'user_id', text('status DESC'), 'created_at', 'id'),
+        Index('ix_task_user_id_change_seq', 'user_id', 'change_seq'),
+        {'postgresql_partition_by': 'RANGE (created_at)'} if app_settings.task_partitioning else {},
+    )
 
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -32,6 +50,111 @@ class Task(Base):
         default=False,
         server_default=text('false')
     )
-    created_at: Mapped[datetime] = mapped_column(DateTime, doc='Дата создания карточки', server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        doc='Дата создания карточки',
+        server_default=func.now(),
+        primary_key=app_settings.task_partitioning,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        doc='Дата последнего изменения карточки',
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    completed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        doc='Дата выполнения карточки (NULL, пока карточка не выполнена)',
+        nullable=True,
+    )
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        doc='Номер последнего изменения в последовательности изменений пользователя',
+        server_default=text('0'),
+    )
+    version: Mapped[int] = mapped_column(
+        Integer,
+        doc='Версия карточки для оптимистической блокировки',
+        server_default=text('1'),
+    )
     user_id: Mapped[UUID] = mapped_column(ForeignKey('user.id'), nullable=False)
     user: Mapped['User'] = relationship('User', back_populates='tasks')
+
+
+class TaskArchive(Base):
+    """Модель архива выполненных карточек заданий."""
+
+    __tablename__ = 'task_archive'
+
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    title: Mapped[str] = mapped_column(String, doc='Заголовок карточки', nullable=False)
+    description: Mapped[str] = mapped_column(String, doc='Описание карточки', nullable=False)
+    status: Mapped[bool] = mapped_column(Boolean, doc='Выполнено/Не выполнено', nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, doc='Дата создания карточки', nullable=False)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, doc='Дата выполнения карточки', nullable=True)
+    user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), index=True, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, doc='Дата архивации', server_default=func.now())
+
+
+class TaskTombstone(Base):
+    """Модель следа удаленной карточки для синхронизации изменений."""
+
+    __tablename__ = 'task_tombstone'
+    __table_args__ = (
+        Index('ix_task_tombstone_user_id_change_seq', 'user_id', 'change_seq'),
+    )
+
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    change_seq: Mapped[int] = mapped_column(BigInteger, doc='Номер изменения', nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, doc='Дата удаления', server_default=func.now())
+
+
+class TaskStats(Base):
+    """Модель счетчиков карточек пользователя.
+
+    Обновляется в той же транзакции, что и сами карточки. Строка блокируется до конца транзакции,
+    поэтому номера изменений одного пользователя фиксируются строго по порядку.
+    """
+
+    __tablename__ = 'task_stats'
+    __table_args__ = (
+        # Пользователи, активность которых еще не пересчитана (tasks.rollup_task_activity).
+        Index('ix_task_stats_activity_pending', 'user_id', postgresql_where=text('change_seq > activity_seq')),
+    )
+
+    user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, doc='Всего карточек', server_default=text('0'))
+    done: Mapped[int] = mapped_column(Integer, doc='Выполненных карточек', server_default=text('0'))
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        doc='Последний выданный номер изменения',
+        server_default=text('0'),
+    )
+    activity_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        doc='Номер изменения, по которое пересчитана активность пользователя в task_activity',
+        server_default=text('0'),
+    )
+
+
+class TaskActivity(Base):
+    """Модель активности пользователя за день: сколько карточек создано и выполнено.
+
+    Строки пересчитывает задача tasks.rollup_task_activity по изменениям после activity_seq
+    из task_stats, поэтому графики активности не группируют таблицу task при каждом просмотре.
+    """
+
+    __tablename__ = 'task_activity'
+
+    user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, doc='День (UTC)', primary_key=True)
+    created: Mapped[int] = mapped_column(Integer, doc='Создано карточек', server_default=text('0'))
+    completed: Mapped[int] = mapped_column(Integer, doc='Выполнено карточек', server_default=text('0'))
+
+
+# Секция по умолчанию принимает строки, для которых еще не создана месячная секция.
+TASK_DEFAULT_PARTITION_DDL = DDL('CREATE TABLE IF NOT EXISTS task_default PARTITION OF task DEFAULT')
+
+if app_settings.task_partitioning:
+    event.listen(Task.__table__, 'after_create', TASK_DEFAULT_PARTITION_DDL)
@@ -1,8 +1,8 @@
 from uuid import uuid4
 from datetime import datetime
-from typing import List, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
-from sqlalchemy import func, text, String, DateTime, Boolean, Integer, ForeignKey
+from sqlalchemy import func, text, String, DateTime, Boolean, Integer, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -13,10 +13,19 @@ if TYPE_CHECKING:
     from .task import Task
 
 
+# Имена ограничений уникальности: по ним регистрация сообщает, что именно уже занято.
+USERNAME_UNIQUE_CONSTRAINT = 'uq_user_username'
+EMAIL_UNIQUE_CONSTRAINT = 'uq_user_email'
+
+
 class User(Base):
     """Модель пользователя."""
 
     __tablename__ = 'user'
+    __table_args__ = (
+        UniqueConstraint('username', name=USERNAME_UNIQUE_CONSTRAINT),
+        UniqueConstraint('email', name=EMAIL_UNIQUE_CONSTRAINT),
+    )
 
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -24,10 +33,12 @@ class User(Base):
         default=uuid4,
         server_default=text('gen_random_uuid()'),
     )
-    username: Mapped[str] = mapped_column(String, doc='Логин', unique=True)
+    username: Mapped[str] = mapped_column(String, doc='Логин')
     password: Mapped[str] = mapped_column(String, doc='Пароль')
-    email: Mapped[str] = mapped_column(String, doc='Email', unique=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, doc='Время регистрации', server_default=func.now())
+    email: Mapped[str] = mapped_column(String, doc='Email')
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, doc='Время регистрации', server_default=func.now(), index=True
+    )
     code: Mapped['UsersCode'] = relationship(back_populates='user')
     is_register: Mapped[bool] = mapped_column(
         Boolean,
@@ -41,6 +52,11 @@ class User(Base):
         default=False,
         server_default=text('false'),
     )
+    shard: Mapped[Optional[str]] = mapped_column(
+        String,
+        doc='Шард, закрепленный за пользователем на время решардинга',
+        nullable=True,
+    )
     tasks: Mapped[List['Task']] = relationship('Task', back_populates='user')
 
 
@@ -56,6 +72,6 @@ class UsersCode(Base):
         server_default=text('gen_random_uuid()'),
     )
     code: Mapped[int] = mapped_column(Integer, doc='Код подтверждения', nullable=False)
-    user_id: Mapped[UUID] = mapped_column(ForeignKey('user.id'), onupdate='CASCADE', nullable=False)
+    user_id: Mapped[UUID] = mapped_column(ForeignKey('user.id'), onupdate='CASCADE', nullable=False, index=True)
     user: Mapped['User'] = relationship(back_populates='code')
     created_at: Mapped[datetime] = mapped_column(DateTime, doc='Время создания кода', server_default=func.now())
@@ -1,7 +1,22 @@
+from typing import Annotated, Optional
+
+from fastapi import Query
+
 from .base import Paginator
 
 
 class TaskPaginator(Paginator):
-    """Пагинатор для карточек задач."""
+    """Пагинатор для карточек задач.
+
+    Кроме limit/offset поддерживает курсор: заголовок X-Next-Cursor ответа указывает на
+    последнюю карточку страницы, и следующая страница читается по индексу сортировки без OFFSET.
+    """
 
-    pass
+    def __init__(
+        self,
+        limit: Annotated[int, Query(description='Количество записей', ge=1, le=100)] = 20,
+        offset: Annotated[int, Query(description='Страница', ge=0)] = 0,
+        cursor: Annotated[Optional[str], Query(description='Курсор из заголовка X-Next-Cursor')] = None,
+    ):
+        super().__init__(limit, offset)
+        self.cursor = cursor
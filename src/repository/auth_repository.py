@@ -1,12 +1,12 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta, timezone
-from typing import Union
+from typing import AsyncIterator, Optional, Tuple
 
 from fastapi import HTTPException, status
 
-from sqlalchemy import select, or_, delete, update
+from sqlalchemy import Delete, Select, Update, bindparam, exists, func, select, or_, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, insert
 
 import jwt
 
@@ -14,7 +14,11 @@ from passlib.context import CryptContext
 
 from config import app_settings
 from models import User, UsersCode
+from models.user import EMAIL_UNIQUE_CONSTRAINT, USERNAME_UNIQUE_CONSTRAINT
 from schemas import TokenType
+from utils.tracing import trace_methods
+
+from .query_registry import register_query
 
 
 pwd_context = CryptContext(
@@ -22,6 +26,101 @@ pwd_context = CryptContext(
     deprecated=app_settings.crypt_context_deprecated
 )
 
+# Вход выполняется по логину или email: условие OR покрывается уникальными индексами обоих полей.
+USER_BY_LOGIN_QUERY = select(User).where(
+    or_(User.username == bindparam('login'), User.email == bindparam('login'))
+)
+
+# Ошибки регистрации по именам ограничений уникальности таблицы user.
+USER_UNIQUE_CONSTRAINT_ERRORS = {
+    USERNAME_UNIQUE_CONSTRAINT: 'Пользователь с таким логином уже существует',
+    EMAIL_UNIQUE_CONSTRAINT: 'Пользователь с таким email уже существует',
+}
+
+# Проверки доступности логина и email идут по уникальным индексам.
+USER_FIELD_EXISTS_QUERIES = {
+    'username': select(exists().where(User.username == bindparam('value'))),
+    'email': select(exists().where(User.email == bindparam('value'))),
+}
+
+USERS_COUNT_QUERY = select(func.count()).select_from(User)
+
+USER_LOGINS_QUERY = select(User.username, User.email, User.created_at)
+LOGINS_BATCH_SIZE = 5000
+
+# Пользователи, зарегистрированные после since, выбираются по индексу created_at.
+USER_LOGINS_SINCE_QUERY = USER_LOGINS_QUERY.where(User.created_at >= bindparam('since'))
+
+USER_CODE_QUERY = select(UsersCode.code, UsersCode.created_at).where(UsersCode.user_id == bindparam('user_id'))
+
+
+def register_user_stmt(user_data: dict) -> Select:
+    """Запрос регистрации пользователя за одно обращение к БД.
+
+    INSERT ... ON CONFLICT DO NOTHING RETURNING выполняется в CTE, а внешний SELECT всегда
+    возвращает одну строку: id нового пользователя (NULL, если вставка не прошла) и для каждого
+    ограничения уникальности признак, что значение уже занято. Подзапросы EXISTS видят таблицу
+    до вставки, поэтому признаки относятся только к существовавшим пользователям.
+
+    Args:
+        user_data (dict): Данные пользователя с хэшем пароля.
+
+    Returns:
+        Select: Запрос, возвращающий id и признаки с именами ограничений уникальности.
+    """
+    inserted = insert(User).values(**user_data).on_conflict_do_nothing().returning(User.id).cte('inserted')
+    return select(
+        select(inserted.c.id).scalar_subquery().label('id'),
+        exists().where(User.username == user_data['username']).label(USERNAME_UNIQUE_CONSTRAINT),
+        exists().where(User.email == user_data['email']).label(EMAIL_UNIQUE_CONSTRAINT),
+    )
+
+
+def delete_user_code_stmt(user_id: UUID) -> Delete:
+    """Запрос удаления кодов подтверждения пользователя.
+
+    Args:
+        user_id (UUID): id пользователя.
+
+    Returns:
+        Delete: Запрос DELETE.
+    """
+    return delete(UsersCode).where(UsersCode.user_id == user_id)
+
+
+def update_user_stmt(user_id: UUID, update_data: dict) -> Update:
+    """Запрос обновления пользователя.
+
+    Args:
+        user_id (UUID): id пользователя.
+        update_data (dict): Данные для обновления.
+
+    Returns:
+        Update: Запрос UPDATE.
+    """
+    return update(User).where(User.id == user_id).values(**update_data)
+
+
+# Запросы репозитория для проверки планов выполнения (tests/functional_tests/test_query_plans.py).
+register_query('auth.user_by_login', lambda sample: (USER_BY_LOGIN_QUERY, {'login': sample.email}))
+register_query(
+    'auth.register_user',
+    lambda sample: (
+        register_user_stmt({'username': sample.username, 'email': sample.email, 'password': 'password'}), {}
+    ),
+)
+register_query(
+    'auth.username_exists', lambda sample: (USER_FIELD_EXISTS_QUERIES['username'], {'value': sample.username})
+)
+register_query('auth.email_exists', lambda sample: (USER_FIELD_EXISTS_QUERIES['email'], {'value': sample.email}))
+register_query(
+    'auth.user_logins_since',
+    lambda sample: (USER_LOGINS_SINCE_QUERY, {'since': datetime.now(timezone.utc).replace(tzinfo=None)}),
+)
+register_query('auth.user_code', lambda sample: (USER_CODE_QUERY, {'user_id': sample.user_id}))
+register_query('auth.delete_user_code', lambda sample: (delete_user_code_stmt(sample.user_id), {}))
+register_query('auth.update_user', lambda sample: (update_user_stmt(sample.user_id, {'is_confirmed': True}), {}))
+
 
 class AuthRepositoryABC(ABC):
     """Интерфейс для аутентификации и регистрации."""
@@ -46,59 +145,91 @@ class AuthRepositoryABC(ABC):
         """Подтверждение входа кодом из почты."""
         pass
 
+    @abstractmethod
+    async def user_exists(self, field: str, value: str) -> bool:
+        """Проверяем, занят ли логин или email."""
+        pass
+
+    @abstractmethod
+    async def count_users(self) -> int:
+        """Количество пользователей."""
+        pass
+
+    @abstractmethod
+    def stream_logins(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, str, datetime]]:
+        """Логины, email и время регистрации пользователей."""
+        pass
+
 
+@trace_methods('repository')
 class AuthRepository(AuthRepositoryABC):
-    """Репозиторий для аутентификации и регистрации."""
+    """Репозиторий для аутентификации и регистрации.
+
+    Изменения только отправляются в БД, транзакцию фиксирует unit_of_work запроса.
+    """
 
     def __init__(self, session: AsyncSession):
         self.session: AsyncSession = session
 
     async def register(self, user_data: dict) -> User:
-        """Регистрация пользователя.
+        """Регистрация пользователя одним запросом INSERT ... ON CONFLICT DO NOTHING.
 
         Args:
             user_data (dict): Данные пользователя
 
+        Raises:
+            HTTPException: Логин или email уже заняты.
+
         Returns:
             User: Пользователь
         """
-        username, email, password = user_data.get('username'), user_data.get('email'), user_data.get('password')
-        await self._check_existing_user(username, email)
-        hashed_password = pwd_context.hash(password)
-        user_data['password'] = hashed_password
-        new_user = User(**user_data)
-        self.session.add(new_user)
-        await self.session.commit()
-        await self.session.refresh(new_user)
-        return new_user
-
-    async def _check_existing_user(self, username: str, email: str) -> Union[HTTPException, None]:
-        """Проверяем существует ли такой пользователь уже в системе.
+        user_data['password'] = pwd_context.hash(user_data['password'])
+        row = (await self.session.execute(register_user_stmt(user_data))).one()
+        if row.id is None:
+            for constraint, detail in USER_UNIQUE_CONSTRAINT_ERRORS.items():
+                if row._mapping[constraint]:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+            # Пользователя с тем же логином или email только что зарегистрировал параллельный запрос.
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Пользователь с таким логином или email уже существует'
+            )
+        return User(id=row.id, **user_data)
+
+    async def user_exists(self, field: str, value: str) -> bool:
+        """Проверяем, занят ли логин или email, запросом по уникальному индексу.
 
         Args:
-            username (str): Логин
-            email (str): Email
+            field (str): Поле: username или email.
+            value (str): Значение.
 
         Returns:
-            bool: Существует(True)/Не существует(False)
+            bool: Занят(True)/Свободен(False).
         """
-        query = select(User).where(
-            User.username == username
-            or User.email == email
-        )
-        result = await self.session.execute(query)
-        existing_user = result.scalar_one_or_none()
-        if existing_user:
-            if existing_user.username == username:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail='Пользователь с таким логином уже существует'
-                )
-            if existing_user.email == email:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail='Пользователь с таким email уже существует'
-                )
+        return (await self.session.execute(USER_FIELD_EXISTS_QUERIES[field], {'value': value})).scalar_one()
+
+    async def count_users(self) -> int:
+        """Количество пользователей.
+
+        Returns:
+            int: Количество пользователей.
+        """
+        return (await self.session.execute(USERS_COUNT_QUERY)).scalar_one()
+
+    async def stream_logins(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, str, datetime]]:
+        """Логины, email и время регистрации пользователей порциями без загрузки таблицы в память.
+
+        Args:
+            since (Optional[datetime]): Только зарегистрированные не раньше этого времени (None - все).
+
+        Yields:
+            Tuple[str, str, datetime]: Логин, email и время регистрации.
+        """
+        query, params = (USER_LOGINS_QUERY, {}) if since is None else (USER_LOGINS_SINCE_QUERY, {'since': since})
+        result = await self.session.stream(query, params, execution_options={'yield_per': LOGINS_BATCH_SIZE})
+        async for partition in result.partitions():
+            for row in partition:
+                yield row.username, row.email, row.created_at
 
     async def login(self, user_data: dict) -> User:
         """Аутентификация пользователя.
@@ -111,10 +242,7 @@ class AuthRepository(AuthRepositoryABC):
             detail='Неверные учетные данные'
         )
         login, password = user_data.get('login'), user_data.get('password')
-        query = select(User).where(
-                or_(User.username == login, User.email == login),
-        )
-        result = await self.session.execute(query)
+        result = await self.session.execute(USER_BY_LOGIN_QUERY, {'login': login})
         current_user = result.scalar_one_or_none()
         if not current_user:
             raise http_exception
@@ -129,9 +257,7 @@ class AuthRepository(AuthRepositoryABC):
         Args:
             user_id (UUID): id юзера.
         """
-        stmt = delete(UsersCode).where(UsersCode.user_id == user_id)
-        await self.session.execute(stmt)
-        await self.session.commit()
+        await self.session.execute(delete_user_code_stmt(user_id))
 
     async def create_user_code(self, data: dict) -> UsersCode:
         """Генерация случайного 6-ти значного числа для пользователя.
@@ -141,8 +267,7 @@ class AuthRepository(AuthRepositoryABC):
         """
         users_code = UsersCode(**data)
         self.session.add(users_code)
-        await self.session.commit()
-        await self.session.refresh(users_code)
+        await self.session.flush()
         return users_code
 
     async def verify_otp(self, user_data: dict) -> bool:
@@ -155,8 +280,7 @@ class AuthRepository(AuthRepositoryABC):
             bool: Подтвержден/Не подтвержден.
         """
         user_id, code = user_data.get('user_id'), user_data.get('code')
-        query = select(UsersCode.code, UsersCode.created_at).where(UsersCode.user_id == user_id)
-        result = await self.session.execute(query)
+        result = await self.session.execute(USER_CODE_QUERY, {'user_id': user_id})
         verify_data = result.fetchone()
         if not verify_data:
             return False
@@ -169,9 +293,7 @@ class AuthRepository(AuthRepositoryABC):
         Args:
             user_id (UUID): id Пользователя.
         """
-        stmt = update(User).where(User.id == user_id).values(**update_data)
-        await self.session.execute(stmt)
-        await self.session.commit()
+        await self.session.execute(update_user_stmt(user_id, update_data))
 
     def create_jwt_token(self, user_id: UUID) -> dict:
         """Создаем jwt токен.
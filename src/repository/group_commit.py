@@ -0,0 +1,92 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+
+Item = TypeVar('Item')
+Result = TypeVar('Result')
+
+
+class GroupCommit(Generic[Item, Result]):
+    """Групповая запись: элементы, пришедшие в течение window, пишутся одной транзакцией.
+
+    Первый элемент запускает таймер на window секунд, и все элементы, пришедшие до его
+    срабатывания (или до набора max_size), передаются в write одним списком. Каждый вызывающий
+    получает свой результат только после того, как write зафиксировал транзакцию. Если запись
+    пачки завершилась ошибкой, элементы пишутся по одному, чтобы ошибка одного элемента
+    (например, нарушение внешнего ключа) не отменяла записи остальных.
+
+    Запись выполняется в отдельной задаче asyncio, поэтому отмена ожидания вызывающим не
+    отменяет запись его элемента. Если же отменена сама запись, ожидание ее элементов тоже
+    отменяется, а не зависает. При остановке приложения close дописывает накопленные элементы.
+    """
+
+    def __init__(self, write: Callable[[List[Item]], Awaitable[List[Result]]], window: float, max_size: int):
+        """Конструктор групповой записи.
+
+        Args:
+            write (Callable[[List[Item]], Awaitable[List[Result]]]): Запись пачки одной транзакцией,
+                возвращает результаты в порядке элементов.
+            window (float): Сколько секунд собирать пачку.
+            max_size (int): Наибольший размер пачки.
+        """
+        self.write = write
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[Item, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Item) -> Result:
+        """Добавляем элемент в пачку и ждем фиксации ее транзакции.
+
+        Args:
+            item (Item): Элемент.
+
+        Returns:
+            Result: Результат записи элемента.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    async def close(self):
+        """Записываем накопленные элементы и дожидаемся всех начатых записей."""
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._write(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: List[Tuple[Item, asyncio.Future]]):
+        try:
+            try:
+                results = await self.write([item for item, _ in batch])
+            except Exception as error:
+                if len(batch) == 1:
+                    _, future = batch[0]
+                    if not future.done():
+                        future.set_exception(error)
+                    return
+                await asyncio.gather(*(self._write([entry]) for entry in batch))
+                return
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # Запись отменена (например, при остановке): вызывающие не должны ждать вечно.
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
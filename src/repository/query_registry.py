@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import Executable
+
+
+@dataclass(frozen=True)
+class QuerySample:
+    """Реальные значения из БД, которыми заполняются параметры запросов при проверке планов.
+
+    Attributes:
+        user_id (UUID): id пользователя с карточками.
+        username (str): Логин этого пользователя.
+        email (str): Email этого пользователя.
+        task (dict): Строка одной из его карточек (все колонки таблицы task).
+        task_ids (List[UUID]): id нескольких его карточек.
+    """
+
+    user_id: UUID
+    username: str
+    email: str
+    task: dict
+    task_ids: List[UUID]
+
+
+QueryFactory = Callable[[QuerySample], Tuple[Executable, dict]]
+
+# Запросы репозиториев по именам. Заполняется при импорте модулей репозиториев.
+REPOSITORY_QUERIES: Dict[str, QueryFactory] = {}
+
+
+def register_query(name: str, factory: QueryFactory):
+    """Регистрируем запрос репозитория для проверки планов выполнения.
+
+    Каждый запрос, который выполняет репозиторий, должен быть зарегистрирован: тест
+    tests/functional_tests/test_query_plans.py выполняет EXPLAIN для всех зарегистрированных
+    запросов на заполненной БД и падает на последовательном сканировании больших таблиц.
+
+    Args:
+        name (str): Уникальное имя запроса (им же называется файл сохраненного плана).
+        factory (QueryFactory): Функция, возвращающая запрос и его параметры для образца данных.
+
+    Raises:
+        ValueError: Запрос с таким именем уже зарегистрирован.
+    """
+    if name in REPOSITORY_QUERIES:
+        raise ValueError(f'Query {name} is already registered')
+    REPOSITORY_QUERIES[name] = factory
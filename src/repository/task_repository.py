@@ -1,20 +1,528 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
-from uuid import UUID
+from collections import defaultdict
+from datetime import date
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, status
 
-from sqlalchemy import select, delete, update
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    Date, Delete, Executable, Select, Update, any_, bindparam, cast, literal_column, select, delete, update, func,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, Insert, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import InstrumentedAttribute, load_only
 
-from models import Task
+from config import app_settings
+from models import Task, TaskActivity, TaskArchive, TaskTombstone, TaskStats
+from schemas import TaskEventType, TaskEventSchema
+from utils.etag import make_etag
+from utils.task_ordering import TASK_ORDERINGS, TaskOrdering, parse_task_ordering
+from utils.tracing import trace_methods
+
+from .group_commit import GroupCommit
+from .query_registry import QuerySample, register_query
+
+
+TASK_EVENTS_CHANNEL = 'task_events'
+# Ограничение PostgreSQL на размер payload в NOTIFY - 8000 байт.
+TASK_EVENT_PAYLOAD_LIMIT = 7900
+# Поля события, по которым подписчик может дочитать карточку сам.
+TASK_EVENT_ID_FIELDS = {'event', 'id', 'user_id'}
+
+
+def task_event_payload(event: TaskEventType, task: Task) -> str:
+    """Payload уведомления об изменении карточки, укладывающийся в ограничение NOTIFY.
+
+    Если событие с карточкой не укладывается в TASK_EVENT_PAYLOAD_LIMIT, из него убирается
+    описание, а если не укладывается и без описания (длинный заголовок) - отправляются только
+    тип события, id карточки и id пользователя.
+
+    Args:
+        event (TaskEventType): Тип события.
+        task (Task): Карточка задания.
+
+    Returns:
+        str: JSON события.
+    """
+    if event is TaskEventType.deleted:
+        return TaskEventSchema(event=event, id=task.id, user_id=task.user_id).model_dump_json()
+    event_data = TaskEventSchema(
+        event=event,
+        id=task.id,
+        user_id=task.user_id,
+        title=task.title,
+        description=task.description,
+        status=task.status,
+        created_at=task.created_at,
+    )
+    payload = event_data.model_dump_json()
+    if len(payload.encode()) > TASK_EVENT_PAYLOAD_LIMIT:
+        payload = event_data.model_dump_json(exclude={'description'})
+    if len(payload.encode()) > TASK_EVENT_PAYLOAD_LIMIT:
+        payload = event_data.model_dump_json(include=TASK_EVENT_ID_FIELDS)
+    return payload
+
+
+def task_stats_delta_stmt(user_id: UUID, total: int = 0, done: int = 0, change_seq: int = 0) -> Insert:
+    """Запрос, изменяющий счетчики карточек пользователя и выдающий номера изменений.
+
+    Возвращает последний выданный номер изменения. Строка счетчиков остается заблокированной до конца
+    транзакции, поэтому изменения одного пользователя фиксируются по порядку номеров.
+
+    Args:
+        user_id (UUID): id пользователя.
+        total (int): Изменение количества карточек.
+        done (int): Изменение количества выполненных карточек.
+        change_seq (int): Сколько номеров изменений выдать.
+
+    Returns:
+        Insert: Запрос INSERT ... ON CONFLICT DO UPDATE ... RETURNING change_seq.
+    """
+    stmt = insert(TaskStats).values(user_id=user_id, total=total, done=done, change_seq=change_seq)
+    return stmt.on_conflict_do_update(
+        index_elements=[TaskStats.user_id],
+        set_={
+            'total': TaskStats.total + total,
+            'done': TaskStats.done + done,
+            'change_seq': TaskStats.change_seq + change_seq,
+        },
+    ).returning(TaskStats.change_seq)
+
+
+def delete_task_stmt(user_id: UUID, task_id: UUID) -> Delete:
+    """Запрос удаления карточки пользователя, возвращающий поля для счетчиков и события.
+
+    Args:
+        user_id (UUID): id пользователя.
+        task_id (UUID): id карточки задания.
+
+    Returns:
+        Delete: Запрос DELETE ... RETURNING id, user_id, status.
+    """
+    return delete(Task).where(
+        Task.user_id == user_id, Task.id == task_id
+    ).returning(
+        Task.id, Task.user_id, Task.status
+    )
+
+
+def task_tombstone_stmt(task_id: UUID, user_id: UUID, change_seq: int) -> Insert:
+    """Запрос, сохраняющий след удаленной карточки для получения изменений.
+
+    Args:
+        task_id (UUID): id удаленной карточки.
+        user_id (UUID): id пользователя.
+        change_seq (int): Номер изменения.
+
+    Returns:
+        Insert: Запрос INSERT.
+    """
+    return insert(TaskTombstone).values(id=task_id, user_id=user_id, change_seq=change_seq)
+
+
+def update_task_stmt(
+    user_id: UUID,
+    task_id: UUID,
+    task_data: dict,
+    change_seq: int,
+    expected_version: Optional[int] = None,
+) -> Update:
+    """Запрос обновления карточки, увеличивающий ее версию и возвращающий прежний статус.
+
+    При изменении статуса проставляется или сбрасывается дата выполнения completed_at.
+
+    Args:
+        user_id (UUID): id пользователя.
+        task_id (UUID): id карточки задания.
+        task_data (dict): Данные для обновления.
+        change_seq (int): Номер изменения.
+        expected_version (Optional[int]): Ожидаемая версия карточки (None - без проверки).
+
+    Returns:
+        Update: Запрос UPDATE ... RETURNING.
+    """
+    old_task = select(
+        Task.id, Task.status
+    ).where(
+        Task.user_id == user_id, Task.id == task_id
+    ).with_for_update().subquery('old_task')
+    values = {**task_data, 'change_seq': change_seq, 'version': Task.version + 1}
+    if 'status' in task_data:
+        # Дата выполнения сохраняется при повторной отметке и сбрасывается при снятии отметки.
+        values['completed_at'] = func.coalesce(Task.completed_at, func.now()) if task_data['status'] else None
+    stmt = update(Task).where(
+        Task.id == old_task.c.id
+    ).values(
+        **values
+    ).returning(
+        Task, old_task.c.status.label('old_status')
+    )
+    if expected_version is not None:
+        stmt = stmt.where(Task.version == expected_version)
+    return stmt
+
+
+# Частые запросы строятся один раз: повторное выполнение не пересобирает конструкцию select()
+# и не считает заново ключ кэша компиляции, а одинаковый SQL попадает в кэш подготовленных
+# выражений asyncpg на соединении.
+USER_TASK_QUERY = select(
+    Task
+).where(
+    Task.user_id == bindparam('user_id'), Task.id == bindparam('task_id')
+)
+
+TASK_STATS_QUERY = select(TaskStats).where(TaskStats.user_id == bindparam('user_id'))
+
+
+# Колонки карточки, которые нужны ответам чтения. Чтение строк без ORM не создает объекты Task
+# и не регистрирует их в identity map сессии.
+TASK_READ_COLUMNS = (Task.id, Task.title, Task.description, Task.status, Task.created_at, Task.version)
+
+USER_TASK_ROW_QUERY = select(
+    *TASK_READ_COLUMNS
+).where(
+    Task.user_id == bindparam('user_id'), Task.id == bindparam('task_id')
+)
+
+USER_TASKS_BY_IDS_QUERY = select(
+    Task
+).where(
+    Task.user_id == bindparam('user_id'),
+    Task.id == any_(bindparam('task_ids', type_=ARRAY(Task.id.type))),
+)
+
+TASK_VERSION_QUERY = select(
+    Task.version
+).where(
+    Task.user_id == bindparam('user_id'), Task.id == bindparam('task_id')
+)
+
+# Оба запроса изменений идут по индексам (user_id, change_seq).
+TASK_CHANGES_QUERY = select(
+    Task
+).where(
+    Task.user_id == bindparam('user_id'), Task.change_seq > bindparam('since')
+).order_by(
+    Task.change_seq
+).limit(
+    bindparam('limit')
+)
+
+TASK_TOMBSTONES_CHANGES_QUERY = select(
+    TaskTombstone
+).where(
+    TaskTombstone.user_id == bindparam('user_id'), TaskTombstone.change_seq > bindparam('since')
+).order_by(
+    TaskTombstone.change_seq
+).limit(
+    bindparam('limit')
+)
+
+TASK_ACTIVITY_QUERY = select(
+    TaskActivity
+).where(
+    TaskActivity.user_id == bindparam('user_id'),
+    TaskActivity.day >= bindparam('date_from'),
+    TaskActivity.day <= bindparam('date_to'),
+).order_by(
+    TaskActivity.day
+)
+
+# Пересчет активности (tasks.rollup_task_activity). Пользователи с изменениями после
+# activity_seq выбираются по частичному индексу ix_task_stats_activity_pending.
+PENDING_ACTIVITY_USERS_QUERY = select(
+    TaskStats.user_id, TaskStats.change_seq
+).where(
+    TaskStats.change_seq > TaskStats.activity_seq, TaskStats.user_id > bindparam('after')
+).order_by(
+    TaskStats.user_id
+).limit(
+    bindparam('limit')
+)
+
+_activity_user_ids = bindparam('user_ids', type_=ARRAY(TaskStats.user_id.type))
+# Карточки в архиве остаются в истории активности, удаленные карточки из нее пропадают.
+_activity_tasks = union_all(
+    select(Task.user_id, Task.created_at, Task.completed_at).where(Task.user_id == any_(_activity_user_ids)),
+    select(
+        TaskArchive.user_id, TaskArchive.created_at, TaskArchive.completed_at
+    ).where(
+        TaskArchive.user_id == any_(_activity_user_ids)
+    ),
+).cte('activity_tasks')
+_activity_events = union_all(
+    select(
+        _activity_tasks.c.user_id,
+        cast(_activity_tasks.c.created_at, Date).label('day'),
+        literal_column('1').label('created'),
+        literal_column('0').label('completed'),
+    ),
+    select(
+        _activity_tasks.c.user_id, cast(_activity_tasks.c.completed_at, Date), literal_column('0'), literal_column('1')
+    ).where(
+        _activity_tasks.c.completed_at.is_not(None)
+    ),
+).subquery('activity_events')
+
+DELETE_USERS_ACTIVITY_STMT = delete(TaskActivity).where(TaskActivity.user_id == any_(_activity_user_ids))
+
+INSERT_USERS_ACTIVITY_STMT = insert(TaskActivity).from_select(
+    ['user_id', 'day', 'created', 'completed'],
+    select(
+        _activity_events.c.user_id,
+        _activity_events.c.day,
+        func.sum(_activity_events.c.created),
+        func.sum(_activity_events.c.completed),
+    ).group_by(
+        _activity_events.c.user_id, _activity_events.c.day
+    ),
+)
+
+_task_stats_table = TaskStats.__table__
+# Выполняется пачкой параметров {'stats_user_id': ..., 'seq': ...}.
+ACTIVITY_WATERMARK_STMT = update(
+    _task_stats_table
+).where(
+    _task_stats_table.c.user_id == bindparam('stats_user_id')
+).values(
+    activity_seq=bindparam('seq')
+)
+
+
+def _user_tasks_page(query: Select, ordering: TaskOrdering, after_cursor: bool) -> Select:
+    """Добавляем к запросу отбор карточек пользователя, сортировку и страницу.
+
+    Параметры запроса: user_id, limit, offset и при after_cursor - cursor_0, cursor_1, ...
+    """
+    query = query.where(Task.user_id == bindparam('user_id'))
+    if after_cursor:
+        query = query.where(ordering.after_cursor)
+    return query.order_by(
+        *ordering.order_by
+    ).limit(
+        bindparam('limit')
+    ).offset(
+        bindparam('offset')
+    )
+
+
+def _read_columns(fields: Optional[Tuple[str, ...]]) -> Tuple[InstrumentedAttribute, ...]:
+    """Колонки карточки для чтения: запрошенные поля или все колонки ответа (fields=None)."""
+    if fields is None:
+        return TASK_READ_COLUMNS
+    return tuple(getattr(Task, field) for field in fields)
+
+
+@lru_cache(maxsize=None)
+def user_tasks_query(
+    ordering: TaskOrdering, after_cursor: bool = False, fields: Optional[Tuple[str, ...]] = None
+) -> Select:
+    """Запрос страницы карточек пользователя, построенный один раз для сортировки и набора полей.
+
+    Если поля переданы, загружаются только они и поля сортировки, остальные атрибуты Task
+    остаются незагруженными.
+
+    Args:
+        ordering (TaskOrdering): Сортировка.
+        after_cursor (bool): Страница после курсора.
+        fields (Optional[Tuple[str, ...]]): Колонки карточки (None - вся карточка).
+
+    Returns:
+        Select: Запрос.
+    """
+    query = select(Task)
+    if fields is not None:
+        cursor_columns = [getattr(Task, field) for field in ordering.fields]
+        query = query.options(load_only(*_read_columns(fields), *cursor_columns))
+    return _user_tasks_page(query, ordering, after_cursor)
+
+
+@lru_cache(maxsize=None)
+def user_task_rows_query(
+    ordering: TaskOrdering, after_cursor: bool = False, fields: Optional[Tuple[str, ...]] = None
+) -> Select:
+    """Запрос страницы строк карточек пользователя, построенный один раз для сортировки и набора полей.
+
+    Кроме запрошенных колонок выбираются поля сортировки, нужные для курсора следующей страницы.
+
+    Args:
+        ordering (TaskOrdering): Сортировка.
+        after_cursor (bool): Страница после курсора.
+        fields (Optional[Tuple[str, ...]]): Колонки карточки (None - все колонки ответа).
+
+    Returns:
+        Select: Запрос.
+    """
+    columns = _read_columns(fields)
+    read_fields = {column.key for column in columns}
+    cursor_columns = [getattr(Task, field) for field in ordering.fields if field not in read_fields]
+    return _user_tasks_page(select(*columns, *cursor_columns), ordering, after_cursor)
+
+
+@lru_cache(maxsize=None)
+def user_task_query(fields: Optional[Tuple[str, ...]] = None) -> Select:
+    """Запрос карточки пользователя с загрузкой только запрошенных полей и версии (для ETag).
+
+    Args:
+        fields (Optional[Tuple[str, ...]]): Колонки карточки (None - вся карточка).
+
+    Returns:
+        Select: Запрос.
+    """
+    if fields is None:
+        return USER_TASK_QUERY
+    return USER_TASK_QUERY.options(load_only(*_read_columns(fields), Task.version))
+
+
+@lru_cache(maxsize=None)
+def user_task_row_query(fields: Optional[Tuple[str, ...]] = None) -> Select:
+    """Запрос строки карточки пользователя с запрошенными колонками и версией (для ETag).
+
+    Args:
+        fields (Optional[Tuple[str, ...]]): Колонки карточки (None - все колонки ответа).
+
+    Returns:
+        Select: Запрос.
+    """
+    if fields is None:
+        return USER_TASK_ROW_QUERY
+    columns = _read_columns(fields)
+    if 'version' not in fields:
+        columns = (*columns, Task.version)
+    return select(
+        *columns
+    ).where(
+        Task.user_id == bindparam('user_id'), Task.id == bindparam('task_id')
+    )
+
+
+def warm_up_queries() -> List[Tuple[Executable, dict]]:
+    """Самые частые запросы репозитория карточек для прогрева кэша подготовленных выражений.
+
+    Это те же объекты запросов, что выполняет репозиторий, а фиктивные параметры ничего не находят.
+
+    Returns:
+        List[Tuple[Executable, dict]]: Запросы и их параметры.
+    """
+    user_id = task_id = UUID(int=0)
+    ordering = parse_task_ordering(None)
+    page_params = {'user_id': user_id, 'limit': 10, 'offset': 0}
+    return [
+        (user_tasks_query(ordering), page_params),
+        (USER_TASK_QUERY, {'user_id': user_id, 'task_id': task_id}),
+        (user_task_rows_query(ordering), page_params),
+        (USER_TASK_ROW_QUERY, {'user_id': user_id, 'task_id': task_id}),
+        (TASK_STATS_QUERY, {'user_id': user_id}),
+    ]
+
+
+def _task_params(sample: QuerySample) -> dict:
+    """Параметры запросов одной карточки пользователя для образца данных."""
+    return {'user_id': sample.user_id, 'task_id': sample.task['id']}
+
+
+def _page_query(query: Select, ordering: TaskOrdering, after_cursor: bool):
+    """Фабрика запроса страницы карточек для проверки плана (курсор указывает на карточку образца)."""
+    def factory(sample: QuerySample) -> Tuple[Select, dict]:
+        params = {'user_id': sample.user_id, 'limit': 10, 'offset': 0}
+        if after_cursor:
+            params.update(ordering.cursor_params(ordering.make_cursor(sample.task)))
+        return query, params
+    return factory
+
+
+# Запросы репозитория для проверки планов выполнения (tests/functional_tests/test_query_plans.py).
+register_query('task.user_task', lambda sample: (USER_TASK_QUERY, _task_params(sample)))
+register_query('task.user_task_row', lambda sample: (USER_TASK_ROW_QUERY, _task_params(sample)))
+register_query('task.task_version', lambda sample: (TASK_VERSION_QUERY, _task_params(sample)))
+register_query('task.stats', lambda sample: (TASK_STATS_QUERY, {'user_id': sample.user_id}))
+register_query(
+    'task.stats_delta', lambda sample: (task_stats_delta_stmt(sample.user_id, total=1, change_seq=1), {})
+)
+register_query(
+    'task.user_tasks_by_ids',
+    lambda sample: (USER_TASKS_BY_IDS_QUERY, {'user_id': sample.user_id, 'task_ids': sample.task_ids}),
+)
+register_query(
+    'task.changes',
+    lambda sample: (
+        TASK_CHANGES_QUERY, {'user_id': sample.user_id, 'since': sample.task['change_seq'], 'limit': 101}
+    ),
+)
+register_query(
+    'task.tombstone_changes',
+    lambda sample: (TASK_TOMBSTONES_CHANGES_QUERY, {'user_id': sample.user_id, 'since': 0, 'limit': 101}),
+)
+register_query('task.delete', lambda sample: (delete_task_stmt(sample.user_id, sample.task['id']), {}))
+register_query(
+    'task.activity',
+    lambda sample: (
+        TASK_ACTIVITY_QUERY,
+        {'user_id': sample.user_id, 'date_from': date(2000, 1, 1), 'date_to': sample.task['created_at'].date()},
+    ),
+)
+register_query(
+    'task.pending_activity_users',
+    lambda sample: (PENDING_ACTIVITY_USERS_QUERY, {'after': UUID(int=0), 'limit': 500}),
+)
+register_query(
+    'task.delete_users_activity', lambda sample: (DELETE_USERS_ACTIVITY_STMT, {'user_ids': [sample.user_id]})
+)
+register_query(
+    'task.insert_users_activity', lambda sample: (INSERT_USERS_ACTIVITY_STMT, {'user_ids': [sample.user_id]})
+)
+register_query(
+    'task.insert_tombstone',
+    lambda sample: (task_tombstone_stmt(sample.task['id'], sample.user_id, sample.task['change_seq']), {}),
+)
+register_query(
+    'task.update',
+    lambda sample: (
+        update_task_stmt(sample.user_id, sample.task['id'], {'status': True}, change_seq=1, expected_version=1), {}
+    ),
+)
+for _ordering in TASK_ORDERINGS.values():
+    for _after_cursor in (False, True):
+        _suffix = f'{_ordering.name}, after cursor' if _after_cursor else _ordering.name
+        register_query(
+            f'task.user_tasks({_suffix})',
+            _page_query(user_tasks_query(_ordering, _after_cursor), _ordering, _after_cursor),
+        )
+        register_query(
+            f'task.user_task_rows({_suffix})',
+            _page_query(user_task_rows_query(_ordering, _after_cursor), _ordering, _after_cursor),
+        )
+
+# Суженный набор полей списка (fields=id,title,status) читает только эти колонки.
+_list_fields = ('id', 'title', 'status')
+_default_ordering = parse_task_ordering(None)
+register_query(
+    f'task.user_tasks({_default_ordering.name}, fields={",".join(_list_fields)})',
+    _page_query(user_tasks_query(_default_ordering, False, _list_fields), _default_ordering, False),
+)
+register_query(
+    f'task.user_task_rows({_default_ordering.name}, fields={",".join(_list_fields)})',
+    _page_query(user_task_rows_query(_default_ordering, False, _list_fields), _default_ordering, False),
+)
+register_query(
+    f'task.user_task(fields={",".join(_list_fields)})',
+    lambda sample: (user_task_query(_list_fields), _task_params(sample)),
+)
+register_query(
+    f'task.user_task_row(fields={",".join(_list_fields)})',
+    lambda sample: (user_task_row_query(_list_fields), _task_params(sample)),
+)
 
 
 class TaskRepositoryABC(ABC):
     """Интерфейс для репозитория карточек."""
 
     @abstractmethod
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, group_commit: bool = True):
         """Конструктор для репозитория карточек."""
         pass
 
@@ -23,22 +531,56 @@ class TaskRepositoryABC(ABC):
         """Метод создания карточки."""
         pass
 
+    @abstractmethod
+    async def create_many(self, rows: List[dict]) -> List[Task]:
+        """Создание нескольких карточек одним запросом."""
+        pass
+
     @abstractmethod
     async def get_all_by_user(
         self,
         user_id: UUID,
         pagination_limit: int,
         pagination_offset: int,
-        ordering: tuple
+        ordering: TaskOrdering,
+        cursor: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
     ) -> List[Task]:
         """Получаем все записи карточек заданий с заданным user_id."""
         pass
 
     @abstractmethod
-    async def get_user_task_by_id(self, user_id: UUID, task_id: UUID) -> Task:
+    async def get_user_task_by_id(
+        self, user_id: UUID, task_id: UUID, fields: Optional[Tuple[str, ...]] = None
+    ) -> Task:
         """Получаем конкретную карточку задания пользователя."""
         pass
 
+    @abstractmethod
+    async def get_task_rows_by_user(
+        self,
+        user_id: UUID,
+        pagination_limit: int,
+        pagination_offset: int,
+        ordering: TaskOrdering,
+        cursor: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> List[dict]:
+        """Получаем строки карточек заданий пользователя без ORM."""
+        pass
+
+    @abstractmethod
+    async def get_user_task_row_by_id(
+        self, user_id: UUID, task_id: UUID, fields: Optional[Tuple[str, ...]] = None
+    ) -> dict:
+        """Получаем строку конкретной карточки задания пользователя без ORM."""
+        pass
+
+    @abstractmethod
+    async def get_user_tasks_by_ids(self, user_id: UUID, task_ids: List[UUID]) -> List[Task]:
+        """Получаем карточки пользователя по списку id одним запросом."""
+        pass
+
     @abstractmethod
     async def delete_current_task(self, user_id: UUID, task_id: UUID) -> None:
         """Удаляем конкретную карточку задания пользователя."""
@@ -49,39 +591,186 @@ class TaskRepositoryABC(ABC):
         """Обновляем конкретную карточку задания пользователя."""
         pass
 
+    @abstractmethod
+    async def patch_current_task(
+        self,
+        user_id: UUID,
+        task_id: UUID,
+        task_data: dict,
+        expected_version: Optional[int] = None,
+    ) -> Task:
+        """Частично обновляем карточку задания пользователя."""
+        pass
+
+    @abstractmethod
+    async def get_stats(self, user_id: UUID) -> TaskStats:
+        """Получаем счетчики карточек пользователя."""
+        pass
+
+    @abstractmethod
+    async def get_changes(self, user_id: UUID, since: int, limit: int) -> Tuple[List[Task], List[TaskTombstone]]:
+        """Получаем измененные и удаленные карточки пользователя после номера изменения since."""
+        pass
+
+    @abstractmethod
+    async def get_activity(self, user_id: UUID, date_from: date, date_to: date) -> List[TaskActivity]:
+        """Получаем активность пользователя по дням."""
+        pass
+
 
+@trace_methods('repository')
 class TaskRepository(TaskRepositoryABC):
-    """Репозиторий карточек."""
+    """Репозиторий карточек.
+
+    Изменения только отправляются в БД, транзакцию фиксирует вызывающий код: в запросах -
+    unit_of_work сессии, в групповой записи - task_group_commit.
+    """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, group_commit: bool = True):
         """Конструктор для репозитория карточек.
 
         Args:
             session (AsyncSession): Сессия БД.
+            group_commit (bool): Создавать карточки групповой записью, если включен TASK_GROUP_COMMIT.
+                Групповая запись фиксирует карточку в своей транзакции, поэтому ее отключают,
+                когда создание должно войти в транзакцию вызывающего кода (например, пакетный запрос).
         """
         self.session = session
+        self.group_commit = group_commit
+
+    async def _publish(self, event: TaskEventType, task: Task):
+        """Публикуем событие изменения карточки через NOTIFY.
+
+        Уведомление доставляется слушателям только после коммита транзакции.
+
+        Args:
+            event (TaskEventType): Тип события.
+            task (Task): Карточка задания.
+        """
+        if not app_settings.task_events_enabled:
+            return
+        await self.session.execute(select(func.pg_notify(TASK_EVENTS_CHANNEL, task_event_payload(event, task))))
+
+    async def _apply_stats(self, user_id: UUID, total: int = 0, done: int = 0, change_seq: int = 0) -> int:
+        """Изменяем счетчики карточек пользователя в текущей транзакции.
+
+        Args:
+            user_id (UUID): id пользователя.
+            total (int): Изменение количества карточек.
+            done (int): Изменение количества выполненных карточек.
+            change_seq (int): Сколько номеров изменений выдать.
+
+        Returns:
+            int: Последний выданный номер изменения.
+        """
+        result = await self.session.execute(task_stats_delta_stmt(user_id, total, done, change_seq))
+        return result.scalar_one()
 
     async def create(self, data: dict) -> Task:
         """Метод создания карточки.
 
+        При TASK_GROUP_COMMIT карточка создается групповой записью: одновременные создания
+        карточек в одной БД объединяются в один INSERT и один коммит (см. task_group_commit).
+        Такая карточка фиксируется до возврата, независимо от транзакции сессии репозитория.
+
         Args:
             data (dict): Данные для создания.
 
         Returns:
             Task: Новая карточка.
         """
+        if app_settings.task_group_commit and self.group_commit:
+            return await task_group_commit(self.session.bind).submit(data)
+        data['change_seq'] = await self._apply_stats(
+            data['user_id'], total=1, done=int(data.get('status', False)), change_seq=1
+        )
+        if data.get('status'):
+            data['completed_at'] = func.now()
         new_task = Task(**data)
         self.session.add(new_task)
-        await self.session.commit()
+        await self.session.flush()
         await self.session.refresh(new_task)
+        await self._publish(TaskEventType.created, new_task)
         return new_task
 
+    async def create_many(self, rows: List[dict]) -> List[Task]:
+        """Создание нескольких карточек одним запросом INSERT ... RETURNING.
+
+        Счетчики и номера изменений каждого пользователя выдаются одним запросом на пользователя,
+        строки счетчиков блокируются в порядке id пользователей, чтобы параллельные пачки
+        не блокировали друг друга взаимно.
+
+        Args:
+            rows (List[dict]): Данные для создания карточек.
+
+        Returns:
+            List[Task]: Новые карточки в порядке rows.
+        """
+        values = [
+            {
+                'id': uuid4(),
+                'title': data['title'],
+                'description': data['description'],
+                'status': bool(data.get('status', False)),
+                'completed_at': func.now() if data.get('status') else None,
+                'user_id': data['user_id'],
+            }
+            for data in rows
+        ]
+        by_user = defaultdict(list)
+        for row in values:
+            by_user[row['user_id']].append(row)
+        for user_id in sorted(by_user):
+            user_rows = by_user[user_id]
+            last_seq = await self._apply_stats(
+                user_id, total=len(user_rows), done=sum(row['status'] for row in user_rows), change_seq=len(user_rows)
+            )
+            for offset, row in enumerate(user_rows):
+                row['change_seq'] = last_seq - len(user_rows) + 1 + offset
+        tasks = {task.id: task for task in await self.session.scalars(insert(Task).values(values).returning(Task))}
+        created = [tasks[row['id']] for row in values]
+        for task in created:
+            await self._publish(TaskEventType.created, task)
+        return created
+
+    @staticmethod
+    def _page(
+        query_builder: Callable[[TaskOrdering, bool, Optional[Tuple[str, ...]]], Select],
+        user_id: UUID,
+        limit: int,
+        offset: int,
+        ordering: TaskOrdering,
+        cursor: Optional[str],
+        fields: Optional[Tuple[str, ...]],
+    ) -> Tuple[Select, dict]:
+        """Запрос и параметры страницы карточек пользователя.
+
+        Args:
+            query_builder (Callable[[TaskOrdering, bool, Optional[Tuple[str, ...]]], Select]): Функция,
+                строящая запрос.
+            user_id (UUID): id пользователя.
+            limit (int): Количество элементов на странице.
+            offset (int): Смещение (после курсора - смещение от него).
+            ordering (TaskOrdering): Сортировка.
+            cursor (Optional[str]): Курсор.
+            fields (Optional[Tuple[str, ...]]): Колонки карточки.
+
+        Returns:
+            Tuple[Select, dict]: Запрос и параметры.
+        """
+        params = {'user_id': user_id, 'limit': limit, 'offset': offset}
+        if cursor:
+            params.update(ordering.cursor_params(cursor))
+        return query_builder(ordering, bool(cursor), fields), params
+
     async def get_all_by_user(
         self,
         user_id: UUID,
         pagination_limit: int,
         pagination_offset: int,
-        ordering: list
+        ordering: TaskOrdering,
+        cursor: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
     ) -> List[Task]:
         """Получаем все записи карточек заданий с заданным user_id.
 
@@ -89,31 +778,29 @@ class TaskRepository(TaskRepositoryABC):
             user_id (UUID): id Пользователя.
             pagination_limit (int): Количество элементов на странице.
             pagination_offset (int): Номер страницы.
-            ordering (list): Порядок сортировки.
+            ordering (TaskOrdering): Сортировка.
+            cursor (Optional[str]): Курсор, после которого начинается страница.
+            fields (Optional[Tuple[str, ...]]): Загружаемые колонки карточки (None - все).
 
         Returns:
             List[Task]: Список карточек заданий.
         """
-        query = select(
-            Task
-        ).where(
-            Task.user_id == user_id
-        ).order_by(
-            *ordering
-        ).limit(
-            pagination_limit
-        ).offset(
-            pagination_offset
+        query, params = self._page(
+            user_tasks_query, user_id, pagination_limit, pagination_offset, ordering, cursor, fields
         )
-        result = await self.session.execute(query)
+        result = await self.session.execute(query, params)
         return result.scalars().all()
 
-    async def get_user_task_by_id(self, user_id: UUID, task_id: UUID) -> Task:
+    async def get_user_task_by_id(
+        self, user_id: UUID, task_id: UUID, fields: Optional[Tuple[str, ...]] = None
+    ) -> Task:
         """Получаем конкретную карточку задания пользователя.
 
         Args:
             user_id (UUID): id пользователя.
             task_id (UUID): id карточки задания.
+            fields (Optional[Tuple[str, ...]]): Загружаемые колонки карточки (None - все, версия
+                загружается всегда).
 
         Raises:
             HTTPException: Карточка не найдена.
@@ -121,8 +808,7 @@ class TaskRepository(TaskRepositoryABC):
         Returns:
             Task: Карточка задания.
         """
-        query = select(Task).where(Task.user_id == user_id, Task.id == task_id)
-        result = await self.session.execute(query)
+        result = await self.session.execute(user_task_query(fields), {'user_id': user_id, 'task_id': task_id})
         task = result.scalar_one_or_none()
         if task is None:
             raise HTTPException(
@@ -130,35 +816,257 @@ class TaskRepository(TaskRepositoryABC):
             )
         return task
 
+    async def get_task_rows_by_user(
+        self,
+        user_id: UUID,
+        pagination_limit: int,
+        pagination_offset: int,
+        ordering: TaskOrdering,
+        cursor: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> List[dict]:
+        """Получаем строки карточек заданий пользователя без ORM (только колонки ответа).
+
+        Args:
+            user_id (UUID): id Пользователя.
+            pagination_limit (int): Количество элементов на странице.
+            pagination_offset (int): Номер страницы.
+            ordering (TaskOrdering): Сортировка.
+            cursor (Optional[str]): Курсор, после которого начинается страница.
+            fields (Optional[Tuple[str, ...]]): Читаемые колонки карточки (None - все колонки ответа).
+
+        Returns:
+            List[dict]: Строки карточек заданий (с полями сортировки).
+        """
+        query, params = self._page(
+            user_task_rows_query, user_id, pagination_limit, pagination_offset, ordering, cursor, fields
+        )
+        result = await self.session.execute(query, params)
+        return [dict(row) for row in result.mappings()]
+
+    async def get_user_task_row_by_id(
+        self, user_id: UUID, task_id: UUID, fields: Optional[Tuple[str, ...]] = None
+    ) -> dict:
+        """Получаем строку конкретной карточки задания пользователя без ORM.
+
+        Args:
+            user_id (UUID): id пользователя.
+            task_id (UUID): id карточки задания.
+            fields (Optional[Tuple[str, ...]]): Читаемые колонки карточки (None - все колонки ответа,
+                версия читается всегда).
+
+        Raises:
+            HTTPException: Карточка не найдена.
+
+        Returns:
+            dict: Строка карточки задания.
+        """
+        result = await self.session.execute(user_task_row_query(fields), {'user_id': user_id, 'task_id': task_id})
+        row = result.mappings().one_or_none()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        return dict(row)
+
+    async def get_user_tasks_by_ids(self, user_id: UUID, task_ids: List[UUID]) -> List[Task]:
+        """Получаем карточки пользователя по списку id одним запросом WHERE id = ANY(...).
+
+        Args:
+            user_id (UUID): id пользователя.
+            task_ids (List[UUID]): id карточек заданий.
+
+        Returns:
+            List[Task]: Найденные карточки (порядок не гарантирован).
+        """
+        result = await self.session.execute(USER_TASKS_BY_IDS_QUERY, {'user_id': user_id, 'task_ids': task_ids})
+        return result.scalars().all()
+
     async def delete_current_task(self, user_id: UUID, task_id: UUID) -> None:
         """Удаляем конкретную карточку задания пользователя.
 
+        Строка счетчиков блокируется до строки карточки, как при создании и обновлении, поэтому
+        параллельные изменение и удаление одной карточки не блокируют друг друга взаимно.
+
         Args:
             user_id (UUID): id Пользователя.
             task_id (UUID): id карточки задания.
         """
-        stmt = delete(Task).where(Task.user_id == user_id, Task.id == task_id)
-        await self.session.execute(stmt)
-        await self.session.commit()
+        change_seq = await self._apply_stats(user_id, change_seq=1)
+        result = await self.session.execute(delete_task_stmt(user_id, task_id))
+        deleted_task = result.one_or_none()
+        if deleted_task is not None:
+            await self._apply_stats(user_id, total=-1, done=-int(deleted_task.status))
+            await self.session.execute(task_tombstone_stmt(deleted_task.id, user_id, change_seq))
+            await self._publish(TaskEventType.deleted, deleted_task)
 
-    async def update_current_task(self, user_id: UUID, task_id: UUID, task_data: dict) -> Task:
-        """Обновляем конкретную карточку задания пользователя.
+    async def _update_task(
+        self,
+        user_id: UUID,
+        task_id: UUID,
+        task_data: dict,
+        expected_version: Optional[int] = None,
+    ) -> Task:
+        """Обновляем карточку одним запросом UPDATE ... RETURNING и увеличиваем ее версию.
+
+        Если передана ожидаемая версия, она проверяется в условии того же UPDATE, поэтому
+        параллельные изменения не затирают друг друга без предварительного чтения карточки.
 
         Args:
             user_id (UUID): id Пользователя.
             task_id (UUID): id карточки задания.
             task_data (dict): Данные для обновления.
+            expected_version (Optional[int]): Ожидаемая версия карточки (None - без проверки).
+
+        Raises:
+            HTTPException: Карточка не найдена или ее версия изменилась.
 
         Returns:
             Task: карточка задания.
         """
-        stmt = update(Task).where(Task.user_id == user_id, Task.id == task_id).values(**task_data).returning(Task)
+        change_seq = await self._apply_stats(user_id, change_seq=1)
+        stmt = update_task_stmt(user_id, task_id, task_data, change_seq, expected_version)
         result = await self.session.execute(stmt)
-        await self.session.commit()
-        task = result.scalar_one_or_none()
-        if task is None:
+        row = result.one_or_none()
+        if row is None:
+            current_version = None
+            if expected_version is not None:
+                current_version = (await self.session.execute(
+                    TASK_VERSION_QUERY, {'user_id': user_id, 'task_id': task_id}
+                )).scalar_one_or_none()
+            if current_version is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_412_PRECONDITION_FAILED,
+                    detail='Task version mismatch',
+                    headers={'ETag': make_etag(current_version)},
+                )
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='Task not found'
             )
+        task = row.Task
+        if task.status != row.old_status:
+            await self._apply_stats(user_id, done=1 if task.status else -1)
+        await self._publish(TaskEventType.updated, task)
         return task
+
+    async def update_current_task(self, user_id: UUID, task_id: UUID, task_data: dict) -> Task:
+        """Обновляем конкретную карточку задания пользователя.
+
+        Args:
+            user_id (UUID): id Пользователя.
+            task_id (UUID): id карточки задания.
+            task_data (dict): Данные для обновления.
+
+        Returns:
+            Task: карточка задания.
+        """
+        return await self._update_task(user_id, task_id, task_data)
+
+    async def patch_current_task(
+        self,
+        user_id: UUID,
+        task_id: UUID,
+        task_data: dict,
+        expected_version: Optional[int] = None,
+    ) -> Task:
+        """Частично обновляем карточку задания пользователя.
+
+        Args:
+            user_id (UUID): id Пользователя.
+            task_id (UUID): id карточки задания.
+            task_data (dict): Только изменяемые поля.
+            expected_version (Optional[int]): Версия из заголовка If-Match (None - без проверки).
+
+        Returns:
+            Task: карточка задания.
+        """
+        return await self._update_task(user_id, task_id, task_data, expected_version)
+
+    async def get_changes(self, user_id: UUID, since: int, limit: int) -> Tuple[List[Task], List[TaskTombstone]]:
+        """Получаем измененные и удаленные карточки пользователя после номера изменения since.
+
+        Оба запроса идут по индексам (user_id, change_seq), поэтому их стоимость зависит от
+        количества изменений, а не от количества карточек. Каждый список ограничен limit + 1,
+        чтобы вызывающий код мог понять, есть ли изменения за пределами страницы.
+
+        Args:
+            user_id (UUID): id пользователя.
+            since (int): Номер изменения, после которого ищем изменения.
+            limit (int): Максимальное количество изменений.
+
+        Returns:
+            Tuple[List[Task], List[TaskTombstone]]: Измененные карточки и следы удаленных.
+        """
+        params = {'user_id': user_id, 'since': since, 'limit': limit + 1}
+        tasks = (await self.session.execute(TASK_CHANGES_QUERY, params)).scalars().all()
+        tombstones = (await self.session.execute(TASK_TOMBSTONES_CHANGES_QUERY, params)).scalars().all()
+        return tasks, tombstones
+
+    async def get_activity(self, user_id: UUID, date_from: date, date_to: date) -> List[TaskActivity]:
+        """Получаем активность пользователя по дням из предрассчитанной таблицы task_activity.
+
+        Запрос читает диапазон первичного ключа (user_id, day) и не обращается к таблице task.
+        Дни без созданных и выполненных карточек в таблице отсутствуют.
+
+        Args:
+            user_id (UUID): id пользователя.
+            date_from (date): Первый день.
+            date_to (date): Последний день (включительно).
+
+        Returns:
+            List[TaskActivity]: Строки активности по возрастанию дня.
+        """
+        params = {'user_id': user_id, 'date_from': date_from, 'date_to': date_to}
+        return (await self.session.execute(TASK_ACTIVITY_QUERY, params)).scalars().all()
+
+    async def get_stats(self, user_id: UUID) -> TaskStats:
+        """Получаем счетчики карточек пользователя одним чтением строки по первичному ключу.
+
+        Args:
+            user_id (UUID): id пользователя.
+
+        Returns:
+            TaskStats: Счетчики карточек (нулевые, если у пользователя еще не было карточек).
+        """
+        result = await self.session.execute(TASK_STATS_QUERY, {'user_id': user_id})
+        stats = result.scalar_one_or_none()
+        if stats is None:
+            return TaskStats(user_id=user_id, total=0, done=0, change_seq=0)
+        return stats
+
+
+_task_group_commits: Dict[AsyncEngine, GroupCommit[dict, Task]] = {}
+
+
+def task_group_commit(bind: AsyncEngine) -> GroupCommit[dict, Task]:
+    """Групповая запись создаваемых карточек в БД движка bind.
+
+    Пачка пишется в отдельной сессии: TaskRepository.create_many и один коммит, после которого
+    каждый вызывающий получает свою карточку. Частота коммитов (и fsync журнала PostgreSQL)
+    при всплесках создания перестает расти вместе с числом запросов.
+
+    Args:
+        bind (AsyncEngine): Движок БД с карточками пользователя.
+
+    Returns:
+        GroupCommit[dict, Task]: Групповая запись этой БД.
+    """
+    group_commit = _task_group_commits.get(bind)
+    if group_commit is None:
+        session_maker = async_sessionmaker(bind, expire_on_commit=False)
+
+        async def write(rows: List[dict]) -> List[Task]:
+            async with session_maker() as session, session.begin():
+                return await TaskRepository(session).create_many(rows)
+
+        group_commit = GroupCommit(
+            write, app_settings.task_group_commit_window_ms / 1000, app_settings.task_group_commit_max_size
+        )
+        _task_group_commits[bind] = group_commit
+    return group_commit
+
+
+async def close_task_group_commits():
+    """Дописываем накопленные карточки групповых записей перед закрытием соединений с БД."""
+    await asyncio.gather(*(group_commit.close() for group_commit in _task_group_commits.values()))
@@ -1,6 +1,7 @@
 __all__ = (
     'RegistrationInputSchema',
     'RegistrationOutputSchema',
+    'AvailabilityOutputSchema',
     'LoginInputSchema',
     'VerifyInputSchema',
     'TokenSchema',
@@ -12,14 +13,30 @@ __all__ = (
     'TaskRetrieveOutputSchema',
     'TaskUpdateInputSchema',
     'TaskUpdateOutputSchema',
+    'TaskPatchInputSchema',
+    'TaskEventType',
+    'TaskEventSchema',
+    'TaskSyncOutputSchema',
+    'TaskChangesOutputSchema',
+    'TaskStatsOutputSchema',
+    'TaskActivityOutputSchema',
+    'BatchMethod',
+    'BatchOperationSchema',
+    'BatchInputSchema',
+    'BatchResultSchema',
+    'BatchOutputSchema',
 )
 
 
 from .auth_schemas import (
-    RegistrationInputSchema, RegistrationOutputSchema, LoginInputSchema, VerifyInputSchema, TokenSchema,
-    LoginOutputSchema, TokenType
+    RegistrationInputSchema, RegistrationOutputSchema, AvailabilityOutputSchema, LoginInputSchema, VerifyInputSchema,
+    TokenSchema, LoginOutputSchema, TokenType
 )
 from .task_schemas import (
     TaskCreateInputSchema, TaskCreateOutputSchema, TaskListOutputSchema, TaskRetrieveOutputSchema,
-    TaskUpdateInputSchema, TaskUpdateOutputSchema,
+    TaskUpdateInputSchema, TaskUpdateOutputSchema, TaskPatchInputSchema, TaskEventType, TaskEventSchema,
+    TaskSyncOutputSchema, TaskChangesOutputSchema, TaskStatsOutputSchema, TaskActivityOutputSchema,
+)
+from .batch_schemas import (
+    BatchMethod, BatchOperationSchema, BatchInputSchema, BatchResultSchema, BatchOutputSchema,
 )
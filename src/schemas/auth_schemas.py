@@ -1,6 +1,6 @@
 from enum import Enum
 from uuid import UUID
-from typing import Union
+from typing import Optional, Union
 
 from fastapi import HTTPException, status
 from password_validator import PasswordValidator
@@ -40,6 +40,13 @@ class RegistrationOutputSchema(BaseModel):
     email: EmailStr
 
 
+class AvailabilityOutputSchema(BaseModel):
+    """Схема выходных данных проверки, свободны ли логин и email."""
+
+    username: Optional[bool] = None
+    email: Optional[bool] = None
+
+
 class LoginInputSchema(BaseModel):
     """Схема входных данных при входе."""
 
@@ -0,0 +1,46 @@
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+BATCH_MAX_OPERATIONS = 100
+
+
+class BatchMethod(Enum):
+    """Енам HTTP-методов операций пакетного запроса."""
+
+    get = 'GET'
+    post = 'POST'
+    put = 'PUT'
+    patch = 'PATCH'
+    delete = 'DELETE'
+
+
+class BatchOperationSchema(BaseModel):
+    """Схема одной операции пакетного запроса."""
+
+    method: BatchMethod
+    path: str = Field(description='Путь маршрута карточек, например /tasks или /tasks/{task_id}')
+    body: Optional[Dict[str, Any]] = None
+    if_match: Optional[str] = None
+
+
+class BatchInputSchema(BaseModel):
+    """Схема входных данных пакетного запроса."""
+
+    operations: List[BatchOperationSchema] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
+
+
+class BatchResultSchema(BaseModel):
+    """Схема результата одной операции пакетного запроса."""
+
+    status: int
+    body: Optional[Any] = None
+    headers: Dict[str, str] = {}
+
+
+class BatchOutputSchema(BaseModel):
+    """Схема выходных данных пакетного запроса (результаты в порядке операций)."""
+
+    results: List[BatchResultSchema]
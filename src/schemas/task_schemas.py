@@ -1,5 +1,7 @@
+from enum import Enum
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -21,6 +23,7 @@ class BaseTaskOutputSchema(BaseModel):
     description: str
     status: bool
     created_at: datetime
+    version: int
 
 
 class TaskCreateInputSchema(BaseTaskInputSchema):
@@ -55,7 +58,67 @@ class TaskUpdateInputSchema(BaseTaskInputSchema):
     status: bool
 
 
+class TaskPatchInputSchema(BaseModel):
+    """Схема входных данных при частичном обновлении карточки задания."""
+
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[bool] = None
+
+
 class TaskUpdateOutputSchema(BaseTaskOutputSchema):
     """Схема выходных данных при обновлении конкретной карточки задания."""
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class TaskEventType(Enum):
+    """Енам типов событий изменения карточки задания."""
+
+    created = 'created'
+    updated = 'updated'
+    deleted = 'deleted'
+
+
+class TaskEventSchema(BaseModel):
+    """Схема события изменения карточки задания для ленты изменений."""
+
+    event: TaskEventType
+    id: UUID
+    user_id: UUID
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
+
+class TaskSyncOutputSchema(BaseTaskOutputSchema):
+    """Схема измененной карточки задания при синхронизации."""
+
+    model_config = ConfigDict(from_attributes=True)
+    updated_at: datetime
+
+
+class TaskChangesOutputSchema(BaseModel):
+    """Схема изменений карточек заданий пользователя с момента токена синхронизации."""
+
+    changed: List[TaskSyncOutputSchema]
+    deleted: List[UUID]
+    next_token: str
+    has_more: bool
+
+
+class TaskStatsOutputSchema(BaseModel):
+    """Схема счетчиков карточек заданий пользователя."""
+
+    total: int
+    done: int
+    open: int
+
+
+class TaskActivityOutputSchema(BaseModel):
+    """Схема активности пользователя за день."""
+
+    day: date
+    created: int
+    completed: int
@@ -0,0 +1,68 @@
+"""Точка входа API для продакшена: python serve.py.
+
+Запускает WEB_CONCURRENCY воркеров (по умолчанию по одному на ядро) под gunicorn с
+воркерами uvicorn, а если gunicorn не установлен - под менеджером процессов uvicorn.
+uvloop и httptools используются, если установлены. По SIGTERM воркеры перестают принимать
+соединения и дорабатывают текущие запросы WEB_GRACEFUL_TIMEOUT секунд.
+
+Адрес клиента (для лимитов запросов по IP) берется из X-Forwarded-For, только если запрос
+пришел с адреса из FORWARDED_ALLOW_IPS - прокси перед API. Иначе за прокси все клиенты
+получили бы его адрес и один общий лимит.
+"""
+from importlib.util import find_spec
+
+import uvicorn
+
+from config import app_settings
+
+
+APP = 'main:app'
+
+
+def run_gunicorn():
+    """Запускаем API под gunicorn.
+
+    При WEB_PRELOAD приложение импортируется в мастер-процессе до форка, и воркеры делят
+    память импортированных модулей. Пулы соединений с БД и клиент Redis создают соединения
+    лениво, поэтому в мастере ни одного соединения не открывается.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{app_settings.web_host}:{app_settings.web_port}')
+            self.cfg.set('workers', app_settings.web_workers)
+            self.cfg.set('worker_class', 'uvicorn.workers.UvicornWorker')
+            self.cfg.set('preload_app', app_settings.web_preload)
+            self.cfg.set('graceful_timeout', app_settings.web_graceful_timeout)
+            self.cfg.set('forwarded_allow_ips', app_settings.forwarded_allow_ips)
+            self.cfg.set('accesslog', '-')
+
+        def load(self):
+            from main import app
+
+            return app
+
+    Application().run()
+
+
+def run_uvicorn():
+    """Запускаем API под менеджером процессов uvicorn (без предзагрузки приложения)."""
+    uvicorn.run(
+        APP,
+        host=app_settings.web_host,
+        port=app_settings.web_port,
+        workers=app_settings.web_workers,
+        loop='auto',
+        http='auto',
+        timeout_graceful_shutdown=app_settings.web_graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=app_settings.forwarded_allow_ips,
+    )
+
+
+if __name__ == '__main__':
+    if find_spec('gunicorn') is not None:
+        run_gunicorn()
+    else:
+        run_uvicorn()
@@ -2,8 +2,14 @@ __all__ = (
     'AuthService',
     'get_auth_service',
     'TaskService',
-    'get_task_service'
+    'get_task_service',
+    'BatchService',
+    'get_batch_service',
+    'task_event_broker',
+    'task_event_stream',
 )
 
 from .auth_service import AuthService, get_auth_service
 from .task_service import TaskService, get_task_service
+from .batch_service import BatchService, get_batch_service
+from .task_events import task_event_broker, task_event_stream
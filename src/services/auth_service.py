@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from random import randint
+from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import BackgroundTasks, Depends, HTTPException, status
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -9,9 +10,12 @@ from config import app_settings
 from db import get_async_session
 from repository import AuthRepository
 from schemas import RegistrationInputSchema, LoginInputSchema, VerifyInputSchema
-from tasks import send_email
+from utils import SEND_EMAIL_TASK, send_task
+from utils.tracing import trace_methods
 from models import User
 
+from .user_availability import USER_LOGIN_FIELDS, user_availability_filter
+
 
 class AuthServiceABC(ABC):
     """Интерфейс сервиса для аутентификации и регистрации."""
@@ -27,7 +31,12 @@ class AuthServiceABC(ABC):
         pass
 
     @abstractmethod
-    async def login(self, login_data: LoginInputSchema) -> User:
+    async def check_availability(self, username: Optional[str], email: Optional[str]) -> dict:
+        """Проверка, свободны ли логин и email."""
+        pass
+
+    @abstractmethod
+    async def login(self, login_data: LoginInputSchema, background_tasks: BackgroundTasks) -> User:
         """Вход пользователя."""
         pass
 
@@ -37,6 +46,7 @@ class AuthServiceABC(ABC):
         pass
 
 
+@trace_methods('service')
 class AuthService(AuthServiceABC):
     """Сервис аутентификации и регистрации."""
 
@@ -53,13 +63,50 @@ class AuthService(AuthServiceABC):
             User: Пользователь
         """
         new_user = await self.repository.register(user_data.model_dump())
+        user_availability_filter.add(new_user.username, new_user.email)
         return new_user
 
-    async def login(self, login_data: LoginInputSchema) -> User:
+    async def check_availability(self, username: Optional[str], email: Optional[str]) -> dict:
+        """Проверка, свободны ли логин и email.
+
+        Значение, которого нет в фильтре Блума, свободно без обращения к БД. Остальные значения
+        проверяются запросом по уникальному индексу.
+
+        Args:
+            username (Optional[str]): Логин.
+            email (Optional[str]): Email.
+
+        Raises:
+            HTTPException: Не передан ни логин, ни email.
+
+        Returns:
+            dict: Для каждого переданного поля - свободно ли оно.
+        """
+        if username is None and email is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Передайте username или email'
+            )
+        await user_availability_filter.refresh(self.repository)
+        result = {}
+        for field, value in zip(USER_LOGIN_FIELDS, (username, email)):
+            if value is None:
+                continue
+            if user_availability_filter.might_exist(field, value):
+                result[field] = not await self.repository.user_exists(field, value)
+            else:
+                result[field] = True
+        return result
+
+    async def login(self, login_data: LoginInputSchema, background_tasks: BackgroundTasks) -> User:
         """Вход в систему
 
+        Письмо с кодом ставится в очередь фоновой задачей запроса, то есть после фиксации
+        транзакции с кодом (unit_of_work): код, который не сохранился, не отправляется.
+
         Args:
             login_data (LoginInputSchema): Данные для входа
+            background_tasks (BackgroundTasks): Фоновые задачи запроса.
         """
         current_user = await self.repository.login(login_data.model_dump())
         await self.repository.delete_user_code(current_user.id)
@@ -71,7 +118,9 @@ class AuthService(AuthServiceABC):
         user_code = await self.repository.create_user_code(user_code_data)
         subject = 'Двухфакторная аутентификация'
         body = f'Код для двухфакторной аутентификации: {user_code.code}'
-        send_email.delay(
+        background_tasks.add_task(
+            send_task,
+            SEND_EMAIL_TASK,
             app_settings.smtp_server,
             app_settings.smtp_port,
             app_settings.smtp_username,
@@ -0,0 +1,190 @@
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, status
+
+from pydantic import BaseModel, ValidationError
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import User, Task
+from schemas import (
+    BatchMethod, BatchOperationSchema, TaskCreateInputSchema, TaskCreateOutputSchema, TaskPatchInputSchema,
+    TaskRetrieveOutputSchema, TaskUpdateInputSchema, TaskUpdateOutputSchema,
+)
+from utils import get_task_session, make_etag
+from utils.tracing import trace_methods
+
+from .task_service import TaskService
+
+
+TASK_PATH = re.compile(r'^(?:/api)?/tasks(?:/(?P<task_id>[^/]+))?/?$')
+
+
+class BatchServiceABC(ABC):
+    """Интерфейс сервиса пакетных запросов."""
+
+    @abstractmethod
+    def __init__(self, session: AsyncSession):
+        """Конструктор для сервиса пакетных запросов."""
+        pass
+
+    @abstractmethod
+    async def execute(self, user: User, operations: List[BatchOperationSchema]) -> List[dict]:
+        """Выполняем операции пакетного запроса."""
+        pass
+
+
+@trace_methods('service')
+class BatchService(BatchServiceABC):
+    """Сервис пакетных запросов к карточкам.
+
+    Все операции выполняются от имени одного пользователя в одной сессии и одной транзакции.
+    Каждая изменяющая операция выполняется в своей точке сохранения, поэтому ошибка одной
+    операции не отменяет остальные. Подряд идущие чтения карточек объединяются в один запрос.
+    """
+
+    def __init__(self, session: AsyncSession):
+        """Конструктор для сервиса пакетных запросов.
+
+        Args:
+            session (AsyncSession): Сессия БД с карточками пользователя.
+        """
+        self.session = session
+        self.task_service = TaskService(session, group_commit=False)
+
+    @staticmethod
+    def _result(status_code: int, body: Optional[object] = None, headers: Optional[dict] = None) -> dict:
+        return {'status': status_code, 'body': body, 'headers': headers or {}}
+
+    @classmethod
+    def _error(cls, error: HTTPException) -> dict:
+        return cls._result(error.status_code, {'detail': error.detail}, error.headers)
+
+    @classmethod
+    def _task_result(cls, status_code: int, task: Task, schema: type) -> dict:
+        body = schema.model_validate(task, from_attributes=True).model_dump(mode='json')
+        return cls._result(status_code, body, {'ETag': make_etag(task.version)})
+
+    @staticmethod
+    def _resolve(operation: BatchOperationSchema) -> Optional[UUID]:
+        """Определяем маршрут операции.
+
+        Args:
+            operation (BatchOperationSchema): Операция.
+
+        Raises:
+            HTTPException: Маршрут не найден или метод не поддерживается.
+
+        Returns:
+            Optional[UUID]: id карточки из пути (None для /tasks).
+        """
+        match = TASK_PATH.match(operation.path)
+        if match is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Not Found')
+        task_id = match.group('task_id')
+        if (task_id is None) != (operation.method is BatchMethod.post):
+            raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED, detail='Method Not Allowed')
+        if task_id is None:
+            return None
+        try:
+            return UUID(task_id)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='Invalid task id')
+
+    async def _get_tasks(self, user: User, operations: List[Tuple[int, UUID]], results: List[Optional[dict]]):
+        """Выполняем накопленные чтения карточек одним запросом.
+
+        Args:
+            user (User): Текущий пользователь.
+            operations (List[Tuple[int, UUID]]): Номера операций и id карточек.
+            results (List[Optional[dict]]): Результаты операций.
+        """
+        if not operations:
+            return
+        tasks = await self.task_service.get_user_tasks_by_ids(user, list({task_id for _, task_id in operations}))
+        tasks_by_id = {task.id: task for task in tasks}
+        for index, task_id in operations:
+            task = tasks_by_id.get(task_id)
+            if task is None:
+                results[index] = self._result(status.HTTP_404_NOT_FOUND, {'detail': 'Not Found'})
+            else:
+                results[index] = self._task_result(status.HTTP_200_OK, task, TaskRetrieveOutputSchema)
+
+    async def _write(self, user: User, operation: BatchOperationSchema, task_id: Optional[UUID]) -> dict:
+        """Выполняем изменяющую операцию в точке сохранения.
+
+        Args:
+            user (User): Текущий пользователь.
+            operation (BatchOperationSchema): Операция.
+            task_id (Optional[UUID]): id карточки.
+
+        Returns:
+            dict: Результат операции.
+        """
+        input_schemas = {
+            BatchMethod.post: TaskCreateInputSchema,
+            BatchMethod.put: TaskUpdateInputSchema,
+            BatchMethod.patch: TaskPatchInputSchema,
+        }
+        task_data: Optional[BaseModel] = None
+        if operation.method in input_schemas:
+            try:
+                task_data = input_schemas[operation.method].model_validate(operation.body or {})
+            except ValidationError as error:
+                body = {'detail': json.loads(error.json(include_url=False))}
+                return self._result(status.HTTP_422_UNPROCESSABLE_ENTITY, body)
+        try:
+            async with self.session.begin_nested():
+                if operation.method is BatchMethod.post:
+                    task = await self.task_service.create(user, task_data)
+                    return self._task_result(status.HTTP_201_CREATED, task, TaskCreateOutputSchema)
+                if operation.method is BatchMethod.put:
+                    task = await self.task_service.update_current_task(user, task_id, task_data)
+                    return self._task_result(status.HTTP_200_OK, task, TaskUpdateOutputSchema)
+                if operation.method is BatchMethod.patch:
+                    task = await self.task_service.patch_current_task(user, task_id, task_data, operation.if_match)
+                    return self._task_result(status.HTTP_200_OK, task, TaskUpdateOutputSchema)
+                await self.task_service.delete_current_task(user, task_id)
+                return self._result(status.HTTP_204_NO_CONTENT)
+        except HTTPException as error:
+            return self._error(error)
+
+    async def execute(self, user: User, operations: List[BatchOperationSchema]) -> List[dict]:
+        """Выполняем операции пакетного запроса по порядку в транзакции запроса.
+
+        Чтения, идущие подряд, откладываются до следующей изменяющей операции и выполняются
+        одним запросом WHERE id = ANY(...), поэтому видят изменения предыдущих операций.
+
+        Args:
+            user (User): Текущий пользователь.
+            operations (List[BatchOperationSchema]): Операции.
+
+        Returns:
+            List[dict]: Результаты в порядке операций.
+        """
+        results: List[Optional[dict]] = [None] * len(operations)
+        pending_reads: List[Tuple[int, UUID]] = []
+        for index, operation in enumerate(operations):
+            try:
+                task_id = self._resolve(operation)
+            except HTTPException as error:
+                results[index] = self._error(error)
+                continue
+            if operation.method is BatchMethod.get:
+                pending_reads.append((index, task_id))
+                continue
+            await self._get_tasks(user, pending_reads, results)
+            pending_reads = []
+            results[index] = await self._write(user, operation, task_id)
+        await self._get_tasks(user, pending_reads, results)
+        return results
+
+
+def get_batch_service(
+    session: AsyncSession = Depends(get_task_session),
+) -> BatchService:
+    return BatchService(session)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, List, Set
+from uuid import UUID
+
+import asyncpg
+
+from fastapi import Request
+
+from db.sharding import task_database_dsns
+from repository.task_repository import TASK_EVENTS_CHANNEL
+
+
+SUBSCRIBER_QUEUE_SIZE = 100
+KEEPALIVE_INTERVAL = 15
+RECONNECT_DELAY = 1
+
+
+class TaskEventBroker:
+    """Раздача событий изменения карточек подписчикам текущего процесса.
+
+    Процесс держит по одному соединению LISTEN на каждую БД с карточками и раскладывает
+    уведомления по очередям подписчиков в памяти, поэтому число подписчиков не влияет на
+    число соединений с БД.
+    """
+
+    def __init__(self, channel: str):
+        """Конструктор брокера.
+
+        Args:
+            channel (str): Канал NOTIFY.
+        """
+        self.channel = channel
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._connections: List[asyncpg.Connection] = []
+        self._start_lock = asyncio.Lock()
+        self._started = False
+
+    async def start(self):
+        """Подключаемся ко всем БД с карточками и подписываемся на канал."""
+        async with self._start_lock:
+            if self._started:
+                return
+            try:
+                for dsn in task_database_dsns():
+                    await self._listen(dsn)
+            except Exception:
+                await self.stop()
+                raise
+            self._started = True
+
+    async def _listen(self, dsn: str):
+        """Открываем соединение LISTEN к одной БД.
+
+        Args:
+            dsn (str): DSN БД.
+        """
+        connection = await asyncpg.connect(dsn)
+        await connection.add_listener(self.channel, self._on_notify)
+        connection.add_termination_listener(lambda conn: self._on_terminated(conn, dsn))
+        self._connections.append(connection)
+
+    def _on_terminated(self, connection: asyncpg.Connection, dsn: str):
+        """Переподключаемся при потере соединения, пока брокер запущен."""
+        if connection in self._connections:
+            self._connections.remove(connection)
+        if self._started:
+            asyncio.get_running_loop().create_task(self._reconnect(dsn))
+
+    async def _reconnect(self, dsn: str):
+        """Повторяем подключение к БД, пока оно не удастся или брокер не остановят."""
+        while self._started:
+            try:
+                await self._listen(dsn)
+                return
+            except (OSError, asyncpg.PostgresError):
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def stop(self):
+        """Закрываем соединения LISTEN."""
+        self._started = False
+        connections, self._connections = self._connections, []
+        for connection in connections:
+            await connection.close()
+
+    def _on_notify(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str):
+        """Раскладываем уведомление по очередям подписчиков владельца карточки.
+
+        Сообщение SSE форматируется один раз и общее для всех подписчиков.
+        """
+        event = json.loads(payload)
+        subscribers = self._subscribers.get(event['user_id'])
+        if not subscribers:
+            return
+        message = f'event: {event["event"]}\ndata: {payload}\n\n'
+        for queue in subscribers:
+            if queue.full():
+                # Медленный подписчик теряет самое старое событие, а не тормозит остальных.
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: UUID) -> AsyncGenerator[asyncio.Queue, None]:
+        """Подписываемся на события карточек пользователя.
+
+        Args:
+            user_id (UUID): id пользователя.
+
+        Returns:
+            AsyncGenerator[asyncio.Queue, None]: Очередь сообщений SSE.
+        """
+        await self.start()
+        key = str(user_id)
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[key].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[key].discard(queue)
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+
+
+task_event_broker = TaskEventBroker(TASK_EVENTS_CHANNEL)
+
+
+async def task_event_stream(request: Request, user_id: UUID) -> AsyncGenerator[str, None]:
+    """Поток Server-Sent Events с изменениями карточек пользователя.
+
+    Args:
+        request (Request): Запрос (для отслеживания отключения клиента).
+        user_id (UUID): id пользователя.
+
+    Returns:
+        AsyncGenerator[str, None]: Сообщения SSE.
+    """
+    async with task_event_broker.subscribe(user_id) as queue:
+        while not await request.is_disconnected():
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
@@ -1,24 +1,30 @@
 from abc import ABC, abstractmethod
-from typing import List
+from datetime import date, timedelta
+from operator import itemgetter
+from typing import List, Optional, Tuple
 from uuid import UUID
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
 
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from db.database import get_async_session
-from models import User, Task
-from schemas import TaskCreateInputSchema, TaskUpdateInputSchema
+from config import app_settings
+from models import User, Task, TaskTombstone
+from schemas import TaskCreateInputSchema, TaskUpdateInputSchema, TaskPatchInputSchema
 from paginators import TaskPaginator
 from repository import TaskRepository
-from utils import prepare_ordering
+from utils import get_task_session, parse_if_match
+from utils.task_fields import ALL_TASK_FIELDS, TaskFields
+from utils.task_ordering import TaskOrdering
+from utils.tracing import trace_methods
 
 
 class TaskServiceABC(ABC):
     """Интерфейс сервиса для карточек."""
 
     @abstractmethod
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, group_commit: bool = True):
         """Конструктор для сервиса карточек."""
         pass
 
@@ -28,15 +34,34 @@ class TaskServiceABC(ABC):
         pass
 
     @abstractmethod
-    async def get_all_by_user(self, user: User, paginator: TaskPaginator, ordering: tuple) -> List[Task]:
+    async def get_all_by_user(
+        self, user: User, paginator: TaskPaginator, ordering: TaskOrdering, fields: TaskFields = ALL_TASK_FIELDS
+    ) -> Tuple[List[Task], Optional[str]]:
         """Получения карточек заданий пользователя."""
         pass
 
     @abstractmethod
-    async def get_user_task_by_id(self, user: User, task_id: UUID) -> Task:
+    async def get_user_task_by_id(self, user: User, task_id: UUID, fields: TaskFields = ALL_TASK_FIELDS) -> Task:
         """Получаем конкретную карточку задания пользователя."""
         pass
 
+    @abstractmethod
+    async def get_task_rows_by_user(
+        self, user: User, paginator: TaskPaginator, ordering: TaskOrdering, fields: TaskFields = ALL_TASK_FIELDS
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Получаем данные карточек заданий пользователя для ответа без ORM."""
+        pass
+
+    @abstractmethod
+    async def get_user_task_row_by_id(self, user: User, task_id: UUID, fields: TaskFields = ALL_TASK_FIELDS) -> dict:
+        """Получаем данные конкретной карточки задания пользователя для ответа без ORM."""
+        pass
+
+    @abstractmethod
+    async def get_user_tasks_by_ids(self, user: User, task_ids: List[UUID]) -> List[Task]:
+        """Получаем карточки пользователя по списку id."""
+        pass
+
     @abstractmethod
     async def delete_current_task(self, user: User, task_id: UUID) -> None:
         """Удаляем конкретную карточку задания пользователя."""
@@ -47,17 +72,58 @@ class TaskServiceABC(ABC):
         """Обновляем конкретную карточку задания пользователя."""
         pass
 
+    @abstractmethod
+    async def patch_current_task(
+        self,
+        user: User,
+        task_id: UUID,
+        task_data: TaskPatchInputSchema,
+        if_match: Optional[str] = None,
+    ) -> Task:
+        """Частично обновляем конкретную карточку задания пользователя."""
+        pass
+
+    @abstractmethod
+    async def get_stats(self, user: User) -> dict:
+        """Получаем счетчики карточек пользователя."""
+        pass
 
+    @abstractmethod
+    async def get_changes(self, user: User, since: Optional[str], limit: int) -> dict:
+        """Получаем изменения карточек пользователя с момента токена синхронизации."""
+        pass
+
+    @abstractmethod
+    async def get_activity(self, user: User, date_from: date, date_to: date) -> List[dict]:
+        """Получаем количество созданных и выполненных карточек пользователя по дням."""
+        pass
+
+
+@trace_methods('service')
 class TaskService(TaskServiceABC):
     """Сервис для карточек."""
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, group_commit: bool = True):
         """Конструктор для сервиса карточек.
 
         Args:
             session (AsyncSession): Сессия БД.
+            group_commit (bool): Создавать карточки групповой записью, если она включена.
         """
-        self.repository = TaskRepository(session)
+        self.repository = TaskRepository(session, group_commit)
+
+    @staticmethod
+    def _attach_user(task: Task, user: User):
+        """Проставляем карточке уже загруженного пользователя без обращения к БД.
+
+        Карточки могут лежать на шарде, где нет таблицы пользователей, поэтому ленивую
+        загрузку связи user заменяем текущим пользователем.
+
+        Args:
+            task (Task): Карточка задания.
+            user (User): Владелец карточки.
+        """
+        set_committed_value(task, 'user', user)
 
     async def create(self, user: User, data: TaskCreateInputSchema) -> Task:
         """Создание карточки.
@@ -74,33 +140,134 @@ class TaskService(TaskServiceABC):
         result = await self.repository.create(created_data)
         return result
 
-    async def get_all_by_user(self, user: User, paginator: TaskPaginator, ordering: tuple) -> List[Task]:
+    @staticmethod
+    def _next_cursor(items: list, paginator: TaskPaginator, ordering: TaskOrdering) -> Optional[str]:
+        """Курсор следующей страницы, если текущая страница заполнена.
+
+        Args:
+            items (list): Карточки страницы.
+            paginator (TaskPaginator): Пагинатор.
+            ordering (TaskOrdering): Сортировка.
+
+        Returns:
+            Optional[str]: Курсор или None.
+        """
+        if len(items) < paginator.limit:
+            return None
+        return ordering.make_cursor(items[-1])
+
+    @staticmethod
+    def _columns(fields: TaskFields) -> Optional[Tuple[str, ...]]:
+        """Колонки карточки для репозитория (None, если запрошены все поля)."""
+        return None if fields.is_all else fields.columns
+
+    async def get_all_by_user(
+        self, user: User, paginator: TaskPaginator, ordering: TaskOrdering, fields: TaskFields = ALL_TASK_FIELDS
+    ) -> Tuple[List[Task], Optional[str]]:
         """Получения карточек заданий пользователя.
 
         Args:
             user (User): Текущий пользователь.
             paginator (TaskPaginator): Пагинатор.
-            ordering (tuple): Правило сортировки.
+            ordering (TaskOrdering): Сортировка.
+            fields (TaskFields): Запрошенные поля (остальные атрибуты карточек не загружаются).
         Returns:
-            List[Task]: Карточки заданий.
+            Tuple[List[Task], Optional[str]]: Карточки заданий и курсор следующей страницы.
         """
-        if ordering is None:
-            ordering = tuple()
-        prepared_ordering = prepare_ordering(ordering)
-        result = await self.repository.get_all_by_user(user.id, paginator.limit, paginator.offset, prepared_ordering)
-        return result
+        result = await self.repository.get_all_by_user(
+            user.id, paginator.limit, paginator.offset, ordering, paginator.cursor, self._columns(fields)
+        )
+        for task in result:
+            self._attach_user(task, user)
+        return result, self._next_cursor(result, paginator, ordering)
 
-    async def get_user_task_by_id(self, user: User, task_id: UUID) -> Task:
+    async def get_user_task_by_id(self, user: User, task_id: UUID, fields: TaskFields = ALL_TASK_FIELDS) -> Task:
         """Получаем конкретную карточку задания пользователя.
 
         Args:
             user (User): Текущий пользователь.
             task_id (UUID): id карточки задания.
+            fields (TaskFields): Запрошенные поля (версия загружается всегда).
 
         Returns:
             Task: Карточка задания.
         """
-        result = await self.repository.get_user_task_by_id(user.id, task_id)
+        result = await self.repository.get_user_task_by_id(user.id, task_id, self._columns(fields))
+        self._attach_user(result, user)
+        return result
+
+    @staticmethod
+    def _user_payload(user: User) -> dict:
+        """Данные владельца карточки для ответа (схема UserSchema).
+
+        Args:
+            user (User): Владелец карточки.
+
+        Returns:
+            dict: id, имя и email пользователя.
+        """
+        return {'username': user.username, 'email': user.email, 'id': user.id}
+
+    async def get_task_rows_by_user(
+        self, user: User, paginator: TaskPaginator, ordering: TaskOrdering, fields: TaskFields = ALL_TASK_FIELDS
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Получаем данные карточек заданий пользователя для ответа без ORM.
+
+        Строки содержат только запрошенные колонки, владелец подставляется один раз для всей страницы.
+
+        Args:
+            user (User): Текущий пользователь.
+            paginator (TaskPaginator): Пагинатор.
+            ordering (TaskOrdering): Сортировка.
+            fields (TaskFields): Запрошенные поля.
+
+        Returns:
+            Tuple[List[dict], Optional[str]]: Данные карточек в формате TaskListOutputSchema (только
+                запрошенные поля) и курсор следующей страницы.
+        """
+        rows = await self.repository.get_task_rows_by_user(
+            user.id, paginator.limit, paginator.offset, ordering, paginator.cursor, self._columns(fields)
+        )
+        next_cursor = self._next_cursor(rows, paginator, ordering)
+        # Поля сортировки, которых нет в ответе, нужны были только для курсора.
+        cursor_only_fields = set(rows[0]).difference(fields.names) if rows else ()
+        user_payload = self._user_payload(user) if fields.include_user else None
+        for row in rows:
+            for field in cursor_only_fields:
+                del row[field]
+            if user_payload is not None:
+                row['user'] = user_payload
+        return rows, next_cursor
+
+    async def get_user_task_row_by_id(self, user: User, task_id: UUID, fields: TaskFields = ALL_TASK_FIELDS) -> dict:
+        """Получаем данные конкретной карточки задания пользователя для ответа без ORM.
+
+        Args:
+            user (User): Текущий пользователь.
+            task_id (UUID): id карточки задания.
+            fields (TaskFields): Запрошенные поля.
+
+        Returns:
+            dict: Данные карточки в формате TaskRetrieveOutputSchema (запрошенные поля и версия для ETag).
+        """
+        row = await self.repository.get_user_task_row_by_id(user.id, task_id, self._columns(fields))
+        if fields.include_user:
+            row['user'] = self._user_payload(user)
+        return row
+
+    async def get_user_tasks_by_ids(self, user: User, task_ids: List[UUID]) -> List[Task]:
+        """Получаем карточки пользователя по списку id одним запросом.
+
+        Args:
+            user (User): Текущий пользователь.
+            task_ids (List[UUID]): id карточек заданий.
+
+        Returns:
+            List[Task]: Найденные карточки.
+        """
+        result = await self.repository.get_user_tasks_by_ids(user.id, task_ids)
+        for task in result:
+            self._attach_user(task, user)
         return result
 
     async def delete_current_task(self, user: User, task_id: UUID) -> None:
@@ -126,8 +293,135 @@ class TaskService(TaskServiceABC):
         result = await self.repository.update_current_task(user.id, task_id, task_data.model_dump())
         return result
 
+    async def patch_current_task(
+        self,
+        user: User,
+        task_id: UUID,
+        task_data: TaskPatchInputSchema,
+        if_match: Optional[str] = None,
+    ) -> Task:
+        """Частично обновляем конкретную карточку задания пользователя.
+
+        Args:
+            user (User): Текущий пользователь.
+            task_id (UUID): id Карточки задания.
+            task_data (TaskPatchInputSchema): Изменяемые поля.
+            if_match (Optional[str]): Заголовок If-Match с ожидаемой версией карточки.
+
+        Raises:
+            HTTPException: Не передано ни одного поля.
+
+        Returns:
+            Task: Карточка задания.
+        """
+        patch_data = task_data.model_dump(exclude_unset=True, exclude_none=True)
+        if not patch_data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='No fields to update'
+            )
+        expected_version = parse_if_match(if_match)
+        result = await self.repository.patch_current_task(user.id, task_id, patch_data, expected_version)
+        return result
+
+    async def get_stats(self, user: User) -> dict:
+        """Получаем счетчики карточек пользователя.
+
+        Args:
+            user (User): Текущий пользователь.
+
+        Returns:
+            dict: Всего, выполненных и невыполненных карточек.
+        """
+        stats = await self.repository.get_stats(user.id)
+        return {
+            'total': stats.total,
+            'done': stats.done,
+            'open': stats.total - stats.done,
+        }
+
+    @staticmethod
+    def _parse_sync_token(token: Optional[str]) -> int:
+        """Получаем номер изменения из токена синхронизации.
+
+        Args:
+            token (Optional[str]): Токен синхронизации, None - полная синхронизация.
+
+        Raises:
+            HTTPException: Некорректный токен.
+
+        Returns:
+            int: Номер изменения (-1 для полной синхронизации, чтобы попали карточки с change_seq = 0).
+        """
+        if not token:
+            return -1
+        if not token.isdigit():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Invalid sync token'
+            )
+        return int(token)
+
+    async def get_changes(self, user: User, since: Optional[str], limit: int) -> dict:
+        """Получаем изменения карточек пользователя с момента токена синхронизации.
+
+        Args:
+            user (User): Текущий пользователь.
+            since (Optional[str]): Токен синхронизации из прошлого ответа.
+            limit (int): Максимальное количество изменений в ответе.
+
+        Returns:
+            dict: Измененные карточки, id удаленных карточек и токен для следующего запроса.
+        """
+        since_seq = self._parse_sync_token(since)
+        tasks, tombstones = await self.repository.get_changes(user.id, since_seq, limit)
+        changes = [(task.change_seq, task) for task in tasks]
+        changes += [(tombstone.change_seq, tombstone) for tombstone in tombstones]
+        changes.sort(key=itemgetter(0))
+        page = changes[:limit]
+        return {
+            'changed': [item for _, item in page if isinstance(item, Task)],
+            'deleted': [item.id for _, item in page if isinstance(item, TaskTombstone)],
+            'next_token': str(page[-1][0] if page else max(since_seq, 0)),
+            'has_more': len(changes) > limit,
+        }
+
+    async def get_activity(self, user: User, date_from: date, date_to: date) -> List[dict]:
+        """Получаем количество созданных и выполненных карточек пользователя по дням.
+
+        Дни без активности возвращаются с нулями, чтобы график не пропускал их.
+
+        Args:
+            user (User): Текущий пользователь.
+            date_from (date): Первый день.
+            date_to (date): Последний день (включительно).
+
+        Raises:
+            HTTPException: Период пуст или длиннее TASK_ACTIVITY_MAX_DAYS.
+
+        Returns:
+            List[dict]: Активность по дням по возрастанию дня.
+        """
+        days = (date_to - date_from).days + 1
+        if days < 1 or days > app_settings.task_activity_max_days:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f'Period must be from 1 to {app_settings.task_activity_max_days} days'
+            )
+        activity = {row.day: row for row in await self.repository.get_activity(user.id, date_from, date_to)}
+        result = []
+        for offset in range(days):
+            day = date_from + timedelta(days=offset)
+            row = activity.get(day)
+            result.append({
+                'day': day,
+                'created': row.created if row is not None else 0,
+                'completed': row.completed if row is not None else 0,
+            })
+        return result
+
 
 def get_task_service(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_task_session),
 ) -> TaskService:
     return TaskService(session)
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config import app_settings
+from repository.auth_repository import AuthRepositoryABC
+from utils.bloom_filter import BloomFilter
+
+
+USER_LOGIN_FIELDS = ('username', 'email')
+# Догрузка новых пользователей захватывает минуту до последней регистрации: время регистрации -
+# начало транзакции, и пользователи параллельных транзакций фиксируются позже.
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class UserAvailabilityFilter:
+    """Фильтры Блума занятых логинов и email текущего процесса.
+
+    Фильтр отвечает, что значение точно свободно, без обращения к БД, а «возможно занято»
+    проверяется запросом по уникальному индексу. Раз в REGISTRATION_FILTER_REFRESH_SECONDS
+    в фильтры догружаются новые пользователи (по индексу created_at), а раз в
+    REGISTRATION_FILTER_REBUILD_SECONDS фильтры строятся заново из таблицы user, чтобы убрать
+    удаленных пользователей и подстроить размер. Пользователь, зарегистрированный в другом
+    процессе после последней догрузки, может быть ошибочно показан свободным: ответ справочный,
+    а окончательно занятость проверяет регистрация.
+    """
+
+    def __init__(self):
+        self._filters: Optional[Dict[str, BloomFilter]] = None
+        self._watermark: Optional[datetime] = None
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, repository: AuthRepositoryABC):
+        """Строим или обновляем фильтры, если они устарели.
+
+        Пока один запрос обновляет фильтры, остальные пользуются прежними.
+
+        Args:
+            repository (AuthRepositoryABC): Репозиторий пользователей.
+        """
+        if self._filters is not None:
+            if time.monotonic() - self._refreshed_at < app_settings.registration_filter_refresh_seconds:
+                return
+            if self._lock.locked():
+                return
+        async with self._lock:
+            now = time.monotonic()
+            if self._filters is None or now - self._built_at >= app_settings.registration_filter_rebuild_seconds:
+                await self._rebuild(repository)
+            elif now - self._refreshed_at >= app_settings.registration_filter_refresh_seconds:
+                since = self._watermark - REFRESH_OVERLAP if self._watermark is not None else None
+                await self._load(repository, self._filters, since)
+            self._refreshed_at = time.monotonic()
+
+    async def _rebuild(self, repository: AuthRepositoryABC):
+        capacity = max(app_settings.registration_filter_capacity, await repository.count_users() * 2)
+        filters = {
+            field: BloomFilter(capacity, app_settings.registration_filter_error_rate) for field in USER_LOGIN_FIELDS
+        }
+        self._watermark = None
+        await self._load(repository, filters, None)
+        self._filters = filters
+        self._built_at = time.monotonic()
+
+    async def _load(self, repository: AuthRepositoryABC, filters: Dict[str, BloomFilter], since: Optional[datetime]):
+        async for username, email, created_at in repository.stream_logins(since):
+            filters['username'].add(username)
+            filters['email'].add(email)
+            if self._watermark is None or created_at > self._watermark:
+                self._watermark = created_at
+
+    def might_exist(self, field: str, value: str) -> bool:
+        """Проверяем значение по фильтру.
+
+        Args:
+            field (str): Поле: username или email.
+            value (str): Значение.
+
+        Returns:
+            bool: Возможно занято(True)/Точно свободно(False). Без построенного фильтра - True.
+        """
+        return self._filters is None or value in self._filters[field]
+
+    def add(self, username: str, email: str):
+        """Добавляем пользователя, зарегистрированного в этом процессе.
+
+        Args:
+            username (str): Логин.
+            email (str): Email.
+        """
+        if self._filters is not None:
+            self._filters['username'].add(username)
+            self._filters['email'].add(email)
+
+
+user_availability_filter = UserAvailabilityFilter()
@@ -1,7 +1,13 @@
 __all__ = (
     'send_email',
     'delete_unregistered_users',
+    'manage_task_partitions',
+    'reconcile_task_stats',
+    'rollup_task_activity',
 )
 
 from .send_email import send_email
 from .delete_unregistered_users import delete_unregistered_users
+from .manage_task_partitions import manage_task_partitions
+from .reconcile_task_stats import reconcile_task_stats
+from .rollup_task_activity import rollup_task_activity
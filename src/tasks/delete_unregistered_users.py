@@ -10,7 +10,7 @@ from celery import shared_task
 from models import User
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def delete_unregistered_users():
     """Удаляем незарегистрированных пользователей."""
     session: Session = sync_session()
@@ -0,0 +1,207 @@
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from db.sharding import task_sync_session_makers
+
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select, text
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from config import app_settings
+from models import Task, TaskArchive, TaskTombstone
+from repository.task_repository import task_stats_delta_stmt
+
+
+logger = get_task_logger(__name__)
+
+PARTITION_NAME_TEMPLATE = 'task_y{year:04d}m{month:02d}'
+PARTITION_NAME_PATTERN = re.compile(r'^task_y(?P<year>\d{4})m(?P<month>\d{2})$')
+DEFAULT_PARTITION_NAME = 'task_default'
+
+
+def month_start(value: date, shift: int = 0) -> date:
+    """Первый день месяца, сдвинутого на shift месяцев относительно value.
+
+    Args:
+        value (date): Исходная дата.
+        shift (int): Сдвиг в месяцах.
+
+    Returns:
+        date: Начало месяца.
+    """
+    month_index = value.year * 12 + value.month - 1 + shift
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def create_partition(session: Session, name: str, start: date, end: date):
+    """Создаем месячную секцию таблицы task, перенося в нее строки этого месяца из секции по умолчанию.
+
+    Секцию нельзя присоединить, пока в секции по умолчанию есть строки из ее диапазона (например,
+    карточки, созданные до первого запуска задачи). Тогда в одной транзакции секция по умолчанию
+    отсоединяется, создается месячная секция, в нее переносятся строки месяца, и секция по умолчанию
+    присоединяется обратно. На время транзакции запись в таблицу task блокируется.
+
+    Args:
+        session (Session): Сессия БД.
+        name (str): Имя секции.
+        start (date): Начало месяца.
+        end (date): Начало следующего месяца.
+    """
+    if session.execute(text('SELECT to_regclass(:name) IS NOT NULL'), {'name': name}).scalar():
+        return
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = f"created_at >= '{start.isoformat()}' AND created_at < '{end.isoformat()}'"
+    has_default_rows = session.execute(text(
+        f'SELECT to_regclass(:default) IS NOT NULL AND EXISTS (SELECT 1 FROM task WHERE {in_range})'
+    ), {'default': DEFAULT_PARTITION_NAME}).scalar()
+    if not has_default_rows:
+        session.execute(text(f'CREATE TABLE {name} PARTITION OF task FOR VALUES {bounds}'))
+        session.commit()
+        return
+    session.execute(text(f'ALTER TABLE task DETACH PARTITION {DEFAULT_PARTITION_NAME}'))
+    session.execute(text(f'CREATE TABLE {name} PARTITION OF task FOR VALUES {bounds}'))
+    moved = session.execute(text(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION_NAME} WHERE {in_range} RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved'
+    )).rowcount
+    session.execute(text(f'ALTER TABLE task ATTACH PARTITION {DEFAULT_PARTITION_NAME} DEFAULT'))
+    session.commit()
+    logger.info('Создана секция %s, из секции по умолчанию перенесено строк: %s', name, moved)
+
+
+def create_future_partitions(session: Session, today: date, months_ahead: int):
+    """Создаем месячные секции таблицы task с текущего месяца на months_ahead месяцев вперед.
+
+    Args:
+        session (Session): Сессия БД.
+        today (date): Текущая дата.
+        months_ahead (int): На сколько месяцев вперед создавать секции.
+    """
+    for shift in range(months_ahead + 1):
+        start, end = month_start(today, shift), month_start(today, shift + 1)
+        create_partition(session, PARTITION_NAME_TEMPLATE.format(year=start.year, month=start.month), start, end)
+
+
+def archive_completed_tasks(session: Session, cutoff: datetime, batch_size: int) -> int:
+    """Переносим выполненные карточки старше cutoff в task_archive пачками по batch_size.
+
+    Для перенесенных карточек оставляем следы удаления, чтобы клиенты синхронизации их убрали.
+
+    Args:
+        session (Session): Сессия БД.
+        cutoff (datetime): Карточки, созданные раньше этой даты, архивируются.
+        batch_size (int): Размер пачки.
+
+    Returns:
+        int: Количество перенесенных карточек.
+    """
+    columns = [column.name for column in TaskArchive.__table__.columns if column.name in Task.__table__.columns]
+    moved_total = 0
+    while True:
+        batch = select(Task.id).where(Task.status.is_(True), Task.created_at < cutoff).limit(batch_size)
+        moved = delete(Task).where(
+            Task.id.in_(batch.scalar_subquery()),
+            Task.created_at < cutoff,
+        ).returning(
+            *(Task.__table__.c[name] for name in columns)
+        ).cte('moved')
+        stmt = insert(
+            TaskArchive
+        ).from_select(
+            columns, select(*(moved.c[name] for name in columns))
+        ).returning(
+            TaskArchive.id, TaskArchive.user_id
+        )
+        archived = session.execute(stmt).all()
+        add_tombstones(session, archived)
+        session.commit()
+        moved_total += len(archived)
+        if len(archived) < batch_size:
+            return moved_total
+
+
+def add_tombstones(session: Session, deleted_tasks: list):
+    """Оставляем следы удаления выполненных карточек и уменьшаем счетчики их владельцев.
+
+    Args:
+        session (Session): Сессия БД.
+        deleted_tasks (list): Пары (id карточки, id пользователя).
+    """
+    by_user = defaultdict(list)
+    for task_id, user_id in deleted_tasks:
+        by_user[user_id].append(task_id)
+    for user_id, task_ids in by_user.items():
+        count = len(task_ids)
+        last_seq = session.execute(
+            task_stats_delta_stmt(user_id, total=-count, done=-count, change_seq=count)
+        ).scalar_one()
+        first_seq = last_seq - count + 1
+        session.execute(insert(TaskTombstone), [
+            {'id': task_id, 'user_id': user_id, 'change_seq': first_seq + index}
+            for index, task_id in enumerate(task_ids)
+        ])
+
+
+def drop_archived_partitions(session: Session, cutoff: datetime):
+    """Отсоединяем и удаляем опустевшие секции, целиком лежащие раньше cutoff.
+
+    Секции, в которых остались невыполненные карточки, не трогаем.
+
+    Args:
+        session (Session): Сессия БД.
+        cutoff (datetime): Граница архивации.
+    """
+    query = text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'task'::regclass"
+    )
+    partitions = session.execute(query).scalars().all()
+    for name in partitions:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if not match:
+            continue
+        upper_bound = month_start(date(int(match['year']), int(match['month']), 1), 1)
+        if upper_bound > cutoff.date():
+            continue
+        has_rows = session.execute(text(f'SELECT EXISTS (SELECT 1 FROM {name})')).scalar()
+        if has_rows:
+            continue
+        session.execute(text(f'ALTER TABLE task DETACH PARTITION {name}'))
+        session.execute(text(f'DROP TABLE {name}'))
+        session.commit()
+
+
+def manage_database_partitions(session: Session):
+    """Обслуживаем секции и архив карточек в одной БД.
+
+    Args:
+        session (Session): Сессия БД.
+    """
+    now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    if app_settings.task_partitioning:
+        create_future_partitions(session, now.date(), app_settings.task_partitions_ahead)
+    if app_settings.task_archive_after_days:
+        cutoff = now - timedelta(days=app_settings.task_archive_after_days)
+        archive_completed_tasks(session, cutoff, app_settings.task_archive_batch_size)
+        if app_settings.task_partitioning:
+            drop_archived_partitions(session, cutoff)
+
+
+@shared_task(ignore_result=True)
+def manage_task_partitions():
+    """Создаем будущие секции таблицы task и архивируем старые выполненные карточки на всех шардах."""
+    if not app_settings.task_partitioning and not app_settings.task_archive_after_days:
+        return
+    for session_maker in task_sync_session_makers():
+        session: Session = session_maker()
+        try:
+            manage_database_partitions(session)
+        except Exception:
+            session.rollback()
+            logger.exception('Ошибка обслуживания секций таблицы task')
+        finally:
+            session.close()
@@ -0,0 +1,93 @@
+from typing import List, Optional
+from uuid import UUID
+
+from db.sharding import task_sync_session_makers
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from config import app_settings
+from models import Task, TaskStats
+
+
+logger = get_task_logger(__name__)
+
+
+def _next_user_ids(session: Session, after: Optional[UUID], batch_size: int) -> List[UUID]:
+    """Следующая пачка пользователей, у которых есть карточки или строка счетчиков.
+
+    Args:
+        session (Session): Сессия БД.
+        after (Optional[UUID]): Последний обработанный пользователь.
+        batch_size (int): Размер пачки.
+
+    Returns:
+        List[UUID]: id пользователей по возрастанию.
+    """
+    task_users = select(Task.user_id).distinct().order_by(Task.user_id).limit(batch_size)
+    stats_users = select(TaskStats.user_id).order_by(TaskStats.user_id).limit(batch_size)
+    if after is not None:
+        task_users = task_users.where(Task.user_id > after)
+        stats_users = stats_users.where(TaskStats.user_id > after)
+    user_ids = set(session.execute(task_users).scalars()) | set(session.execute(stats_users).scalars())
+    return sorted(user_ids)[:batch_size]
+
+
+def reconcile_batch(session: Session, user_ids: List[UUID]) -> int:
+    """Пересчитываем счетчики пачки пользователей и исправляем расхождения.
+
+    Строки счетчиков блокируются до подсчета, поэтому параллельные изменения карточек этих
+    пользователей применят свои приращения уже поверх исправленных значений.
+
+    Args:
+        session (Session): Сессия БД.
+        user_ids (List[UUID]): id пользователей.
+
+    Returns:
+        int: Количество исправленных строк.
+    """
+    session.execute(select(TaskStats.user_id).where(TaskStats.user_id.in_(user_ids)).with_for_update()).all()
+    counts_query = select(
+        Task.user_id, func.count(), func.count().filter(Task.status.is_(True))
+    ).where(
+        Task.user_id.in_(user_ids)
+    ).group_by(
+        Task.user_id
+    )
+    counts = {user_id: (total, done) for user_id, total, done in session.execute(counts_query)}
+    rows = [
+        {'user_id': user_id, 'total': counts.get(user_id, (0, 0))[0], 'done': counts.get(user_id, (0, 0))[1]}
+        for user_id in user_ids
+    ]
+    stmt = insert(TaskStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskStats.user_id],
+        set_={'total': stmt.excluded.total, 'done': stmt.excluded.done},
+        where=(TaskStats.total != stmt.excluded.total) | (TaskStats.done != stmt.excluded.done),
+    ).returning(TaskStats.user_id)
+    repaired = len(session.execute(stmt).all())
+    session.commit()
+    return repaired
+
+
+@shared_task(ignore_result=True)
+def reconcile_task_stats():
+    """Исправляем расхождения счетчиков карточек пользователей на всех шардах."""
+    for session_maker in task_sync_session_makers():
+        session: Session = session_maker()
+        try:
+            after, repaired = None, 0
+            while user_ids := _next_user_ids(session, after, app_settings.task_stats_batch_size):
+                repaired += reconcile_batch(session, user_ids)
+                after = user_ids[-1]
+            if repaired:
+                logger.warning('Исправлено счетчиков карточек: %s', repaired)
+        except Exception:
+            session.rollback()
+            logger.exception('Ошибка пересчета счетчиков карточек')
+        finally:
+            session.close()
@@ -0,0 +1,69 @@
+from typing import Optional
+from uuid import UUID
+
+from db.sharding import task_sync_session_makers
+
+from sqlalchemy.orm import Session
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from config import app_settings
+from repository.task_repository import (
+    ACTIVITY_WATERMARK_STMT, DELETE_USERS_ACTIVITY_STMT, INSERT_USERS_ACTIVITY_STMT, PENDING_ACTIVITY_USERS_QUERY
+)
+
+
+logger = get_task_logger(__name__)
+
+# Наименьший UUID: с него начинается обход пользователей.
+FIRST_USER_ID = UUID(int=0)
+
+
+def rollup_batch(session: Session, after: UUID, batch_size: int) -> Optional[UUID]:
+    """Пересчитываем активность следующей пачки пользователей с изменениями после activity_seq.
+
+    Активность пользователя пересчитывается целиком по его карточкам и архиву (по индексам
+    user_id): снятие отметки о выполнении или удаление карточки меняет уже посчитанные дни,
+    а прежние значения полей нигде не сохраняются. Отметка activity_seq сдвигается на номер
+    изменения, прочитанный до пересчета, поэтому изменения, зафиксированные во время пересчета,
+    попадут в следующий запуск.
+
+    Args:
+        session (Session): Сессия БД.
+        after (UUID): Последний обработанный пользователь.
+        batch_size (int): Размер пачки.
+
+    Returns:
+        Optional[UUID]: Последний пользователь пачки или None, если пересчитывать больше некого.
+    """
+    pending = session.execute(PENDING_ACTIVITY_USERS_QUERY, {'after': after, 'limit': batch_size}).all()
+    if not pending:
+        return None
+    user_ids = [user_id for user_id, _ in pending]
+    session.execute(DELETE_USERS_ACTIVITY_STMT, {'user_ids': user_ids})
+    session.execute(INSERT_USERS_ACTIVITY_STMT, {'user_ids': user_ids})
+    session.execute(ACTIVITY_WATERMARK_STMT, [
+        {'stats_user_id': user_id, 'seq': change_seq} for user_id, change_seq in pending
+    ])
+    session.commit()
+    return user_ids[-1]
+
+
+@shared_task(ignore_result=True)
+def rollup_task_activity():
+    """Пересчитываем дневную активность пользователей, изменивших карточки, на всех шардах."""
+    for session_maker in task_sync_session_makers():
+        session: Session = session_maker()
+        try:
+            after, batches = FIRST_USER_ID, 0
+            while (last := rollup_batch(session, after, app_settings.task_activity_batch_size)) is not None:
+                after = last
+                batches += 1
+            if batches:
+                logger.info('Пересчитана активность пользователей, пачек: %s', batches)
+        except Exception:
+            session.rollback()
+            logger.exception('Ошибка пересчета активности карточек')
+        finally:
+            session.close()
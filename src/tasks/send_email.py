@@ -6,7 +6,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 
-@celery_app.task
+@celery_app.task(ignore_result=True)
 def send_email(
     smtp_server: str,
     smtp_port: int,
@@ -0,0 +1,75 @@
+"""Замер пропускной способности создания карточек с групповой записью и без нее.
+
+Запуск из src: python -m tests.benchmarks.group_commit [--tasks 2000] [--writers 1 10 100]
+
+На локальной БД из POSTGRES_* заданное число конкурентных писателей создает карточки через
+TaskRepository.create: по одному коммиту на карточку и с TASK_GROUP_COMMIT, когда
+одновременные создания объединяются в один INSERT и один коммит. Карточки создаются
+от временного пользователя, который удаляется вместе с ними после замера.
+"""
+import argparse
+import asyncio
+import time
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import app_settings
+from db.database import dsn
+from models import Task, TaskStats, User
+from repository.task_repository import TaskRepository
+
+
+async def writer(session_maker: async_sessionmaker, user_id: UUID, count: int):
+    """Писатель: создает count карточек, каждую в своей сессии, как отдельные запросы POST /api/tasks."""
+    for index in range(count):
+        async with session_maker() as session:
+            await TaskRepository(session).create(
+                {'title': f'task {index}', 'description': 'benchmark', 'user_id': user_id}
+            )
+
+
+async def measure(session_maker: async_sessionmaker, user_id: UUID, tasks: int, writers: int) -> float:
+    """Карточек в секунду."""
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(session_maker, user_id, tasks // writers) for _ in range(writers)))
+    return tasks // writers * writers / (time.perf_counter() - started)
+
+
+async def run(tasks: int, writer_counts: list):
+    db_engine = create_async_engine(dsn, pool_size=max(writer_counts), max_overflow=0)
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    user_id = uuid4()
+    async with session_maker() as session:
+        session.add(User(id=user_id, username=f'bench-{user_id}', email=f'{user_id}@bench', password='-'))
+        await session.commit()
+    try:
+        for writers in writer_counts:
+            results = []
+            for group_commit in (False, True):
+                app_settings.task_group_commit = group_commit
+                results.append(await measure(session_maker, user_id, tasks, writers))
+            print(
+                f'{writers:>3} writers: commit per task {results[0]:.0f} tasks/s, '
+                f'group commit {results[1]:.0f} tasks/s ({results[1] / results[0]:.1f}x)'
+            )
+    finally:
+        async with session_maker() as session:
+            await session.execute(delete(Task).where(Task.user_id == user_id))
+            await session.execute(delete(TaskStats).where(TaskStats.user_id == user_id))
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await db_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=2000, help='Карточек на один замер')
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+    asyncio.run(run(args.tasks, args.writers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Замер накладных расходов на частые запросы карточек.
+
+Запуск из src: python -m tests.benchmarks.query_overhead [--iterations 5000] [--no-db]
+
+Сравнивает запрос, собираемый на каждом вызове (как раньше в репозитории), с запросом,
+построенным один раз (USER_TASK_QUERY). Без --no-db запросы выполняются на локальной БД
+из POSTGRES_* с кэшем подготовленных выражений asyncpg и без него.
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db.database import dsn
+from models import Task
+from repository.task_repository import USER_TASK_QUERY
+
+
+USER_ID = TASK_ID = UUID(int=0)
+
+
+def adhoc_query():
+    return select(Task).where(Task.user_id == USER_ID, Task.id == TASK_ID)
+
+
+def measure(func: Callable, iterations: int) -> float:
+    """Среднее время вызова в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def measure_async(func: Callable, iterations: int) -> float:
+    """Среднее время асинхронного вызова в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def client_side(iterations: int):
+    """Построение запроса и вычисление ключа кэша компиляции, которые выполняются до обращения к БД."""
+    adhoc = measure(lambda: adhoc_query()._generate_cache_key(), iterations)
+    cached = measure(lambda: USER_TASK_QUERY._generate_cache_key(), iterations)
+    print(f'build + cache key: ad hoc {adhoc:.1f} us, cached statement {cached:.1f} us')
+
+
+async def database_side(iterations: int):
+    """Полное выполнение запроса на БД."""
+    params = {'user_id': USER_ID, 'task_id': TASK_ID}
+    for cache_size in (0, 100):
+        db_engine = create_async_engine(dsn, connect_args={'prepared_statement_cache_size': cache_size})
+        async with db_engine.connect() as connection:
+            await connection.execute(adhoc_query())
+            await connection.execute(USER_TASK_QUERY, params)
+            adhoc = await measure_async(lambda: connection.execute(adhoc_query()), iterations)
+            cached = await measure_async(lambda: connection.execute(USER_TASK_QUERY, params), iterations)
+        await db_engine.dispose()
+        print(
+            f'execute (prepared_statement_cache_size={cache_size}): '
+            f'ad hoc {adhoc:.1f} us, cached statement {cached:.1f} us'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--no-db', action='store_true', help='Не выполнять запросы на БД')
+    args = parser.parse_args()
+    client_side(args.iterations)
+    if not args.no_db:
+        asyncio.run(database_side(args.iterations))
+
+
+if __name__ == '__main__':
+    main()
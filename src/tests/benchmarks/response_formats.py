@@ -0,0 +1,52 @@
+"""Сравнение размера и времени кодирования списка карточек в JSON, MessagePack и CBOR.
+
+Запуск из src: python -m tests.benchmarks.response_formats [--tasks 100] [--iterations 2000]
+
+Данные те же, что отдает GET /api/tasks при чтении без ORM: строки карточек с владельцем.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from utils.responses import CBOR_MEDIA_TYPE, ENCODERS, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+
+
+def make_rows(count: int) -> list:
+    """Строки карточек одного пользователя."""
+    user = {'username': 'user', 'email': 'user@example.com', 'id': uuid4()}
+    now = datetime.now()
+    return [
+        {
+            'id': uuid4(),
+            'title': f'Задача {index}',
+            'description': 'Описание карточки задания',
+            'status': index % 3 == 0,
+            'created_at': now - timedelta(minutes=index),
+            'version': 1,
+            'user': user,
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.tasks)
+    json_size = len(ENCODERS[JSON_MEDIA_TYPE](rows))
+    for media_type in (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, CBOR_MEDIA_TYPE):
+        encode = ENCODERS[media_type]
+        size = len(encode(rows))
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            encode(rows)
+        elapsed = (time.perf_counter() - started) / args.iterations * 1e6
+        print(f'{media_type:<20} {size:>8} bytes ({size / json_size:.0%} of JSON) {elapsed:>8.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,13 @@ import asyncpg
 import pytest_asyncio
 import httpx
 
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 
 from config import app_settings, db_settings
-from db.database import get_async_session
+from db.database import get_async_session, unit_of_work
 from models import Base
 from main import app
 
@@ -24,6 +26,9 @@ TEST_DB_URL = (
 existing_engine = create_async_engine(EXISTING_DB_URL, future=True, echo=True, poolclass=NullPool)
 engine = create_async_engine(TEST_DB_URL, future=True, echo=True, poolclass=NullPool)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+# Синхронные сессии тестовой БД для задач Celery.
+sync_engine = create_engine(TEST_DB_URL.replace('+asyncpg', ''), poolclass=NullPool)
+sync_session_maker = sessionmaker(sync_engine, autoflush=False, expire_on_commit=False)
 
 
 @pytest_asyncio.fixture(scope='session')
@@ -69,7 +74,8 @@ async def db_session():
 async def client(setup_db, db_session):
     """Фикстура для асинхронного HTTP клиента."""
     async def override_get_async_session():
-        yield db_session
+        async with unit_of_work(db_session):
+            yield db_session
 
     app.dependency_overrides[get_async_session] = override_get_async_session
     async with httpx.AsyncClient(app=app, base_url=app_settings.test_base_url) as client:
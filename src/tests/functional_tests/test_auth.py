@@ -0,0 +1,40 @@
+import pytest
+
+from fastapi import status
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from httpx import AsyncClient
+
+from models import User
+
+from ..conftest import client, db_session  # noqa: F401
+
+
+@pytest.mark.asyncio()
+async def test_registration_conflicts_and_availability(db_session: AsyncSession, client: AsyncClient):  # noqa: F811
+    """Тест регистрации одним запросом: ошибка по занятому полю и проверка доступности логина и email."""
+    user_data = {'username': 'newuser', 'email': 'newuser@example.com', 'password': 'testPassword123-'}
+    response = await client.get('/api/registration/availability', params={'username': 'newuser'})
+    assert response.json() == {'username': True}
+
+    response = await client.post('/api/registration', json=user_data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()['username'] == 'newuser'
+
+    response = await client.post('/api/registration', json={**user_data, 'email': 'other@example.com'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()['detail'] == 'Пользователь с таким логином уже существует'
+    response = await client.post('/api/registration', json={**user_data, 'username': 'otheruser'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()['detail'] == 'Пользователь с таким email уже существует'
+
+    response = await client.get(
+        '/api/registration/availability', params={'username': 'newuser', 'email': 'free@example.com'}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'username': False, 'email': True}
+    response = await client.get('/api/registration/availability')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    await db_session.execute(delete(User))
+    await db_session.commit()
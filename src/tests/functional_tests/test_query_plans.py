@@ -0,0 +1,206 @@
+"""Проверка планов выполнения запросов репозиториев.
+
+Для каждого запроса из repository.query_registry.REPOSITORY_QUERIES на заполненной тестовой БД
+выполняется EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) в транзакции, которая затем откатывается.
+Тест падает, если план последовательно сканирует большую таблицу или превышает бюджет стоимости
+и прочитанных страниц.
+
+Структура планов (узлы, таблицы, индексы) сохраняется в query_plans/<имя запроса>.json, поэтому
+изменение плана видно в диффе. Тест падает, если план изменился (изменившиеся планы
+записываются запуском с переменной окружения UPDATE_QUERY_PLANS=1). Плана нового запроса еще
+нет в репозитории: он записывается, а тест пропускается с напоминанием закоммитить файл.
+
+Данные для планов удаляются после тестов модуля, чтобы не мешать остальным функциональным тестам.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import Dialect, Executable, select, text
+
+from models import Task, User
+from repository.query_registry import REPOSITORY_QUERIES, QuerySample
+
+from ..conftest import engine, setup_db  # noqa: F401
+
+
+EXPLAIN = 'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) '
+PLANS_DIR = Path(__file__).parent / 'query_plans'
+
+SEED_USERS = 1000
+SEED_TASKS_PER_USER = 100
+
+# Таблицы с большим числом строк (по статистике pg_class) нельзя читать последовательным сканированием.
+LARGE_TABLE_ROWS = 1000
+MAX_PLAN_COST = 1000
+MAX_PLAN_BUFFERS = 200
+
+# Поля узлов плана, которые сохраняются для ревью. Стоимости и время не сохраняются: они меняются
+# от запуска к запуску и зашумляют дифф.
+PLAN_STRUCTURE_KEYS = (
+    'Node Type',
+    'Operation',
+    'Parent Relationship',
+    'Relation Name',
+    'Index Name',
+    'Scan Direction',
+    'Join Type',
+    'Strategy',
+)
+
+SEED_STATEMENTS = (
+    """
+    INSERT INTO "user" (id, username, password, email, is_register, is_confirmed)
+    SELECT gen_random_uuid(), 'plan_user_' || n, 'password', 'plan_user_' || n || '@example.com', true, true
+    FROM generate_series(1, :users) AS n
+    """,
+    """
+    INSERT INTO task (id, title, description, status, created_at, updated_at, change_seq, version, user_id)
+    SELECT gen_random_uuid(), 'task ' || t, repeat('description ', 10), t % 3 = 0,
+        now() - t * interval '1 hour', now() - t * interval '30 minutes', t, 1, u.id
+    FROM "user" AS u CROSS JOIN generate_series(1, :tasks) AS t
+    WHERE u.username LIKE 'plan_user_%'
+    """,
+    """
+    INSERT INTO task_tombstone (id, user_id, change_seq)
+    SELECT gen_random_uuid(), u.id, :tasks + t
+    FROM "user" AS u CROSS JOIN generate_series(1, :tasks / 10) AS t
+    WHERE u.username LIKE 'plan_user_%'
+    """,
+    """
+    INSERT INTO task_stats (user_id, total, done, change_seq)
+    SELECT id, :tasks, :tasks / 3, :tasks + :tasks / 10
+    FROM "user" WHERE username LIKE 'plan_user_%'
+    """,
+    """
+    INSERT INTO users_code (id, code, user_id)
+    SELECT gen_random_uuid(), 123456, id
+    FROM "user" WHERE username LIKE 'plan_user_%'
+    """,
+)
+
+# Удаление данных для планов в порядке внешних ключей.
+CLEANUP_STATEMENTS = tuple(
+    f"""
+    DELETE FROM {table}
+    WHERE user_id IN (SELECT id FROM "user" WHERE username LIKE 'plan_user_%')
+    """
+    for table in ('users_code', 'task_stats', 'task_tombstone', 'task')
+) + (
+    """
+    DELETE FROM "user" WHERE username LIKE 'plan_user_%'
+    """,
+)
+
+
+def explain_sql(statement: Executable, params: dict, dialect: Dialect) -> Tuple[str, tuple]:
+    """SQL запроса с EXPLAIN и позиционные параметры для драйвера.
+
+    Args:
+        statement (Executable): Запрос.
+        params (dict): Параметры запроса.
+        dialect (Dialect): Диалект соединения.
+
+    Returns:
+        Tuple[str, tuple]: SQL и параметры.
+    """
+    compiled = statement.compile(dialect=dialect)
+    values = compiled.construct_params(params)
+    return EXPLAIN + str(compiled), tuple(values[name] for name in compiled.positiontup)
+
+
+def plan_nodes(node: dict):
+    """Все узлы плана."""
+    yield node
+    for child in node.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def plan_structure(node: dict) -> dict:
+    """Структура плана без стоимостей и фактических значений."""
+    structure = {key: node[key] for key in PLAN_STRUCTURE_KEYS if key in node}
+    if 'Plans' in node:
+        structure['Plans'] = [plan_structure(child) for child in node['Plans']]
+    return structure
+
+
+def plan_path(name: str) -> Path:
+    """Файл сохраненного плана запроса."""
+    file_name = re.sub(r'[^\w.,-]+', '_', name).strip('_')
+    return PLANS_DIR / f'{file_name}.json'
+
+
+@pytest_asyncio.fixture(scope='module')
+async def query_sample(setup_db):  # noqa: F811
+    """Заполняем тестовую БД реалистичным объемом данных, выбираем образец для параметров и удаляем данные."""
+    async with engine.begin() as connection:
+        for statement in SEED_STATEMENTS:
+            await connection.execute(text(statement), {'users': SEED_USERS, 'tasks': SEED_TASKS_PER_USER})
+        await connection.execute(text('ANALYZE'))
+        user = (await connection.execute(
+            select(User.id, User.username, User.email).where(User.username == 'plan_user_1')
+        )).one()
+        tasks = (await connection.execute(
+            select(Task.__table__).where(Task.user_id == user.id).order_by(Task.created_at).limit(5)
+        )).mappings().all()
+        large_tables = set((await connection.execute(
+            text("SELECT relname FROM pg_class WHERE relkind IN ('r', 'p') AND reltuples >= :rows"),
+            {'rows': LARGE_TABLE_ROWS},
+        )).scalars())
+    sample = QuerySample(
+        user_id=user.id,
+        username=user.username,
+        email=user.email,
+        task=dict(tasks[len(tasks) // 2]),
+        task_ids=[task['id'] for task in tasks],
+    )
+    yield sample, large_tables
+    async with engine.begin() as connection:
+        for statement in CLEANUP_STATEMENTS:
+            await connection.execute(text(statement))
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize('name', sorted(REPOSITORY_QUERIES))
+async def test_query_plan(name: str, query_sample):
+    """План запроса не сканирует большие таблицы целиком и укладывается в бюджет."""
+    sample, large_tables = query_sample
+    statement, params = REPOSITORY_QUERIES[name](sample)
+    async with engine.connect() as connection:
+        sql, args = explain_sql(statement, params, connection.dialect)
+        transaction = await connection.begin()
+        try:
+            explain = (await connection.exec_driver_sql(sql, args)).scalar_one()
+        finally:
+            await transaction.rollback()
+    if isinstance(explain, str):
+        explain = json.loads(explain)
+    plan = explain[0]['Plan']
+
+    seq_scans = [
+        node['Relation Name'] for node in plan_nodes(plan)
+        if node['Node Type'] == 'Seq Scan' and node['Relation Name'] in large_tables
+    ]
+    assert not seq_scans, f'{name}: seq scan on {", ".join(seq_scans)}'
+    assert plan['Total Cost'] <= MAX_PLAN_COST, f'{name}: cost {plan["Total Cost"]} > {MAX_PLAN_COST}'
+    buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+    assert buffers <= MAX_PLAN_BUFFERS, f'{name}: {buffers} buffers > {MAX_PLAN_BUFFERS}'
+
+    structure = json.dumps(plan_structure(plan), indent=2, ensure_ascii=False) + '\n'
+    path = plan_path(name)
+    if os.environ.get('UPDATE_QUERY_PLANS'):
+        PLANS_DIR.mkdir(exist_ok=True)
+        path.write_text(structure)
+        return
+    if not path.exists():
+        PLANS_DIR.mkdir(exist_ok=True)
+        path.write_text(structure)
+        pytest.skip(f'{name}: no stored plan, new plan written to {path}, commit it')
+    assert path.read_text() == structure, (
+        f'{name}: plan changed, review it and rerun with UPDATE_QUERY_PLANS=1 to store it in {path}'
+    )
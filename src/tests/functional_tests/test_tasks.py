@@ -1,4 +1,6 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta, timezone
+from importlib import import_module
 from uuid import UUID
 
 import pytest
@@ -9,16 +11,22 @@ from sqlalchemy import select, func, delete, asc
 from sqlalchemy.ext.asyncio import AsyncSession
 from httpx import AsyncClient
 
-from models import User, Task
+from models import User, Task, TaskActivity, TaskStats, TaskTombstone
+from config import app_settings
+from repository.task_repository import PENDING_ACTIVITY_USERS_QUERY, task_group_commit
 from schemas import TaskCreateInputSchema, TaskListOutputSchema, TaskRetrieveOutputSchema, TaskUpdateInputSchema
 
-from ..conftest import client, db_session  # noqa: F401
+from ..conftest import client, db_session, engine, sync_session_maker  # noqa: F401
 from ..utils.mock_auth import mock_token, mock_user  # noqa: F401
 
 
+# Модуль задачи: имя tasks.rollup_task_activity в пакете занято самой задачей.
+rollup_task_activity = import_module('tasks.rollup_task_activity')
+
+
 @pytest_asyncio.fixture(scope='function')
-async def mock_task(db_session: AsyncSession, mock_user: User):  # noqa: F811
-    """Фикстура для создания карточек заданий."""
+async def mock_task(db_session: AsyncSession, mock_user: User, task_rows_cleanup):  # noqa: F811
+    """Фикстура для создания карточек заданий (удаляются вместе со следами и счетчиками в task_rows_cleanup)."""
     task1 = Task(
         title='title1',
         description='description1',
@@ -39,8 +47,14 @@ async def mock_task(db_session: AsyncSession, mock_user: User):  # noqa: F811
     )
     db_session.add_all([task1, task2, task3])
     yield await db_session.commit()
-    stmt = delete(Task)
-    await db_session.execute(stmt)
+
+
+@pytest_asyncio.fixture(scope='function')
+async def task_rows_cleanup(db_session: AsyncSession, mock_user: User):  # noqa: F811
+    """Фикстура удаления карточек пользователя и строк, которые создаются вместе с ними."""
+    yield
+    for model in (Task, TaskTombstone, TaskStats, TaskActivity):
+        await db_session.execute(delete(model).where(model.user_id == mock_user.id))
     await db_session.commit()
 
 
@@ -128,3 +142,237 @@ async def test_update_task(db_session: AsyncSession, client: AsyncClient, mock_t
     assert result['title'] == payload.title
     assert result['description'] == payload.description
     assert result['status'] == payload.status
+
+
+@pytest.mark.asyncio()
+async def test_patch_task(db_session: AsyncSession, client: AsyncClient, mock_token: str, mock_task):  # noqa: F811
+    """Тест частичного обновления карточки задания с проверкой версии."""
+    query = select(Task).order_by(asc('created_at'))
+    query_result = await db_session.execute(query)
+    task = query_result.scalars().first()
+    response = await client.patch(
+        f'/api/tasks/{task.id}',
+        json={'status': True},
+        headers={'Authorization': mock_token, 'If-Match': f'"{task.version}"'},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result['status'] is True
+    assert result['title'] == task.title
+    assert result['version'] == task.version + 1
+    assert response.headers['ETag'] == f'"{task.version + 1}"'
+
+    response = await client.patch(
+        f'/api/tasks/{task.id}',
+        json={'title': 'Stale title'},
+        headers={'Authorization': mock_token, 'If-Match': f'"{task.version}"'},
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert response.headers['ETag'] == f'"{task.version + 1}"'
+
+
+@pytest.mark.asyncio()
+async def test_get_task_changes(
+    db_session: AsyncSession,  # noqa: F811
+    client: AsyncClient,  # noqa: F811
+    mock_token: str,  # noqa: F811
+    mock_task
+):
+    """Тест синхронизации изменений карточек по токену."""
+    response = await client.get('/api/tasks/changes', headers={'Authorization': mock_token})
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert len(result['changed']) == 3
+    assert result['deleted'] == []
+    assert result['has_more'] is False
+    query = select(Task).order_by(asc('created_at'))
+    query_result = await db_session.execute(query)
+    deleted_task, updated_task, _ = query_result.scalars().all()
+    await client.delete(f'/api/tasks/{deleted_task.id}', headers={'Authorization': mock_token})
+    payload = TaskUpdateInputSchema(title='New title', description='New description', status=True)
+    await client.put(f'/api/tasks/{updated_task.id}', json=payload.model_dump(), headers={'Authorization': mock_token})
+    response = await client.get(
+        '/api/tasks/changes', params={'since': result['next_token']}, headers={'Authorization': mock_token}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert [task['id'] for task in result['changed']] == [str(updated_task.id)]
+    assert result['deleted'] == [str(deleted_task.id)]
+
+
+@pytest.mark.asyncio()
+async def test_get_task_stats(client: AsyncClient, mock_token: str, task_rows_cleanup):  # noqa: F811
+    """Тест счетчиков карточек, обновляемых вместе с карточками."""
+    headers = {'Authorization': mock_token}
+    created = []
+    for number in range(2):
+        task_data = TaskCreateInputSchema(title=f'title{number}', description=f'description{number}')
+        response = await client.post('/api/tasks', json=task_data.model_dump(), headers=headers)
+        created.append(response.json()['id'])
+    payload = TaskUpdateInputSchema(title='New title', description='New description', status=True)
+    await client.put(f'/api/tasks/{created[0]}', json=payload.model_dump(), headers=headers)
+    response = await client.get('/api/tasks/stats', headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'total': 2, 'done': 1, 'open': 1}
+    await client.delete(f'/api/tasks/{created[0]}', headers=headers)
+    response = await client.get('/api/tasks/stats', headers=headers)
+    assert response.json() == {'total': 1, 'done': 0, 'open': 1}
+
+
+@pytest.mark.asyncio()
+async def test_batch(db_session: AsyncSession, client: AsyncClient, mock_token: str, mock_task):  # noqa: F811
+    """Тест пакетного запроса: чтения, изменения и ошибки отдельных операций."""
+    query = select(Task).order_by(asc('created_at'))
+    query_result = await db_session.execute(query)
+    first_task, second_task, third_task = query_result.scalars().all()
+    operations = [
+        {'method': 'GET', 'path': f'/tasks/{first_task.id}'},
+        {'method': 'GET', 'path': f'/tasks/{second_task.id}'},
+        {'method': 'PATCH', 'path': f'/tasks/{first_task.id}', 'body': {'status': True}},
+        {'method': 'DELETE', 'path': f'/tasks/{third_task.id}'},
+        {'method': 'POST', 'path': '/tasks', 'body': {'title': 'New title', 'description': 'New description'}},
+        {'method': 'GET', 'path': f'/tasks/{third_task.id}'},
+    ]
+    response = await client.post('/api/batch', json={'operations': operations}, headers={'Authorization': mock_token})
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()['results']
+    assert [result['status'] for result in results] == [
+        status.HTTP_200_OK,
+        status.HTTP_200_OK,
+        status.HTTP_200_OK,
+        status.HTTP_204_NO_CONTENT,
+        status.HTTP_201_CREATED,
+        status.HTTP_404_NOT_FOUND,
+    ]
+    assert results[0]['body']['id'] == str(first_task.id)
+    assert results[2]['body']['status'] is True
+    query = select(func.count(Task.id))
+    result = await db_session.execute(query)
+    assert result.scalar() == 3
+
+
+@pytest.mark.asyncio()
+async def test_get_tasks_cursor_pagination(
+    db_session: AsyncSession,  # noqa: F811
+    client: AsyncClient,  # noqa: F811
+    mock_token: str,  # noqa: F811
+    mock_task
+):
+    """Тест сортировки списка карточек и курсорной пагинации."""
+    headers = {'Authorization': mock_token}
+    response = await client.get('/api/tasks', params={'ordering': '-created_at', 'limit': 2}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert len(first_page) == 2
+    cursor = response.headers['X-Next-Cursor']
+    response = await client.get(
+        '/api/tasks', params={'ordering': '-created_at', 'limit': 2, 'cursor': cursor}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    second_page = response.json()
+    assert len(second_page) == 1
+    assert 'X-Next-Cursor' not in response.headers
+    assert {task['id'] for task in first_page}.isdisjoint(task['id'] for task in second_page)
+
+    response = await client.get('/api/tasks', params={'ordering': 'description'}, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_get_tasks_sparse_fields(
+    db_session: AsyncSession,  # noqa: F811
+    client: AsyncClient,  # noqa: F811
+    mock_token: str,  # noqa: F811
+    mock_task
+):
+    """Тест параметра fields: в ответе списка и карточки только запрошенные поля."""
+    headers = {'Authorization': mock_token}
+    response = await client.get('/api/tasks', params={'fields': 'id,title,status'}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    tasks = response.json()
+    assert tasks and all(set(task) == {'id', 'title', 'status'} for task in tasks)
+
+    response = await client.get(f'/api/tasks/{tasks[0]["id"]}', params={'fields': 'title'}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()) == {'title'}
+    assert response.headers['ETag']
+
+    response = await client.get('/api/tasks', params={'fields': 'password'}, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_get_task_activity(
+    db_session: AsyncSession,  # noqa: F811
+    client: AsyncClient,  # noqa: F811
+    mock_token: str,  # noqa: F811
+    task_rows_cleanup,
+    monkeypatch,
+):
+    """Тест активности по дням: пересчет по отметке activity_seq и дни без активности с нулями."""
+    headers = {'Authorization': mock_token}
+    created = []
+    for number in range(2):
+        task_data = TaskCreateInputSchema(title=f'title{number}', description=f'description{number}')
+        response = await client.post('/api/tasks', json=task_data.model_dump(), headers=headers)
+        created.append(response.json()['id'])
+    await client.patch(f'/api/tasks/{created[0]}', json={'status': True}, headers=headers)
+
+    assert (await db_session.execute(PENDING_ACTIVITY_USERS_QUERY, {'after': UUID(int=0), 'limit': 100})).all()
+    await db_session.commit()
+    monkeypatch.setattr(rollup_task_activity, 'task_sync_session_makers', lambda: [sync_session_maker])
+    monkeypatch.setattr(app_settings, 'task_activity_batch_size', 1)
+    rollup_task_activity.rollup_task_activity()
+    assert not (await db_session.execute(PENDING_ACTIVITY_USERS_QUERY, {'after': UUID(int=0), 'limit': 100})).all()
+
+    today = datetime.now(timezone.utc).date()
+    params = {'from': (today - timedelta(days=1)).isoformat(), 'to': today.isoformat()}
+    response = await client.get('/api/tasks/activity', params=params, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {'day': params['from'], 'created': 0, 'completed': 0},
+        {'day': params['to'], 'created': 2, 'completed': 1},
+    ]
+
+    params = {'from': today.isoformat(), 'to': (today - timedelta(days=1)).isoformat()}
+    response = await client.get('/api/tasks/activity', params=params, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_group_commit_create(db_session: AsyncSession, mock_user: User, task_rows_cleanup):  # noqa: F811
+    """Тест групповой записи: одна пачка, своя карточка каждому, номера изменений подряд и счетчики по пользователю."""
+    other_user = User(username='otheruser', email='otheruser@example.com', password='password')
+    db_session.add(other_user)
+    await db_session.commit()
+    group_commit = task_group_commit(engine)
+    batches = []
+    write = group_commit.write
+
+    async def counted_write(rows):
+        batches.append(len(rows))
+        return await write(rows)
+
+    group_commit.write = counted_write
+    rows = [
+        {'title': f'title{number}', 'description': 'description', 'status': number % 2 == 0, 'user_id': user.id}
+        for number, user in enumerate([mock_user, other_user] * 3)
+    ]
+    created = await asyncio.gather(*(group_commit.submit(dict(row)) for row in rows))
+    group_commit.write = write
+
+    assert batches == [len(rows)]
+    assert [(task.title, task.user_id, task.status) for task in created] == [
+        (row['title'], row['user_id'], row['status']) for row in rows
+    ]
+    for user in (mock_user, other_user):
+        user_tasks = [task for task in created if task.user_id == user.id]
+        assert sorted(task.change_seq for task in user_tasks) == [1, 2, 3]
+        stats = await db_session.get(TaskStats, user.id)
+        assert (stats.total, stats.done, stats.change_seq) == (3, sum(task.status for task in user_tasks), 3)
+        assert all(task.completed_at is not None for task in user_tasks if task.status)
+
+    for model in (Task, TaskStats):
+        await db_session.execute(delete(model).where(model.user_id == other_user.id))
+    await db_session.execute(delete(User).where(User.id == other_user.id))
+    await db_session.commit()
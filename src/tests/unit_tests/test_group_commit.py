@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from repository.group_commit import GroupCommit
+
+
+@pytest.mark.asyncio()
+async def test_group_commit_batches_concurrent_items():
+    """Тест групповой записи: одновременные элементы пишутся одной пачкой, каждый получает свой результат."""
+    batches = []
+
+    async def write(items):
+        batches.append(items)
+        return [item * 10 for item in items]
+
+    group_commit = GroupCommit(write, window=0.01, max_size=4)
+    results = await asyncio.gather(*(group_commit.submit(item) for item in range(6)))
+    assert results == [item * 10 for item in range(6)]
+    assert batches == [[0, 1, 2, 3], [4, 5]]
+
+    assert await group_commit.submit(7) == 70
+    assert batches[-1] == [7]
+
+
+@pytest.mark.asyncio()
+async def test_group_commit_retries_failed_batch_per_item():
+    """Тест групповой записи: при ошибке пачки элементы пишутся по одному, ошибка достается только своему."""
+    batches = []
+
+    async def write(items):
+        batches.append(items)
+        if 'bad' in items:
+            raise ValueError('bad item')
+        return [item.upper() for item in items]
+
+    group_commit = GroupCommit(write, window=0.01, max_size=10)
+    results = await asyncio.gather(*(group_commit.submit(item) for item in ('a', 'bad', 'b')), return_exceptions=True)
+    assert results[0] == 'A' and results[2] == 'B'
+    assert isinstance(results[1], ValueError)
+    assert batches[0] == ['a', 'bad', 'b']
+    assert sorted(batches[1:]) == [['a'], ['b'], ['bad']]
+
+
+@pytest.mark.asyncio()
+async def test_group_commit_cancelled_write_and_close():
+    """Тест групповой записи: отмена записи не оставляет вызывающих ждать, close дописывает накопленное."""
+    written = []
+    blocked = asyncio.Event()
+
+    async def write(items):
+        if items == ['slow']:
+            blocked.set()
+            await asyncio.sleep(10)
+        written.extend(items)
+        return items
+
+    group_commit = GroupCommit(write, window=10, max_size=1)
+    waiter = asyncio.ensure_future(group_commit.submit('slow'))
+    await blocked.wait()
+    for write_task in list(group_commit._writes):
+        write_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(waiter, 1)
+
+    group_commit.max_size = 10
+    waiter = asyncio.ensure_future(group_commit.submit('pending'))
+    await asyncio.sleep(0)
+    await group_commit.close()
+    assert await waiter == 'pending'
+    assert written == ['pending']
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import jwt
+import pytest
+
+from fastapi import APIRouter, FastAPI, status
+from httpx import ASGITransport, AsyncClient
+
+from config import app_settings
+from schemas import TokenType
+from utils.idempotency import IDEMPOTENCY_REPLAYED_HEADER, IdempotentRoute
+
+
+def make_token(user_id: str, minutes: int = 10) -> str:
+    expiration = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    token_data = {
+        'user_id': user_id,
+        'expiration': datetime.strftime(expiration, '%Y-%m-%d %H:%M:%S.%f+00:00'),
+    }
+    token_value = jwt.encode(token_data, app_settings.secret_key, algorithm=app_settings.algorithm)
+    return f'{TokenType.Bearer.value} {token_value}'
+
+
+def make_app() -> tuple:
+    calls = []
+    router = APIRouter(route_class=IdempotentRoute)
+
+    @router.post('/items', status_code=status.HTTP_201_CREATED)
+    async def create_item(payload: dict):
+        calls.append(payload)
+        await asyncio.sleep(0.1)
+        return {'number': len(calls)}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app, calls
+
+
+@pytest.mark.asyncio()
+async def test_idempotent_retries_are_replayed():
+    """Тест повтора запроса с тем же Idempotency-Key: параллельный повтор ждет первый и получает его ответ."""
+    app, calls = make_app()
+    user_id = str(uuid4())
+    headers = {'Authorization': make_token(user_id), 'Idempotency-Key': 'key-1'}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        first, second = await asyncio.gather(
+            client.post('/items', json={'title': 'a'}, headers=headers),
+            client.post('/items', json={'title': 'a'}, headers=headers),
+        )
+        assert len(calls) == 1
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert first.json() == second.json() == {'number': 1}
+        assert {first.headers.get(IDEMPOTENCY_REPLAYED_HEADER), second.headers.get(IDEMPOTENCY_REPLAYED_HEADER)} == {
+            None, 'true'
+        }
+
+        response = await client.post('/items', json={'title': 'b'}, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        refreshed_token_headers = {'Authorization': make_token(user_id, minutes=20), 'Idempotency-Key': 'key-1'}
+        response = await client.post('/items', json={'title': 'a'}, headers=refreshed_token_headers)
+        assert response.json() == {'number': 1}
+        assert response.headers[IDEMPOTENCY_REPLAYED_HEADER] == 'true'
+
+        other_client_headers = {'Authorization': make_token(str(uuid4())), 'Idempotency-Key': 'key-1'}
+        response = await client.post('/items', json={'title': 'a'}, headers=other_client_headers)
+        assert response.json() == {'number': 2}
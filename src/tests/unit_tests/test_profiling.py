@@ -0,0 +1,72 @@
+import pstats
+
+import pytest
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from config import app_settings
+from utils.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, PROFILE_MODE_HEADER, ProfilingMiddleware
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/items')
+    async def get_items():
+        return [{'id': index, 'title': f'item {index}'} for index in range(1000)]
+
+    app.add_middleware(ProfilingMiddleware)
+    return app
+
+
+async def get_items(headers: dict):
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url='http://test') as client:
+        return await client.get('/items', headers=headers)
+
+
+@pytest.fixture()
+def profiling_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_settings, 'profiling_dir', str(tmp_path))
+    monkeypatch.setattr(app_settings, 'profiling_token', 'secret')
+    monkeypatch.setattr(app_settings, 'profiling_sample_rate', 0.0)
+    monkeypatch.setattr(app_settings, 'profiling_interval', 0.0005)
+    return tmp_path
+
+
+@pytest.mark.asyncio()
+async def test_sample_profile(profiling_dir):
+    """Тест профилирования по токену: свернутые стеки и статистика выделений памяти."""
+    response = await get_items({PROFILE_HEADER: 'secret'})
+    assert response.status_code == 200
+    profile_id = response.headers[PROFILE_ID_HEADER]
+
+    folded = (profiling_dir / f'{profile_id}.folded').read_text().splitlines()
+    assert folded
+    for line in folded:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+        assert all(frame.count(':') >= 1 for frame in stack.split(';'))
+    allocations = (profiling_dir / f'{profile_id}.alloc.txt').read_text().splitlines()
+    assert allocations[0].startswith('GET /items ')
+    assert len(allocations) > 1
+
+
+@pytest.mark.asyncio()
+async def test_cprofile_profile(profiling_dir):
+    """Тест профилирования в режиме cprofile: файл pstats читается стандартной библиотекой."""
+    response = await get_items({PROFILE_HEADER: 'secret', PROFILE_MODE_HEADER: 'cprofile'})
+    profile_id = response.headers[PROFILE_ID_HEADER]
+
+    stats = pstats.Stats(str(profiling_dir / f'{profile_id}.prof'))
+    assert any(name == 'get_items' for _, _, name in stats.stats)
+    assert not (profiling_dir / f'{profile_id}.folded').exists()
+
+
+@pytest.mark.asyncio()
+async def test_wrong_token_is_not_profiled(profiling_dir):
+    """Тест: запрос с неверным токеном не профилируется."""
+    response = await get_items({PROFILE_HEADER: 'wrong'})
+    assert response.status_code == 200
+    assert PROFILE_ID_HEADER not in response.headers
+    assert not list(profiling_dir.iterdir())
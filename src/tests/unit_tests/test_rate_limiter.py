@@ -0,0 +1,56 @@
+import pytest
+
+from fastapi import Depends, FastAPI, HTTPException, status
+from httpx import ASGITransport, AsyncClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from utils.rate_limiter import InMemoryTokenBucketBackend, RateLimit, check_rate_limit, rate_limit
+
+
+def test_parse_rate_limit():
+    """Тест разбора лимита."""
+    limit = RateLimit.parse('30/minute')
+    assert limit.capacity == 30
+    assert limit.rate == 0.5
+
+
+@pytest.mark.asyncio()
+async def test_in_memory_token_bucket():
+    """Тест ведра токенов в памяти: запросы сверх емкости получают время ожидания."""
+    backend = InMemoryTokenBucketBackend()
+    limit = RateLimit.parse('2/minute')
+    assert await backend.acquire('key', limit) == 0
+    assert await backend.acquire('key', limit) == 0
+    wait = await backend.acquire('key', limit)
+    assert 0 < wait <= 30
+    assert await backend.acquire('other', limit) == 0
+
+
+@pytest.mark.asyncio()
+async def test_rate_limit_retry_after():
+    """Тест ответа 429 с заголовком Retry-After."""
+    limit = RateLimit.parse('1/hour')
+    await check_rate_limit('test', 'client', limit)
+    with pytest.raises(HTTPException) as error:
+        await check_rate_limit('test', 'client', limit)
+    assert error.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(error.value.headers['Retry-After']) > 0
+
+
+@pytest.mark.asyncio()
+async def test_ip_rate_limit_behind_proxy():
+    """Тест лимита по IP за доверенным прокси: клиенты с разными X-Forwarded-For считаются отдельно."""
+    app = FastAPI()
+
+    @app.get('/items', dependencies=[Depends(rate_limit('test_proxy', '1/hour'))])
+    async def get_items():
+        return {}
+
+    proxied_app = ProxyHeadersMiddleware(app, trusted_hosts='127.0.0.1')
+    transport = ASGITransport(app=proxied_app, client=('127.0.0.1', 123))
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        first = await client.get('/items', headers={'X-Forwarded-For': '203.0.113.1'})
+        second = await client.get('/items', headers={'X-Forwarded-For': '203.0.113.2'})
+        repeated = await client.get('/items', headers={'X-Forwarded-For': '203.0.113.1'})
+    assert first.status_code == second.status_code == status.HTTP_200_OK
+    assert repeated.status_code == status.HTTP_429_TOO_MANY_REQUESTS
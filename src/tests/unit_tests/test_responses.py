@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import cbor2
+import msgpack
+
+from utils import negotiate_media_type, render_response
+from utils.responses import CBOR_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+
+
+def test_negotiate_media_type():
+    """Тест выбора формата ответа по заголовку Accept."""
+    assert negotiate_media_type(None) == JSON_MEDIA_TYPE
+    assert negotiate_media_type('*/*') == JSON_MEDIA_TYPE
+    assert negotiate_media_type('text/html, application/xml') == JSON_MEDIA_TYPE
+    assert negotiate_media_type('application/msgpack') == MSGPACK_MEDIA_TYPE
+    assert negotiate_media_type('application/json, application/cbor') == JSON_MEDIA_TYPE
+    assert negotiate_media_type('application/json;q=0.5, application/cbor') == CBOR_MEDIA_TYPE
+    assert negotiate_media_type('application/msgpack;q=0') == JSON_MEDIA_TYPE
+
+
+def test_binary_response_is_compact():
+    """Тест MessagePack и CBOR: UUID передаются байтами, даты - микросекундами от начала эпохи."""
+    task_id = uuid4()
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    content = [{'id': task_id, 'title': 'title', 'status': True, 'created_at': created_at}]
+    expected = [{
+        'id': task_id.bytes,
+        'title': 'title',
+        'status': True,
+        'created_at': int(created_at.replace(tzinfo=timezone.utc).timestamp()) * 1_000_000 + 123456,
+    }]
+
+    response = render_response(content, MSGPACK_MEDIA_TYPE, headers={'ETag': '"1"'})
+    assert response.media_type == MSGPACK_MEDIA_TYPE
+    assert response.headers['Vary'] == 'Accept'
+    assert response.headers['ETag'] == '"1"'
+    assert msgpack.unpackb(response.body) == expected
+
+    response = render_response(content, CBOR_MEDIA_TYPE)
+    assert cbor2.loads(response.body) == expected
+    assert len(response.body) < len(render_response(content).body)
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Бюджет времени запуска процесса API в секундах. Переопределяется переменными окружения
+# для медленных CI-машин, но любое превышение считается регрессией.
+IMPORT_TIME_BUDGET = float(os.environ.get('STARTUP_IMPORT_TIME_BUDGET', 3.0))
+FIRST_REQUEST_BUDGET = float(os.environ.get('STARTUP_FIRST_REQUEST_BUDGET', 0.5))
+
+STARTUP_BENCHMARK = """
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+from httpx import ASGITransport, AsyncClient
+
+
+async def first_request():
+    async with AsyncClient(transport=ASGITransport(app=main.app), base_url='http://test') as client:
+        return (await client.get('/openapi.json')).status_code
+
+status_code = asyncio.run(first_request())
+print(json.dumps({
+    'import_time': imported - started,
+    'first_request_time': time.perf_counter() - imported,
+    'status_code': status_code,
+    'heavy_modules': sorted({'celery', 'debugpy', 'worker_config', 'tasks'} & set(sys.modules)),
+}))
+"""
+
+
+def test_api_startup_time():
+    """Тест времени запуска API: импорт main и первый запрос укладываются в бюджет без Celery и debugpy."""
+    src_dir = Path(__file__).resolve().parents[2]
+    completed = subprocess.run(
+        [sys.executable, '-c', STARTUP_BENCHMARK], cwd=src_dir, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert result['status_code'] == 200
+    assert result['heavy_modules'] == []
+    assert result['import_time'] < IMPORT_TIME_BUDGET, result
+    assert result['first_request_time'] < FIRST_REQUEST_BUDGET, result
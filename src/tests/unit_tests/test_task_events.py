@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from models import Task
+from repository.task_repository import TASK_EVENT_PAYLOAD_LIMIT, task_event_payload
+from schemas import TaskEventSchema, TaskEventType
+from services.task_events import TaskEventBroker
+
+
+@pytest.mark.asyncio()
+async def test_broker_fan_out():
+    """Тест раздачи уведомления только подписчикам владельца карточки."""
+    broker = TaskEventBroker('task_events')
+    broker._started = True
+    owner_id, other_id = uuid4(), uuid4()
+    payload = TaskEventSchema(event=TaskEventType.deleted, id=uuid4(), user_id=owner_id).model_dump_json()
+    async with broker.subscribe(owner_id) as first, broker.subscribe(owner_id) as second:
+        async with broker.subscribe(other_id) as other:
+            broker._on_notify(None, 0, 'task_events', payload)
+            assert other.empty()
+        for queue in (first, second):
+            message = queue.get_nowait()
+            assert message == f'event: deleted\ndata: {payload}\n\n'
+    assert not broker._subscribers
+
+
+def test_event_payload_fits_notify_limit():
+    """Тест payload события: без описания, а при длинном заголовке - только id, если не укладывается в NOTIFY."""
+    task = Task(
+        id=uuid4(), user_id=uuid4(), title='title', description='d' * 8000, status=False, created_at=datetime.now()
+    )
+    payload = json.loads(task_event_payload(TaskEventType.updated, task))
+    assert payload['title'] == 'title' and 'description' not in payload
+
+    task.title = 't' * 8000
+    payload = task_event_payload(TaskEventType.updated, task)
+    assert len(payload.encode()) <= TASK_EVENT_PAYLOAD_LIMIT
+    assert json.loads(payload) == {'event': 'updated', 'id': str(task.id), 'user_id': str(task.user_id)}
@@ -0,0 +1,46 @@
+from uuid import uuid4
+
+import pytest
+
+from fastapi import HTTPException
+
+from repository.task_repository import user_task_row_query, user_task_rows_query, user_tasks_query
+from schemas import TaskListOutputSchema
+from utils.task_fields import ALL_TASK_FIELDS, parse_task_fields, task_fields_schema
+from utils.task_ordering import parse_task_ordering
+
+
+def test_parse_task_fields():
+    """Тест разбора параметра fields: порядок полей как в схеме, один объект на набор."""
+    assert parse_task_fields(None) is ALL_TASK_FIELDS
+    fields = parse_task_fields('status, title,id,title')
+    assert fields.names == ('id', 'title', 'status')
+    assert fields is parse_task_fields('id,title,status')
+    assert not fields.include_user
+    assert parse_task_fields('title,user').columns == ('title',)
+    for value in ('', 'password', 'id,user_id'):
+        with pytest.raises(HTTPException):
+            parse_task_fields(value)
+
+
+def test_task_fields_schema():
+    """Тест суженной схемы: только запрошенные поля, схема строится один раз."""
+    fields = parse_task_fields('id,title,status')
+    schema = task_fields_schema(TaskListOutputSchema, fields)
+    assert schema is task_fields_schema(TaskListOutputSchema, fields)
+    assert list(schema.model_fields) == ['id', 'title', 'status']
+    assert task_fields_schema(TaskListOutputSchema, ALL_TASK_FIELDS) is TaskListOutputSchema
+    task = {'id': uuid4(), 'title': 'title', 'status': False}
+    assert schema.model_validate(task).model_dump() == task
+
+
+def test_task_fields_narrow_sql_projection():
+    """Тест запросов: читаются только запрошенные колонки и поля курсора."""
+    ordering = parse_task_ordering('updated_at')
+    query = user_task_rows_query(ordering, False, ('id', 'title', 'status'))
+    assert [column.key for column in query.selected_columns] == ['id', 'title', 'status', 'updated_at']
+    assert user_task_rows_query(ordering, False, ('id', 'title', 'status')) is query
+    columns = [column.key for column in user_task_row_query(('title',)).selected_columns]
+    assert columns == ['title', 'version']
+    sql = str(user_tasks_query(ordering, False, ('title',)).compile())
+    assert 'description' not in sql
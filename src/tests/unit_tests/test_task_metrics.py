@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from utils.task_client import EMAIL_QUEUE, MAINTENANCE_QUEUE, SEND_EMAIL_TASK, get_task_client
+from utils.task_metrics import queue_wait, render_task_metrics
+
+
+def test_task_routes():
+    """Тест маршрутизации: письма уходят в свою очередь, остальные задачи - в очередь обслуживания."""
+    router = get_task_client().amqp.router
+    assert router.route({}, SEND_EMAIL_TASK)['queue'].name == EMAIL_QUEUE
+    assert router.route({}, 'tasks.reconcile_task_stats.reconcile_task_stats')['queue'].name == MAINTENANCE_QUEUE
+
+
+def test_queue_wait():
+    """Тест ожидания в очереди: для отложенной задачи считается от запланированного времени."""
+    assert queue_wait(None, None, 100.0) is None
+    assert queue_wait(90.0, None, 100.0) == 10.0
+    eta = datetime.fromtimestamp(95.0, tz=timezone.utc).isoformat()
+    assert queue_wait(90.0, eta, 100.0) == 5.0
+    assert queue_wait(90.0, eta, 94.0) == 0.0
+
+
+def test_render_task_metrics():
+    """Тест формата Prometheus: у каждой очереди есть все метрики, отсутствующие счетчики равны 0."""
+    text = render_task_metrics(
+        {EMAIL_QUEUE: 3, MAINTENANCE_QUEUE: 0},
+        {EMAIL_QUEUE: {'tasks': 10.0, 'wait_seconds': 1.5, 'run_seconds': 4.25, 'last_wait_seconds': 0.1}},
+    )
+    lines = text.splitlines()
+    assert 'celery_queue_length{queue="email"} 3' in lines
+    assert 'celery_queue_length{queue="maintenance"} 0' in lines
+    assert 'celery_tasks_total{queue="email"} 10' in lines
+    assert 'celery_task_wait_seconds_total{queue="email"} 1.5' in lines
+    assert 'celery_task_failures_total{queue="email"} 0' in lines
+    assert 'celery_task_run_seconds_total{queue="maintenance"} 0' in lines
+    assert '# TYPE celery_tasks_total counter' in lines
@@ -0,0 +1,42 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from fastapi import HTTPException, status
+
+from models import Task
+from utils.task_ordering import SUPPORTED_TASK_ORDERINGS, TASK_ORDERINGS, parse_task_ordering
+
+
+def index_columns(index) -> list:
+    return [getattr(expression, 'name', None) or str(expression) for expression in index.expressions]
+
+
+def test_supported_orderings_have_indexes():
+    """Тест: для каждой поддерживаемой сортировки есть составной индекс (user_id, поля..., id)."""
+    indexes = [index_columns(index) for index in Task.__table__.indexes]
+    for value in SUPPORTED_TASK_ORDERINGS:
+        fields = [f'{field[1:]} DESC' if field.startswith('-') else field for field in value.split(',')]
+        assert ['user_id', *fields, 'id'] in indexes, value
+
+
+def test_parse_task_ordering():
+    """Тест разбора сортировки: обратные сортировки поддерживаются, неизвестные поля - нет."""
+    assert parse_task_ordering(None) is TASK_ORDERINGS['created_at']
+    assert parse_task_ordering('status,-created_at') is TASK_ORDERINGS['status,-created_at']
+    with pytest.raises(HTTPException) as error:
+        parse_task_ordering('description')
+    assert error.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_task_cursor():
+    """Тест курсора: значения полей восстанавливаются, курсор другой сортировки отклоняется."""
+    ordering = parse_task_ordering('-status,created_at')
+    task = {'status': True, 'created_at': datetime.now(), 'id': uuid4()}
+    params = ordering.cursor_params(ordering.make_cursor(task))
+    assert params == {'cursor_0': task['status'], 'cursor_1': task['created_at'], 'cursor_2': task['id']}
+    with pytest.raises(HTTPException):
+        parse_task_ordering('title').cursor_params(ordering.make_cursor(task))
+    with pytest.raises(HTTPException):
+        ordering.cursor_params('not-a-cursor')
@@ -0,0 +1,26 @@
+import json
+from datetime import datetime
+from uuid import uuid4
+
+from models import User
+from repository.task_repository import TASK_READ_COLUMNS
+from schemas import TaskListOutputSchema
+from services import TaskService
+from utils import json_response
+
+
+def test_task_row_payload_matches_schema():
+    """Тест чтения без ORM: ответ из строки совпадает с ответом через схему TaskListOutputSchema."""
+    user = User(id=uuid4(), username='user', email='user@example.com')
+    row = {
+        'id': uuid4(),
+        'title': 'title',
+        'description': 'description',
+        'status': False,
+        'created_at': datetime.now(),
+        'version': 1,
+    }
+    assert set(row) == {column.key for column in TASK_READ_COLUMNS}
+    row['user'] = TaskService._user_payload(user)
+    expected = TaskListOutputSchema.model_validate(row).model_dump_json()
+    assert json.loads(json_response([row]).body) == [json.loads(expected)]
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from config import app_settings
+from utils.tracing import REQUEST_ID_HEADER, TracingMiddleware, span, trace_methods, trace_sink
+
+
+@trace_methods('service')
+class ItemService:
+    async def get_item(self) -> dict:
+        with span('repository.query', table='item'):
+            return {'id': 1}
+
+    async def _helper(self):
+        pass
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/items')
+    async def get_items():
+        return await ItemService().get_item()
+
+    app.add_middleware(TracingMiddleware)
+    return app
+
+
+def read_records(path) -> list:
+    trace_sink.close()
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.asyncio()
+async def test_sampled_request_is_traced(tmp_path, monkeypatch):
+    """Тест трассировки: идентификатор запроса возвращается в ответе, интервалы слоев вложены."""
+    path = tmp_path / 'trace.jsonl'
+    monkeypatch.setattr(app_settings, 'trace_file', str(path))
+    monkeypatch.setattr(app_settings, 'trace_sample_rate', 1.0)
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url='http://test') as client:
+        response = await client.get('/items', headers={REQUEST_ID_HEADER: 'request-1'})
+    assert response.headers[REQUEST_ID_HEADER] == 'request-1'
+
+    [record] = read_records(path)
+    assert record['type'] == 'request'
+    assert record['request_id'] == 'request-1'
+    assert (record['method'], record['path'], record['status']) == ('GET', '/items', 200)
+    service_span, query_span = record['spans']
+    assert service_span['name'] == 'service.ItemService.get_item'
+    assert service_span['parent'] is None
+    assert query_span == {
+        'name': 'repository.query',
+        'parent': 0,
+        'start_ms': query_span['start_ms'],
+        'duration_ms': query_span['duration_ms'],
+        'attributes': {'table': 'item'},
+    }
+    assert query_span['duration_ms'] <= service_span['duration_ms'] <= record['duration_ms']
+    assert not hasattr(ItemService._helper, '__wrapped__')
+
+
+@pytest.mark.asyncio()
+async def test_fast_unsampled_request_is_not_written(tmp_path, monkeypatch):
+    """Тест трассировки: быстрый запрос вне выборки не пишется, невалидный X-Request-ID заменяется."""
+    path = tmp_path / 'trace.jsonl'
+    monkeypatch.setattr(app_settings, 'trace_file', str(path))
+    monkeypatch.setattr(app_settings, 'trace_sample_rate', 0.0)
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url='http://test') as client:
+        response = await client.get('/items', headers={REQUEST_ID_HEADER: 'bad id\n'})
+    assert len(response.headers[REQUEST_ID_HEADER]) == 32
+    assert read_records(path) == []
+
+    monkeypatch.setattr(app_settings, 'trace_slow_request_ms', 0)
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url='http://test') as client:
+        await client.get('/items')
+    [record] = read_records(path)
+    assert record['sampled'] is False
@@ -0,0 +1,59 @@
+import pytest
+
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, status
+from httpx import ASGITransport, AsyncClient
+
+from db import unit_of_work
+
+
+class SessionStub:
+    """Сессия, которая запоминает фиксации и откаты транзакции."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def flush(self):
+        self.calls.append('flush')
+
+    async def commit(self):
+        self.calls.append('commit')
+
+    async def rollback(self):
+        self.calls.append('rollback')
+
+
+def make_app(session: SessionStub) -> FastAPI:
+    async def get_session():
+        async with unit_of_work(session):
+            yield session
+
+    app = FastAPI()
+
+    @app.post('/items')
+    async def create_item(
+        background_tasks: BackgroundTasks, fail: bool = False, current_session: SessionStub = Depends(get_session)
+    ):
+        await current_session.flush()
+        await current_session.flush()
+        background_tasks.add_task(current_session.calls.append, 'send_task')
+        if fail:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='fail')
+        return {'calls': list(current_session.calls)}
+
+    return app
+
+
+@pytest.mark.asyncio()
+async def test_unit_of_work_commits_once_per_request():
+    """Тест единицы работы: одна фиксация после обработчика, фоновые задачи после нее, откат при ошибке."""
+    session = SessionStub()
+    async with AsyncClient(transport=ASGITransport(app=make_app(session)), base_url='http://test') as client:
+        response = await client.post('/items')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'calls': ['flush', 'flush']}
+        assert session.calls == ['flush', 'flush', 'commit', 'send_task']
+
+        session.calls.clear()
+        response = await client.post('/items', params={'fail': True})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert session.calls == ['flush', 'flush', 'rollback']
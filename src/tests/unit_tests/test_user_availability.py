@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import app_settings
+from services.user_availability import UserAvailabilityFilter
+from utils.bloom_filter import BloomFilter
+
+
+class UsersStub:
+    """Пользователи в памяти вместо таблицы user."""
+
+    def __init__(self):
+        self.users = []
+        self.loads = []
+
+    def register(self, username: str, email: str):
+        self.users.append((username, email, datetime(2024, 1, 1) + timedelta(minutes=len(self.users))))
+
+    async def count_users(self) -> int:
+        return len(self.users)
+
+    async def stream_logins(self, since=None):
+        self.loads.append(since)
+        for user in self.users:
+            if since is None or user[2] >= since:
+                yield user
+
+
+def test_bloom_filter():
+    """Тест фильтра Блума: добавленные значения всегда найдены, ложных срабатываний не больше заданных."""
+    bloom = BloomFilter(10000, 0.01)
+    values = [f'user{index}' for index in range(10000)]
+    for value in values:
+        bloom.add(value)
+    assert all(value in bloom for value in values)
+    false_positives = sum(f'other{index}' in bloom for index in range(10000))
+    assert false_positives < 200
+
+
+@pytest.mark.asyncio()
+async def test_availability_filter_refresh(monkeypatch):
+    """Тест фильтра занятых логинов: построение, догрузка новых пользователей и регистрация в процессе."""
+    monkeypatch.setattr(app_settings, 'registration_filter_refresh_seconds', 0)
+    users = UsersStub()
+    users.register('alice', 'alice@example.com')
+    availability = UserAvailabilityFilter()
+    assert availability.might_exist('username', 'anyone')
+
+    await availability.refresh(users)
+    assert availability.might_exist('username', 'alice')
+    assert availability.might_exist('email', 'alice@example.com')
+    assert not availability.might_exist('username', 'bob')
+
+    users.register('bob', 'bob@example.com')
+    await availability.refresh(users)
+    assert availability.might_exist('username', 'bob')
+    assert users.loads[0] is None
+    assert users.loads[1] == users.users[0][2] - timedelta(minutes=1)
+
+    availability.add('carol', 'carol@example.com')
+    assert availability.might_exist('email', 'carol@example.com')
@@ -1,7 +1,23 @@
 __all__ = (
+    'IdempotentRoute',
+    'json_response',
+    'negotiate_media_type',
+    'render_response',
     'get_current_user',
+    'make_etag',
+    'parse_if_match',
+    'get_task_session',
     'prepare_ordering',
+    'rate_limit',
+    'send_task',
+    'SEND_EMAIL_TASK',
 )
 
+from .etag import make_etag, parse_if_match
 from .get_current_user import get_current_user
+from .get_task_session import get_task_session
+from .idempotency import IdempotentRoute
 from .prepare_ordering import prepare_ordering
+from .rate_limiter import rate_limit
+from .responses import json_response, negotiate_media_type, render_response
+from .task_client import SEND_EMAIL_TASK, send_task
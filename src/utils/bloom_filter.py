@@ -0,0 +1,43 @@
+from hashlib import blake2b
+from math import ceil, log
+from typing import List
+
+
+class BloomFilter:
+    """Фильтр Блума для строк.
+
+    Отвечает «точно нет» или «возможно да»: ложноположительные ответы случаются с заданной
+    вероятностью, ложноотрицательных нет. Позиции битов получаются двойным хэшированием
+    одного 128-битного blake2b, поэтому на значение считается один хэш.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        """Конструктор фильтра.
+
+        Args:
+            capacity (int): Ожидаемое количество значений.
+            error_rate (float): Вероятность ложноположительного ответа при capacity значениях.
+        """
+        capacity = max(capacity, 1)
+        self.size = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> List[int]:
+        digest = blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, value: str):
+        """Добавляем значение.
+
+        Args:
+            value (str): Значение.
+        """
+        bits = self._bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
@@ -0,0 +1,41 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+
+def make_etag(version: int) -> str:
+    """Значение заголовка ETag для версии карточки.
+
+    Args:
+        version (int): Версия карточки.
+
+    Returns:
+        str: ETag вида "3".
+    """
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Получаем ожидаемую версию карточки из заголовка If-Match.
+
+    Args:
+        if_match (Optional[str]): Значение заголовка ("3", W/"3" или *).
+
+    Raises:
+        HTTPException: Значение заголовка не является версией карточки.
+
+    Returns:
+        Optional[int]: Ожидаемая версия или None, если проверять версию не нужно.
+    """
+    if if_match is None or if_match.strip() == '*':
+        return None
+    value = if_match.strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    value = value.strip('"')
+    if not value.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail='Invalid If-Match header'
+        )
+    return int(value)
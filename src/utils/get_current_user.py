@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 
 from fastapi import Request, HTTPException, status, Depends
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from jwt import decode
@@ -12,6 +12,12 @@ from config import app_settings
 from db.database import get_async_session
 from models import User
 
+from .tracing import span
+
+
+# Запрос выполняется на каждом запросе API, поэтому строится один раз.
+CURRENT_USER_QUERY = select(User).where(User.id == bindparam('user_id'))
+
 
 def get_token(request: Request) -> str:
     """Получаем токен из запроса.
@@ -31,19 +37,18 @@ def get_token(request: Request) -> str:
     return token
 
 
-async def get_current_user(token: str = Depends(get_token), session: AsyncSession = Depends(get_async_session)) -> User:
-    """Получаем текущего пользователя.
+def get_token_user_id(token: str) -> str:
+    """Проверяем подпись и срок действия токена и получаем из него id пользователя без обращения к БД.
 
     Args:
-        token (str, optional): Получаем токен из заголовков. Defaults to Depends(get_token).
-        session (AsyncSession, optional): Получаем сессию. Defaults to Depends(get_async_session).
+        token (str): Значение заголовка Authorization.
 
     Raises:
-        HTTPException: Не нашли токен в заголовке.
         HTTPException: Ошибка при декодировании токена.
+        HTTPException: Срок действия токена истек.
 
     Returns:
-        User: Текущий пользователь.
+        str: id пользователя.
     """
     _, token_data = token.split()
     try:
@@ -53,15 +58,34 @@ async def get_current_user(token: str = Depends(get_token), session: AsyncSessio
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Invalid token'
         )
-    expire = datetime.strptime(payload.get('expiration'), '%Y-%m-%d %H:%M:%S.%f+00:00').replace(tzinfo=timezone.utc)
+    expire = datetime.strptime(
+        payload.get('expiration'), '%Y-%m-%d %H:%M:%S.%f+00:00'
+    ).replace(tzinfo=timezone.utc)
     current_datetime = datetime.now(tz=timezone.utc)
     if current_datetime >= expire:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Token is expired'
         )
-    user_id = payload.get('user_id')
-    query = select(User).where(User.id == user_id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
-    return user
+    return payload.get('user_id')
+
+
+async def get_current_user(token: str = Depends(get_token), session: AsyncSession = Depends(get_async_session)) -> User:
+    """Получаем текущего пользователя.
+
+    Args:
+        token (str, optional): Получаем токен из заголовков. Defaults to Depends(get_token).
+        session (AsyncSession, optional): Получаем сессию. Defaults to Depends(get_async_session).
+
+    Raises:
+        HTTPException: Не нашли токен в заголовке.
+        HTTPException: Ошибка при декодировании токена.
+
+    Returns:
+        User: Текущий пользователь.
+    """
+    with span('api.get_current_user'):
+        user_id = get_token_user_id(token)
+        result = await session.execute(CURRENT_USER_QUERY, {'user_id': user_id})
+        user = result.scalar_one_or_none()
+        return user
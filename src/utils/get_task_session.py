@@ -0,0 +1,33 @@
+from typing import AsyncGenerator
+
+from fastapi import Depends
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_session, unit_of_work
+from db.sharding import get_user_shard, shard_session_makers
+from models import User
+
+from .get_current_user import get_current_user
+
+
+async def get_task_session(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Получаем сессию БД, в которой хранятся карточки текущего пользователя.
+
+    Args:
+        current_user (User, optional): Текущий пользователь. Defaults to Depends(get_current_user).
+        session (AsyncSession, optional): Сессия основной БД. Defaults to Depends(get_async_session).
+
+    Returns:
+        AsyncGenerator[AsyncSession, None]: Сессия основной БД или шарда пользователя. Транзакция
+            фиксируется один раз в конце запроса (см. unit_of_work).
+    """
+    shard = get_user_shard(current_user.id, current_user.shard)
+    if shard is None:
+        yield session
+        return
+    async with shard_session_makers[shard]() as shard_session, unit_of_work(shard_session):
+        yield shard_session
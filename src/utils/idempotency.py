@@ -0,0 +1,291 @@
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from base64 import b64decode, b64encode
+from dataclasses import asdict, dataclass, field
+from hashlib import sha256
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+
+from redis.exceptions import RedisError
+
+from config import app_settings
+
+from .get_current_user import get_token_user_id
+from .redis_client import get_redis
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_REPLAYED_HEADER = 'Idempotent-Replayed'
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENT_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+POLL_DELAY = 0.05
+MAX_POLL_DELAY = 0.5
+
+
+@dataclass
+class StoredResponse:
+    """Запись ключа идемпотентности: выполняющийся запрос или его сохраненный ответ."""
+
+    fingerprint: str
+    status_code: Optional[int] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b''
+
+    @property
+    def in_flight(self) -> bool:
+        """Запрос с этим ключом еще выполняется."""
+        return self.status_code is None
+
+
+class IdempotencyBackendABC(ABC):
+    """Интерфейс хранилища ответов по ключам идемпотентности."""
+
+    @abstractmethod
+    async def reserve(self, key: str, fingerprint: str, lock_ttl: int) -> Optional[StoredResponse]:
+        """Занимаем ключ под выполнение запроса. Возвращаем None, если ключ занят нами, иначе его запись."""
+        pass
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        """Получаем запись ключа."""
+        pass
+
+    @abstractmethod
+    async def save(self, key: str, stored: StoredResponse, ttl: int):
+        """Сохраняем ответ запроса."""
+        pass
+
+    @abstractmethod
+    async def release(self, key: str):
+        """Освобождаем ключ, чтобы повтор выполнил запрос заново."""
+        pass
+
+
+class InMemoryIdempotencyBackend(IdempotencyBackendABC):
+    """Ответы в памяти процесса (повторы распознаются в пределах одного воркера)."""
+
+    def __init__(self):
+        self._records: Dict[str, Tuple[StoredResponse, float]] = {}
+
+    def _get(self, key: str) -> Optional[StoredResponse]:
+        stored, expires_at = self._records.get(key, (None, 0.0))
+        if stored is not None and expires_at <= time.monotonic():
+            del self._records[key]
+            return None
+        return stored
+
+    async def reserve(self, key: str, fingerprint: str, lock_ttl: int) -> Optional[StoredResponse]:
+        stored = self._get(key)
+        if stored is None:
+            self._records[key] = (StoredResponse(fingerprint=fingerprint), time.monotonic() + lock_ttl)
+        return stored
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        return self._get(key)
+
+    async def save(self, key: str, stored: StoredResponse, ttl: int):
+        self._records[key] = (stored, time.monotonic() + ttl)
+        now = time.monotonic()
+        for expired_key in [key for key, (_, expires_at) in self._records.items() if expires_at <= now]:
+            del self._records[expired_key]
+
+    async def release(self, key: str):
+        self._records.pop(key, None)
+
+
+class RedisIdempotencyBackend(IdempotencyBackendABC):
+    """Ответы в Redis (повторы распознаются всеми воркерами)."""
+
+    @staticmethod
+    def _dumps(stored: StoredResponse) -> str:
+        data = asdict(stored)
+        data['body'] = b64encode(stored.body).decode()
+        return json.dumps(data)
+
+    @staticmethod
+    def _loads(value: Optional[bytes]) -> Optional[StoredResponse]:
+        if value is None:
+            return None
+        data = json.loads(value)
+        data['body'] = b64decode(data['body'])
+        return StoredResponse(**data)
+
+    async def reserve(self, key: str, fingerprint: str, lock_ttl: int) -> Optional[StoredResponse]:
+        try:
+            reserved = await get_redis().set(
+                key, self._dumps(StoredResponse(fingerprint=fingerprint)), nx=True, ex=lock_ttl
+            )
+            if reserved:
+                return None
+            return self._loads(await get_redis().get(key))
+        except RedisError:
+            # Недоступность Redis не должна ронять API: выполняем запрос без защиты от повторов.
+            return None
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        try:
+            return self._loads(await get_redis().get(key))
+        except RedisError:
+            return None
+
+    async def save(self, key: str, stored: StoredResponse, ttl: int):
+        try:
+            await get_redis().set(key, self._dumps(stored), ex=ttl)
+        except RedisError:
+            pass
+
+    async def release(self, key: str):
+        try:
+            await get_redis().delete(key)
+        except RedisError:
+            pass
+
+
+_backend: Optional[IdempotencyBackendABC] = None
+
+
+def get_idempotency_backend() -> IdempotencyBackendABC:
+    """Хранилище ответов, выбранное настройкой IDEMPOTENCY_BACKEND."""
+    global _backend
+    if _backend is None:
+        if app_settings.idempotency_backend == 'redis':
+            _backend = RedisIdempotencyBackend()
+        else:
+            _backend = InMemoryIdempotencyBackend()
+    return _backend
+
+
+def _client_identity(request: Request) -> Optional[str]:
+    """Клиент, в пределах которого действует ключ идемпотентности.
+
+    Для запроса с токеном - id пользователя из токена, поэтому повтор с обновленным токеном
+    распознается. Без токена - адрес клиента.
+
+    Args:
+        request (Request): Запрос.
+
+    Returns:
+        Optional[str]: Клиент или None, если токен недействителен.
+    """
+    token = request.headers.get('Authorization')
+    if not token:
+        return f'ip:{request.client.host if request.client else ""}'
+    try:
+        return f'user:{get_token_user_id(token)}'
+    except (HTTPException, ValueError):
+        return None
+
+
+def _hash(*parts: bytes) -> str:
+    digest = sha256()
+    for part in parts:
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+async def _replay_or_wait(
+    backend: IdempotencyBackendABC,
+    key: str,
+    fingerprint: str,
+    stored: Optional[StoredResponse],
+) -> Optional[Response]:
+    """Дожидаемся ответа запроса с тем же ключом и повторяем его.
+
+    Args:
+        backend (IdempotencyBackendABC): Хранилище ответов.
+        key (str): Ключ в хранилище.
+        fingerprint (str): Отпечаток текущего запроса.
+        stored (Optional[StoredResponse]): Запись ключа (None - ключ занят текущим запросом).
+
+    Raises:
+        HTTPException: Ключ использован с другим запросом или первый запрос не завершился вовремя.
+
+    Returns:
+        Optional[Response]: Сохраненный ответ или None, если запрос нужно выполнить.
+    """
+    deadline = time.monotonic() + app_settings.idempotency_lock_timeout
+    delay = POLL_DELAY
+    while stored is not None:
+        if stored.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail='Idempotency-Key is already used with another request'
+            )
+        if not stored.in_flight:
+            headers = dict(stored.headers, **{IDEMPOTENCY_REPLAYED_HEADER: 'true'})
+            return Response(content=stored.body, status_code=stored.status_code, headers=headers)
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail='A request with this Idempotency-Key is still in progress'
+            )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_POLL_DELAY)
+        stored = await backend.get(key)
+        if stored is None:
+            # Первый запрос завершился ошибкой и освободил ключ: пробуем выполнить запрос сами.
+            stored = await backend.reserve(key, fingerprint, app_settings.idempotency_lock_timeout)
+    return None
+
+
+class IdempotentRoute(APIRoute):
+    """Маршрут, повторяющий сохраненный ответ на запрос с тем же заголовком Idempotency-Key.
+
+    Ключ действует в пределах пользователя из токена (без токена - адреса клиента). Параллельный повтор ждет
+    завершения первого запроса, а не выполняет его еще раз. Сохраняются только успешные
+    ответы, после ошибки повтор выполнит запрос заново.
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+        if not self.methods & IDEMPOTENT_METHODS:
+            return route_handler
+
+        async def idempotent_route_handler(request: Request) -> Response:
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return await route_handler(request)
+            if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='Idempotency-Key is too long'
+                )
+            client = _client_identity(request)
+            if client is None:
+                # Запрос с недействительным токеном отклонит проверка пользователя, сохранять нечего.
+                return await route_handler(request)
+            key = f'idempotency:{_hash(client.encode(), idempotency_key.encode())}'
+            fingerprint = _hash(request.method.encode(), request.url.path.encode(), await request.body())
+
+            backend = get_idempotency_backend()
+            stored = await backend.reserve(key, fingerprint, app_settings.idempotency_lock_timeout)
+            replayed = await _replay_or_wait(backend, key, fingerprint, stored)
+            if replayed is not None:
+                return replayed
+            try:
+                response = await route_handler(request)
+            except BaseException:
+                await backend.release(key)
+                raise
+            if response.status_code >= status.HTTP_400_BAD_REQUEST:
+                await backend.release(key)
+                return response
+            headers = {name: value for name, value in response.headers.items() if name != 'content-length'}
+            await backend.save(
+                key,
+                StoredResponse(
+                    fingerprint=fingerprint,
+                    status_code=response.status_code,
+                    headers=headers,
+                    body=response.body,
+                ),
+                app_settings.idempotency_ttl,
+            )
+            return response
+
+        return idempotent_route_handler
@@ -1,21 +1,28 @@
 from sqlalchemy import asc, desc
 
 
+SORT_DIRECTIONS = {
+    'asc': asc,
+    'desc': desc,
+}
+
+
 def prepare_ordering(ordering: tuple) -> list:
     """Преобразуем правило сортировки в вид [asc(Поле 1), desc(Поле 2), ...].
 
     Args:
         ordering (tuple): Правило сортировки.
 
+    Raises:
+        ValueError: Неизвестное направление сортировки.
+
     Returns:
         list: Преобразованное правило сортировки.
     """
-    sort_direction_map = {
-        'asc': asc,
-        'desc': desc,
-    }
     result = []
     for field, sort_direction in ordering:
-        sort_direction_func = sort_direction_map.get(sort_direction)
+        sort_direction_func = SORT_DIRECTIONS.get(sort_direction)
+        if sort_direction_func is None:
+            raise ValueError(f'Unknown sort direction: {sort_direction}')
         result.append(sort_direction_func(field))
     return result
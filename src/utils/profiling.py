@@ -0,0 +1,183 @@
+import asyncio
+import cProfile
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import uuid4
+
+from config import app_settings
+
+from .tracing import current_request_id
+
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MODE_HEADER = 'X-Profile-Mode'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+SAMPLE_MODE = 'sample'
+CPROFILE_MODE = 'cprofile'
+
+# Сколько мест выделения памяти записывать в отчет tracemalloc.
+ALLOCATION_TOP = 50
+# Отчет группируется по строке выделения, поэтому хватает одного кадра: каждый лишний кадр
+# заметно замедляет профилируемый запрос.
+TRACEMALLOC_FRAMES = 1
+
+
+class StackSampler:
+    """Статистический профилировщик потока цикла событий.
+
+    Отдельный поток раз в PROFILING_INTERVAL снимает стек потока цикла событий через
+    sys._current_frames() и считает одинаковые стеки. Результат записывается в формате
+    свернутых стеков (folded), который принимают flamegraph.pl, speedscope и inferno.
+    Поток ждет GIL, поэтому при занятом процессоре стеки снимаются не чаще sys.getswitchinterval().
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_filename}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str):
+        """Записываем свернутые стеки: строка 'кадр;кадр;... количество'."""
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class RequestProfile:
+    """Профилирование одного запроса: стеки или cProfile и статистика выделений памяти."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.profile_id = f'{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{current_request_id() or uuid4().hex}'
+        self._sampler: Optional[StackSampler] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._tracemalloc_started = False
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._tracemalloc_started = True
+        if self.mode == CPROFILE_MODE:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), app_settings.profiling_interval)
+            self._sampler.start()
+        self.started = time.perf_counter()
+
+    def stop(self) -> tracemalloc.Snapshot:
+        self.duration = time.perf_counter() - self.started
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        if self._tracemalloc_started:
+            tracemalloc.stop()
+        return snapshot
+
+    def dump(self, snapshot: tracemalloc.Snapshot, method: str, path: str):
+        """Записываем результаты в PROFILING_DIR.
+
+        Файлы: <id>.folded (режим sample) или <id>.prof (режим cprofile, формат pstats для
+        snakeviz и flameprof) и <id>.alloc.txt с местами, где выделено больше всего памяти.
+        """
+        os.makedirs(app_settings.profiling_dir, exist_ok=True)
+        base = os.path.join(app_settings.profiling_dir, self.profile_id)
+        if self._profiler is not None:
+            self._profiler.dump_stats(f'{base}.prof')
+        if self._sampler is not None:
+            self._sampler.dump(f'{base}.folded')
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        with open(f'{base}.alloc.txt', 'w', encoding='utf-8') as file:
+            file.write(f'{method} {path} {self.duration * 1000:.3f} ms\n')
+            for stat in snapshot.statistics('lineno')[:ALLOCATION_TOP]:
+                file.write(f'{stat}\n')
+
+
+def _profile_mode(scope: dict) -> Optional[str]:
+    """Режим профилирования запроса или None, если запрос не профилируется.
+
+    Запрос профилируется, если в заголовке X-Profile передан PROFILING_TOKEN, или случайно
+    с вероятностью PROFILING_SAMPLE_RATE. Режим выбирается заголовком X-Profile-Mode.
+    """
+    headers = dict(scope['headers'])
+    mode = headers.get(PROFILE_MODE_HEADER.lower().encode(), SAMPLE_MODE.encode()).decode('latin-1')
+    mode = CPROFILE_MODE if mode == CPROFILE_MODE else SAMPLE_MODE
+    token = headers.get(PROFILE_HEADER.lower().encode())
+    if token is not None and app_settings.profiling_token:
+        if hmac.compare_digest(token, app_settings.profiling_token.encode()):
+            return mode
+    if random.random() < app_settings.profiling_sample_rate:
+        return mode
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware профилирования запросов по требованию.
+
+    Подключается в main.py только при PROFILING_ENABLED, поэтому без этой настройки запросы не
+    проходят через него вовсе. Одновременно профилируется не больше одного запроса: cProfile и
+    tracemalloc глобальны для процесса. Профиль снимается со всего цикла событий, поэтому
+    в него попадают и параллельные запросы этого воркера. Идентификатор профиля возвращается
+    в заголовке X-Profile-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or self._lock.locked():
+            await self.app(scope, receive, send)
+            return
+        mode = _profile_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        async with self._lock:
+            profile = RequestProfile(mode)
+            profile_id_header = (PROFILE_ID_HEADER.lower().encode(), profile.profile_id.encode())
+
+            async def send_with_profile_id(message):
+                if message['type'] == 'http.response.start':
+                    message['headers'] = [*message.get('headers', []), profile_id_header]
+                await send(message)
+
+            profile.start()
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                snapshot = profile.stop()
+                await asyncio.to_thread(profile.dump, snapshot, scope['method'], scope['path'])
@@ -0,0 +1,187 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from redis.exceptions import RedisError
+
+from config import app_settings
+from models import User
+
+from .get_current_user import get_current_user
+from .redis_client import get_redis
+
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Лимит в виде ведра токенов."""
+
+    capacity: int
+    rate: float
+
+    @classmethod
+    def parse(cls, value: str) -> 'RateLimit':
+        """Разбираем лимит вида '10/minute'.
+
+        Args:
+            value (str): Лимит.
+
+        Returns:
+            RateLimit: Ведро на value запросов за период.
+        """
+        amount, period = value.split('/')
+        capacity = int(amount)
+        return cls(capacity=capacity, rate=capacity / PERIODS[period.strip()])
+
+
+class TokenBucketBackendABC(ABC):
+    """Интерфейс хранилища ведер токенов."""
+
+    @abstractmethod
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        """Забираем токен из ведра. Возвращаем 0, если токен есть, иначе сколько секунд ждать."""
+        pass
+
+
+class InMemoryTokenBucketBackend(TokenBucketBackendABC):
+    """Ведра токенов в памяти процесса (лимит действует в пределах одного воркера)."""
+
+    def __init__(self, max_keys: int = 100000):
+        """Конструктор хранилища.
+
+        Args:
+            max_keys (int): Сколько ведер держать в памяти, самые старые вытесняются.
+        """
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisTokenBucketBackend(TokenBucketBackendABC):
+    """Ведра токенов в Redis, атомарно обновляемые Lua-скриптом (лимит общий для всех воркеров)."""
+
+    def __init__(self):
+        self._script = None
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        if self._script is None:
+            self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+        try:
+            wait = await self._script(keys=[key], args=[limit.capacity, limit.rate])
+        except RedisError:
+            # Недоступность Redis не должна ронять API: пропускаем запрос.
+            return 0.0
+        return float(wait)
+
+
+_backend: Optional[TokenBucketBackendABC] = None
+
+
+def get_rate_limit_backend() -> TokenBucketBackendABC:
+    """Хранилище ведер токенов, выбранное настройкой RATE_LIMIT_BACKEND."""
+    global _backend
+    if _backend is None:
+        if app_settings.rate_limit_backend == 'redis':
+            _backend = RedisTokenBucketBackend()
+        else:
+            _backend = InMemoryTokenBucketBackend()
+    return _backend
+
+
+async def check_rate_limit(scope: str, identity: str, limit: RateLimit):
+    """Проверяем лимит и отвечаем 429 с заголовком Retry-After при превышении.
+
+    Args:
+        scope (str): Название лимита.
+        identity (str): Идентификатор клиента (IP, id пользователя, логин).
+        limit (RateLimit): Лимит.
+
+    Raises:
+        HTTPException: Лимит превышен.
+    """
+    wait = await get_rate_limit_backend().acquire(f'ratelimit:{scope}:{identity}', limit)
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail='Слишком много запросов',
+            headers={'Retry-After': str(math.ceil(wait))},
+        )
+
+
+def rate_limit(scope: str, default_limit: str, identity: str = 'ip', body_field: Optional[str] = None) -> Callable:
+    """Создаем зависимость, ограничивающую частоту запросов.
+
+    Лимит можно переопределить настройкой RATE_LIMITS, например {"login": "5/minute"}.
+
+    Args:
+        scope (str): Название лимита.
+        default_limit (str): Лимит по умолчанию вида '10/minute'.
+        identity (str): По чему считаем запросы: 'ip', 'user' (текущий пользователь) или 'body' (поле тела).
+        body_field (Optional[str]): Поле тела запроса для identity='body'.
+
+    Returns:
+        Callable: Зависимость FastAPI.
+    """
+    limit = RateLimit.parse(app_settings.rate_limits.get(scope, default_limit))
+
+    if identity == 'user':
+        async def dependency(current_user: User = Depends(get_current_user)):
+            if app_settings.rate_limit_enabled:
+                await check_rate_limit(scope, str(current_user.id), limit)
+    elif identity == 'body':
+        async def dependency(request: Request):
+            if app_settings.rate_limit_enabled:
+                body = await request.json()
+                value = body.get(body_field) if isinstance(body, dict) else None
+                await check_rate_limit(scope, str(value).lower(), limit)
+    else:
+        async def dependency(request: Request):
+            if app_settings.rate_limit_enabled:
+                await check_rate_limit(scope, request.client.host if request.client else '', limit)
+
+    return dependency
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from config import app_settings
+
+
+_redis: Optional[Redis] = None
+_broker_redis: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """Получаем общий для процесса асинхронный клиент Redis.
+
+    Returns:
+        Redis: Клиент Redis (REDIS_CACHE, по умолчанию брокер Celery).
+    """
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(app_settings.redis_cache or app_settings.redis_broker)
+    return _redis
+
+
+def get_broker_redis() -> Redis:
+    """Получаем асинхронный клиент Redis брокера Celery (длины очередей и метрики задач).
+
+    Returns:
+        Redis: Клиент Redis REDIS_BROKER.
+    """
+    global _broker_redis
+    if _broker_redis is None:
+        _broker_redis = Redis.from_url(app_settings.redis_broker)
+    return _broker_redis
+
+
+async def close_redis():
+    """Закрываем клиенты Redis, если они создавались."""
+    global _redis, _broker_redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+    if _broker_redis is not None:
+        await _broker_redis.aclose()
+        _broker_redis = None
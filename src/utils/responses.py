@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+from fastapi import Response, status
+
+import cbor2
+import msgpack
+
+from pydantic_core import to_json
+
+from .tracing import span
+
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+CBOR_MEDIA_TYPE = 'application/cbor'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def json_response(content: Any, status_code: int = status.HTTP_200_OK, headers: Optional[dict] = None) -> Response:
+    """Ответ JSON из уже готовых данных без повторной валидации схемой ответа.
+
+    UUID, даты и вложенные словари сериализуются pydantic-core напрямую.
+
+    Args:
+        content (Any): Данные ответа.
+        status_code (int): Код ответа.
+        headers (Optional[dict]): Заголовки ответа.
+
+    Returns:
+        Response: Ответ.
+    """
+    return Response(content=to_json(content), status_code=status_code, headers=headers, media_type=JSON_MEDIA_TYPE)
+
+
+def _compact_value(value: Any) -> Any:
+    """Компактное представление значений, которых нет в MessagePack и CBOR.
+
+    UUID передается 16 байтами, дата и время - целым числом микросекунд от начала эпохи Unix
+    (даты без часового пояса в БД хранятся в UTC).
+
+    Args:
+        value (Any): Значение.
+
+    Raises:
+        TypeError: Тип значения не поддерживается.
+
+    Returns:
+        Any: Байты или целое число.
+    """
+    if isinstance(value, UUID):
+        return value.bytes
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return (value - EPOCH) // MICROSECOND
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def _compact(content: Any) -> Any:
+    """Заменяем UUID и даты во вложенных словарях и списках компактными значениями."""
+    if isinstance(content, dict):
+        return {key: _compact(value) for key, value in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [_compact(value) for value in content]
+    if isinstance(content, (UUID, datetime)):
+        return _compact_value(content)
+    return content
+
+
+def _encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, default=_compact_value, use_bin_type=True)
+
+
+def _encode_cbor(content: Any) -> bytes:
+    # cbor2 кодирует UUID и даты сам (тегами, даты - строками), поэтому значения заменяются заранее.
+    return cbor2.dumps(_compact(content))
+
+
+def _encode_json(content: Any) -> bytes:
+    return to_json(content)
+
+
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    JSON_MEDIA_TYPE: _encode_json,
+    MSGPACK_MEDIA_TYPE: _encode_msgpack,
+    'application/x-msgpack': _encode_msgpack,
+    CBOR_MEDIA_TYPE: _encode_cbor,
+}
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """Выбираем формат ответа по заголовку Accept.
+
+    Из поддерживаемых форматов выбирается формат с наибольшим q, при равных q - указанный раньше.
+    Без заголовка, для */* и для неподдерживаемых форматов ответ отдается в JSON.
+
+    Args:
+        accept (Optional[str]): Заголовок Accept.
+
+    Returns:
+        str: Тип содержимого ответа.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    best_media_type, best_quality = JSON_MEDIA_TYPE, 0.0
+    for media_range in accept.split(','):
+        media_type, *params = media_range.split(';')
+        media_type = media_type.strip().lower()
+        if media_type not in ENCODERS:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best_media_type, best_quality = media_type, quality
+    return best_media_type
+
+
+def render_response(
+    content: Any,
+    media_type: str = JSON_MEDIA_TYPE,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[dict] = None,
+) -> Response:
+    """Ответ из уже готовых данных в формате, выбранном negotiate_media_type.
+
+    В MessagePack и CBOR UUID передаются 16 байтами, а даты - микросекундами от начала эпохи Unix.
+
+    Args:
+        content (Any): Данные ответа.
+        media_type (str): Тип содержимого ответа.
+        status_code (int): Код ответа.
+        headers (Optional[dict]): Заголовки ответа.
+
+    Returns:
+        Response: Ответ.
+    """
+    headers = {**(headers or {}), 'Vary': 'Accept'}
+    with span('api.serialize', media_type=media_type):
+        body = ENCODERS[media_type](content)
+    return Response(content=body, status_code=status_code, headers=headers, media_type=media_type)
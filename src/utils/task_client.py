@@ -0,0 +1,67 @@
+import time
+from typing import Any, Optional
+
+from config import app_settings
+
+from .tracing import current_request_id, span
+
+
+# Имена задач Celery: API ставит их в очередь по имени, не импортируя модули воркера.
+SEND_EMAIL_TASK = 'tasks.send_email.send_email'
+
+# Очереди Celery: письма с кодами ждет пользователь, поэтому они не стоят за задачами обслуживания.
+EMAIL_QUEUE = 'email'
+MAINTENANCE_QUEUE = 'maintenance'
+TASK_QUEUES = (EMAIL_QUEUE, MAINTENANCE_QUEUE)
+# Задачи, не перечисленные здесь, попадают в MAINTENANCE_QUEUE (очередь по умолчанию).
+TASK_ROUTES = {
+    SEND_EMAIL_TASK: {'queue': EMAIL_QUEUE},
+}
+# Заголовок сообщения со временем постановки задачи в очередь (Unix time) для метрик ожидания.
+SENT_AT_HEADER = 'sent_at'
+
+_client = None
+
+
+def get_task_client():
+    """Получаем легковесный клиент Celery для отправки задач по имени.
+
+    Клиент создается при первой отправке задачи, поэтому процесс API не импортирует Celery
+    при запуске и не строит расписание beat и реестр задач воркера.
+
+    Returns:
+        Celery: Клиент Celery без зарегистрированных задач.
+    """
+    global _client
+    if _client is None:
+        from celery import Celery
+
+        _client = Celery('tasks', broker=app_settings.redis_broker, backend=app_settings.redis_backend)
+        _client.conf.update(task_routes=TASK_ROUTES, task_default_queue=MAINTENANCE_QUEUE)
+    return _client
+
+
+def send_task(name: str, *args: Any, countdown: Optional[int] = None, **kwargs: Any):
+    """Ставим задачу Celery в очередь по имени.
+
+    Очередь выбирается по TASK_ROUTES. Идентификатор текущего HTTP-запроса передается в заголовке
+    request_id сообщения задачи, время постановки - в заголовке sent_at.
+
+    Args:
+        name (str): Полное имя задачи, например SEND_EMAIL_TASK.
+        countdown (Optional[int]): Через сколько секунд выполнить задачу.
+
+    Returns:
+        AsyncResult: Результат задачи.
+    """
+    with span('celery.send_task', task=name):
+        headers = {'request_id': current_request_id(), SENT_AT_HEADER: time.time()}
+        return get_task_client().send_task(name, args=args, kwargs=kwargs, countdown=countdown, headers=headers)
+
+
+def close_task_client():
+    """Закрываем соединения клиента Celery с брокером, если клиент создавался."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+
+# Поля ответов чтения карточек в порядке схем BaseTaskOutputSchema и TaskListOutputSchema.
+TASK_FIELDS = ('id', 'title', 'description', 'status', 'created_at', 'version', 'user')
+
+
+@dataclass(frozen=True)
+class TaskFields:
+    """Поля карточки, запрошенные параметром fields.
+
+    Объекты создаются один раз для каждого набора полей, поэтому ими можно ключевать кэши
+    запросов и схем ответа.
+    """
+
+    names: Tuple[str, ...]
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """Колонки таблицы task, которые нужно прочитать."""
+        return tuple(name for name in self.names if name != 'user')
+
+    @property
+    def include_user(self) -> bool:
+        """В ответ входит владелец карточки."""
+        return 'user' in self.names
+
+    @property
+    def is_all(self) -> bool:
+        """Запрошены все поля (параметр fields не передан)."""
+        return self.names == TASK_FIELDS
+
+    def narrow(self, row: dict) -> dict:
+        """Оставляем в строке карточки только запрошенные поля.
+
+        Args:
+            row (dict): Строка карточки.
+
+        Returns:
+            dict: Строка с запрошенными полями.
+        """
+        return {name: row[name] for name in self.names if name in row}
+
+
+@lru_cache(maxsize=None)
+def _task_fields(names: Tuple[str, ...]) -> TaskFields:
+    return TaskFields(names)
+
+
+ALL_TASK_FIELDS = _task_fields(TASK_FIELDS)
+
+
+def parse_task_fields(value: Optional[str]) -> TaskFields:
+    """Получаем набор полей карточки из параметра запроса.
+
+    Поля упорядочиваются как в схемах ответа, поэтому 'title,id' и 'id,title' дают один объект.
+    Наборов полей не больше 2^7, и для каждого запросы и схема ответа строятся один раз.
+
+    Args:
+        value (Optional[str]): Поля через запятую (None - все поля).
+
+    Raises:
+        HTTPException: Поле не поддерживается или набор полей пуст.
+
+    Returns:
+        TaskFields: Набор полей.
+    """
+    if value is None:
+        return ALL_TASK_FIELDS
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    if not requested or not requested.issubset(TASK_FIELDS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Unsupported fields, allowed: {", ".join(TASK_FIELDS)}'
+        )
+    return _task_fields(tuple(field for field in TASK_FIELDS if field in requested))
+
+
+@lru_cache(maxsize=None)
+def task_fields_schema(schema: Type[BaseModel], fields: TaskFields) -> Type[BaseModel]:
+    """Схема ответа, суженная до запрошенных полей.
+
+    Схема читает из объекта Task только запрошенные атрибуты, поэтому не обращается к колонкам,
+    которые не были загружены.
+
+    Args:
+        schema (Type[BaseModel]): Полная схема ответа.
+        fields (TaskFields): Набор полей.
+
+    Returns:
+        Type[BaseModel]: Схема ответа.
+    """
+    if fields.is_all:
+        return schema
+    return create_model(
+        f'{schema.__name__}[{",".join(fields.names)}]',
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, ...) for name in fields.names},
+    )
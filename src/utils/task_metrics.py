@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+
+from .task_client import TASK_QUEUES
+
+
+METRICS_KEY = 'celery:metrics:{queue}'
+# Счетчики в хэше метрик очереди.
+TASKS_FIELD = 'tasks'
+FAILURES_FIELD = 'failures'
+WAIT_SECONDS_FIELD = 'wait_seconds'
+RUN_SECONDS_FIELD = 'run_seconds'
+LAST_WAIT_SECONDS_FIELD = 'last_wait_seconds'
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4'
+
+
+def queue_wait(sent_at: Optional[float], eta: Optional[str], started: float) -> Optional[float]:
+    """Сколько задача ждала в очереди.
+
+    Для отложенных задач ожидание считается от времени, на которое задача была запланирована.
+
+    Args:
+        sent_at (Optional[float]): Время постановки в очередь (заголовок sent_at, Unix time).
+        eta (Optional[str]): Время запуска отложенной задачи в ISO 8601.
+        started (float): Время начала выполнения (Unix time).
+
+    Returns:
+        Optional[float]: Ожидание в секундах или None, если время постановки неизвестно.
+    """
+    if sent_at is None:
+        return None
+    if eta:
+        eta_time = datetime.fromisoformat(eta)
+        if eta_time.tzinfo is None:
+            eta_time = eta_time.replace(tzinfo=timezone.utc)
+        sent_at = max(sent_at, eta_time.timestamp())
+    return max(started - sent_at, 0.0)
+
+
+def record_task(redis: SyncRedis, queue: str, wait: Optional[float], run: float, failed: bool):
+    """Увеличиваем счетчики очереди после выполнения задачи (вызывается воркером).
+
+    Args:
+        redis (SyncRedis): Клиент Redis брокера.
+        queue (str): Очередь задачи.
+        wait (Optional[float]): Ожидание в очереди в секундах.
+        run (float): Время выполнения в секундах.
+        failed (bool): Задача завершилась ошибкой.
+    """
+    key = METRICS_KEY.format(queue=queue)
+    pipeline = redis.pipeline(transaction=False)
+    pipeline.hincrby(key, TASKS_FIELD, 1)
+    pipeline.hincrbyfloat(key, RUN_SECONDS_FIELD, run)
+    if failed:
+        pipeline.hincrby(key, FAILURES_FIELD, 1)
+    if wait is not None:
+        pipeline.hincrbyfloat(key, WAIT_SECONDS_FIELD, wait)
+        pipeline.hset(key, LAST_WAIT_SECONDS_FIELD, wait)
+    pipeline.execute()
+
+
+def render_task_metrics(depths: Dict[str, int], stats: Dict[str, Dict[str, float]]) -> str:
+    """Метрики очередей в текстовом формате Prometheus.
+
+    Args:
+        depths (Dict[str, int]): Количество задач, ожидающих в каждой очереди.
+        stats (Dict[str, Dict[str, float]]): Счетчики record_task каждой очереди.
+
+    Returns:
+        str: Метрики.
+    """
+    metrics = (
+        ('celery_queue_length', 'gauge', 'Задачи, ожидающие в очереди', None),
+        ('celery_tasks_total', 'counter', 'Выполненные задачи', TASKS_FIELD),
+        ('celery_task_failures_total', 'counter', 'Задачи, завершившиеся ошибкой', FAILURES_FIELD),
+        ('celery_task_wait_seconds_total', 'counter', 'Суммарное ожидание задач в очереди', WAIT_SECONDS_FIELD),
+        ('celery_task_run_seconds_total', 'counter', 'Суммарное время выполнения задач', RUN_SECONDS_FIELD),
+        ('celery_task_last_wait_seconds', 'gauge', 'Ожидание последней задачи в очереди', LAST_WAIT_SECONDS_FIELD),
+    )
+    lines = []
+    for name, kind, description, field in metrics:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for queue in sorted(depths):
+            value = depths[queue] if field is None else stats.get(queue, {}).get(field, 0)
+            lines.append(f'{name}{{queue="{queue}"}} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+
+async def collect_task_metrics(redis: Redis) -> str:
+    """Читаем длины очередей и счетчики задач из Redis брокера.
+
+    Args:
+        redis (Redis): Клиент Redis брокера.
+
+    Returns:
+        str: Метрики в текстовом формате Prometheus.
+    """
+    pipeline = redis.pipeline(transaction=False)
+    for queue in TASK_QUEUES:
+        pipeline.llen(queue)
+        pipeline.hgetall(METRICS_KEY.format(queue=queue))
+    results = await pipeline.execute()
+    depths, stats = {}, {}
+    for index, queue in enumerate(TASK_QUEUES):
+        depths[queue] = results[2 * index]
+        stats[queue] = {field.decode(): float(value) for field, value in results[2 * index + 1].items()}
+    return render_task_metrics(depths, stats)
@@ -0,0 +1,189 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+from pydantic_core import to_jsonable_python
+
+from sqlalchemy import ColumnElement, and_, bindparam, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from models import Task
+
+from .prepare_ordering import prepare_ordering
+
+
+# Поля, по которым разрешена сортировка карточек.
+TASK_ORDERING_FIELDS: Dict[str, InstrumentedAttribute] = {
+    'created_at': Task.created_at,
+    'updated_at': Task.updated_at,
+    'title': Task.title,
+    'status': Task.status,
+}
+
+# Поддерживаемые сортировки. Для каждой есть составной индекс (user_id, поля..., id) в модели Task,
+# обратная сортировка (все направления наоборот) читает тот же индекс в обратном порядке.
+SUPPORTED_TASK_ORDERINGS = (
+    'created_at',
+    'updated_at',
+    'title',
+    'status,created_at',
+    '-status,created_at',
+)
+
+DEFAULT_TASK_ORDERING = 'created_at'
+
+
+@dataclass(frozen=True, eq=False)
+class TaskOrdering:
+    """Сортировка карточек, подготовленная один раз при импорте.
+
+    К полям сортировки добавляется id, поэтому порядок строгий и по нему работает курсорная
+    пагинация: курсор хранит значения полей последней карточки страницы.
+    """
+
+    name: str
+    keys: Tuple[Tuple[str, bool], ...]
+    order_by: Tuple[ColumnElement, ...]
+    after_cursor: ColumnElement
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Поля курсора (поля сортировки и id)."""
+        return tuple(field for field, _ in self.keys)
+
+    def make_cursor(self, item: Any) -> str:
+        """Курсор, указывающий на карточку.
+
+        Args:
+            item (Any): Карточка (объект Task или строка в виде словаря).
+
+        Returns:
+            str: Курсор.
+        """
+        get = item.get if isinstance(item, dict) else lambda field: getattr(item, field)
+        values = [to_jsonable_python(get(field)) for field in self.fields]
+        return urlsafe_b64encode(json.dumps([self.name, values]).encode()).decode().rstrip('=')
+
+    def cursor_params(self, cursor: str) -> dict:
+        """Параметры запроса для страницы после курсора.
+
+        Args:
+            cursor (str): Курсор из заголовка X-Next-Cursor.
+
+        Raises:
+            HTTPException: Курсор поврежден или выдан для другой сортировки.
+
+        Returns:
+            dict: Параметры cursor_0, cursor_1, ...
+        """
+        try:
+            name, values = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if name != self.name or len(values) != len(self.keys):
+                raise ValueError(cursor)
+            return {
+                f'cursor_{index}': _parse_cursor_value(field, value)
+                for index, (field, value) in enumerate(zip(self.fields, values))
+            }
+        except (ValueError, TypeError, BinasciiError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Invalid cursor'
+            )
+
+
+def _parse_cursor_value(field: str, value: Any) -> Any:
+    """Восстанавливаем значение поля из курсора."""
+    python_type = Task.__table__.c[field].type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    if not isinstance(value, python_type):
+        raise TypeError(value)
+    return value
+
+
+def _column(field: str) -> InstrumentedAttribute:
+    return Task.id if field == 'id' else TASK_ORDERING_FIELDS[field]
+
+
+def _after_cursor(keys: Tuple[Tuple[str, bool], ...]) -> ColumnElement:
+    """Условие "после курсора" для сортировки.
+
+    При одинаковом направлении всех полей это сравнение кортежей, которое целиком становится
+    условием индекса. При разных направлениях оно раскрывается в (a > x) OR (a = x AND b > y) ...
+    """
+    columns = [_column(field) for field, _ in keys]
+    params = [bindparam(f'cursor_{index}', type_=column.type) for index, column in enumerate(columns)]
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        if directions.pop():
+            return tuple_(*columns) < tuple_(*params)
+        return tuple_(*columns) > tuple_(*params)
+    conditions = []
+    for index, (column, param, (_, descending)) in enumerate(zip(columns, params, keys)):
+        equal = [columns[prev] == params[prev] for prev in range(index)]
+        conditions.append(and_(*equal, column < param if descending else column > param))
+    return or_(*conditions)
+
+
+def _build_ordering(keys: Tuple[Tuple[str, bool], ...]) -> TaskOrdering:
+    keys = (*keys, ('id', keys[-1][1]))
+    name = ','.join(f'-{field}' if descending else field for field, descending in keys[:-1])
+    return TaskOrdering(
+        name=name,
+        keys=keys,
+        order_by=tuple(prepare_ordering(
+            tuple((_column(field), 'desc' if descending else 'asc') for field, descending in keys)
+        )),
+        after_cursor=_after_cursor(keys),
+    )
+
+
+def _parse_keys(value: str) -> Tuple[Tuple[str, bool], ...]:
+    """Разбираем строку сортировки вида '-status,created_at' в ((поле, по убыванию), ...)."""
+    return tuple((field.strip().lstrip('-'), field.strip().startswith('-')) for field in value.split(','))
+
+
+def _build_task_orderings() -> Dict[str, TaskOrdering]:
+    orderings = {}
+    for value in SUPPORTED_TASK_ORDERINGS:
+        keys = _parse_keys(value)
+        for variant in (keys, tuple((field, not descending) for field, descending in keys)):
+            ordering = _build_ordering(variant)
+            orderings[ordering.name] = ordering
+    return orderings
+
+
+TASK_ORDERINGS: Dict[str, TaskOrdering] = _build_task_orderings()
+
+
+def parse_task_ordering(value: Optional[str]) -> TaskOrdering:
+    """Получаем подготовленную сортировку карточек из параметра запроса.
+
+    Args:
+        value (Optional[str]): Сортировка вида '-status,created_at' (минус - по убыванию).
+
+    Raises:
+        HTTPException: Сортировка не поддерживается.
+
+    Returns:
+        TaskOrdering: Сортировка.
+    """
+    if not value:
+        return TASK_ORDERINGS[DEFAULT_TASK_ORDERING]
+    keys = _parse_keys(value)
+    name = ','.join(f'-{field}' if descending else field for field, descending in keys)
+    ordering = TASK_ORDERINGS.get(name)
+    if ordering is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Unsupported ordering, allowed: {", ".join(TASK_ORDERINGS)}'
+        )
+    return ordering
@@ -0,0 +1,289 @@
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from inspect import iscoroutinefunction
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+from pydantic_core import to_json
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import app_settings
+
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Идентификатор запроса от клиента или прокси принимается, только если он похож на идентификатор.
+REQUEST_ID_PATTERN = re.compile(r'[\w.:-]{1,128}')
+# Длина SQL в записи трассировки. Параметры запросов не записываются: в них бывают пароли и коды.
+STATEMENT_MAX_LENGTH = 1000
+
+
+@dataclass
+class Span:
+    """Интервал трассировки: вызов слоя, запрос к БД, сериализация ответа."""
+
+    name: str
+    started: float
+    parent: Optional[int]
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration: Optional[float] = None
+
+
+@dataclass
+class Trace:
+    """Трассировка одного HTTP-запроса."""
+
+    request_id: str
+    sampled: bool
+    started: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar('current_span', default=None)
+
+
+class TraceSink:
+    """Локальный JSONL-файл с ротацией для трассировок и медленных запросов.
+
+    Запись в файл выполняет отдельный поток QueueListener, поэтому цикл событий не ждет диск.
+    Каждый процесс пишет в свой файл (в имени TRACE_FILE можно указать {pid}), чтобы воркеры
+    не ротировали один файл одновременно.
+    """
+
+    def __init__(self):
+        self._logger: Optional[logging.Logger] = None
+        self._listener: Optional[QueueListener] = None
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            path = app_settings.trace_file.format(pid=os.getpid())
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=app_settings.trace_file_max_bytes,
+                backupCount=app_settings.trace_file_backups,
+                encoding='utf-8',
+            )
+            queue = SimpleQueue()
+            self._listener = QueueListener(queue, handler)
+            self._listener.start()
+            logger = logging.getLogger(f'{__name__}.sink')
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(QueueHandler(queue))
+            self._logger = logger
+        return self._logger
+
+    def write(self, record: dict):
+        """Записываем одну строку JSON.
+
+        Args:
+            record (dict): Запись трассировки.
+        """
+        self._get_logger().info(to_json(record).decode())
+
+    def close(self):
+        """Дописываем очередь и закрываем файл."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._logger.handlers.clear()
+            self._listener = None
+            self._logger = None
+
+
+trace_sink = TraceSink()
+
+
+def current_request_id() -> Optional[str]:
+    """Идентификатор текущего HTTP-запроса (None вне запроса)."""
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+
+def _add_span(name: str, started: float, attributes: Dict[str, Any]) -> Optional[Span]:
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    record = Span(name=name, started=started, parent=_current_span.get(), attributes=attributes)
+    trace.spans.append(record)
+    return record
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Интервал трассировки текущего запроса. Вне запроса ничего не записывается.
+
+    Args:
+        name (str): Имя интервала, например service.TaskService.get_all_by_user.
+        **attributes (Any): Атрибуты интервала.
+
+    Yields:
+        Optional[Span]: Интервал (None вне запроса).
+    """
+    record = _add_span(name, time.perf_counter(), attributes)
+    if record is None:
+        yield None
+        return
+    token = _current_span.set(len(_current_trace.get().spans) - 1)
+    try:
+        yield record
+    finally:
+        record.duration = time.perf_counter() - record.started
+        _current_span.reset(token)
+
+
+def traced(name: str) -> Callable:
+    """Декоратор асинхронной функции, записывающий ее вызов интервалом трассировки.
+
+    Args:
+        name (str): Имя интервала.
+
+    Returns:
+        Callable: Декоратор.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(layer: str) -> Callable[[type], type]:
+    """Декоратор класса, трассирующий его публичные асинхронные методы.
+
+    Интервалы называются <layer>.<Класс>.<метод>, например repository.TaskRepository.get_stats.
+
+    Args:
+        layer (str): Слой приложения (service, repository).
+
+    Returns:
+        Callable[[type], type]: Декоратор класса.
+    """
+    def decorator(cls: type) -> type:
+        for name, method in list(vars(cls).items()):
+            if not name.startswith('_') and iscoroutinefunction(method):
+                setattr(cls, name, traced(f'{layer}.{cls.__name__}.{name}')(method))
+        return cls
+    return decorator
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.trace_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = context.trace_query_started
+    duration = time.perf_counter() - started
+    statement = statement[:STATEMENT_MAX_LENGTH]
+    record = _add_span('db.query', started, {'statement': statement})
+    if record is not None:
+        record.duration = duration
+    if duration * 1000 >= app_settings.trace_slow_query_ms:
+        trace_sink.write({
+            'type': 'slow_query',
+            'request_id': current_request_id(),
+            'duration_ms': _ms(duration),
+            'statement': statement,
+        })
+
+
+def instrument_engine(db_engine: AsyncEngine):
+    """Трассируем запросы движка через события курсора SQLAlchemy.
+
+    Каждый запрос становится интервалом db.query текущего HTTP-запроса, а запросы дольше
+    TRACE_SLOW_QUERY_MS записываются в журнал отдельно.
+
+    Args:
+        db_engine (AsyncEngine): Движок БД.
+    """
+    if not app_settings.trace_enabled:
+        return
+    sync_engine = db_engine.sync_engine
+    if not event.contains(sync_engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _trace_record(trace: Trace, scope: dict, status_code: int, duration: float) -> dict:
+    return {
+        'type': 'request',
+        'request_id': trace.request_id,
+        'method': scope['method'],
+        'path': scope['path'],
+        'status': status_code,
+        'duration_ms': _ms(duration),
+        'sampled': trace.sampled,
+        'spans': [
+            {
+                'name': record.name,
+                'parent': record.parent,
+                'start_ms': _ms(record.started - trace.started),
+                'duration_ms': _ms(record.duration) if record.duration is not None else None,
+                **({'attributes': record.attributes} if record.attributes else {}),
+            }
+            for record in trace.spans
+        ],
+    }
+
+
+class TracingMiddleware:
+    """ASGI-middleware трассировки запросов.
+
+    Присваивает запросу идентификатор (заголовок X-Request-ID клиента или новый), возвращает его
+    в ответе и собирает интервалы слоев api, services, repository и запросов к БД. В журнал
+    попадает доля TRACE_SAMPLE_RATE запросов и все запросы дольше TRACE_SLOW_REQUEST_MS
+    (кроме потоков Server-Sent Events, которые открыты долго по природе).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not app_settings.trace_enabled:
+            await self.app(scope, receive, send)
+            return
+        request_id = dict(scope['headers']).get(REQUEST_ID_HEADER.lower().encode(), b'').decode('latin-1')
+        if not REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid4().hex
+        trace = Trace(request_id=request_id, sampled=random.random() < app_settings.trace_sample_rate)
+        response = {'status': 500, 'streaming': False}
+
+        async def send_with_request_id(message):
+            if message['type'] == 'http.response.start':
+                headers = message.setdefault('headers', [])
+                response['status'] = message['status']
+                response['streaming'] = any(
+                    name == b'content-type' and value.startswith(b'text/event-stream') for name, value in headers
+                )
+                message['headers'] = [*headers, (REQUEST_ID_HEADER.lower().encode(), request_id.encode())]
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _current_trace.reset(token)
+            duration = time.perf_counter() - trace.started
+            slow = not response['streaming'] and duration * 1000 >= app_settings.trace_slow_request_ms
+            if trace.sampled or slow:
+                trace_sink.write(_trace_record(trace, scope, response['status'], duration))
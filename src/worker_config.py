@@ -1,13 +1,39 @@
+import logging
+import time
+from typing import Dict
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import before_task_publish, task_postrun, task_prerun
+
+from kombu import Queue
+
+from redis import Redis
 
 from config import app_settings
+from utils.task_client import MAINTENANCE_QUEUE, SENT_AT_HEADER, TASK_QUEUES, TASK_ROUTES
+from utils.task_metrics import queue_wait, record_task
+
+
+logger = logging.getLogger(__name__)
 
 CELERY_BEAT_SCHEDULE = {
     'delete-old-users-every-hour': {
         'task': 'tasks.delete_unregistered_users.delete_unregistered_users',
         'schedule': crontab(minute=0, hour='*/1'),
     },
+    'manage-task-partitions-every-day': {
+        'task': 'tasks.manage_task_partitions.manage_task_partitions',
+        'schedule': crontab(minute=30, hour=3),
+    },
+    'reconcile-task-stats-every-hour': {
+        'task': 'tasks.reconcile_task_stats.reconcile_task_stats',
+        'schedule': crontab(minute=15, hour='*/1'),
+    },
+    'rollup-task-activity-every-5-minutes': {
+        'task': 'tasks.rollup_task_activity.rollup_task_activity',
+        'schedule': crontab(minute='*/5'),
+    },
 }
 
 celery_app = Celery(
@@ -19,6 +45,64 @@ celery_app.conf.update(
     timezone='UTC',
     enable_utc=True,
     beat_schedule=CELERY_BEAT_SCHEDULE,
+    task_queues=[Queue(queue) for queue in TASK_QUEUES],
+    task_routes=TASK_ROUTES,
+    task_default_queue=MAINTENANCE_QUEUE,
+    # Воркер берет следующую задачу, только закончив текущую: долгая задача обслуживания не держит
+    # за собой уже полученные письма, а свободные воркеры очереди забирают их сразу.
+    worker_prefetch_multiplier=1,
+    # Сообщение подтверждается после выполнения, и задача упавшего воркера выполняется повторно.
+    # Все задачи идемпотентны, кроме письма: его повтор после падения лучше потерянного кода.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
 )
 
+_metrics_redis = None
+_task_started: Dict[str, float] = {}
+
+
+@task_prerun.connect
+def log_request_id(task_id=None, task=None, **kwargs):
+    """Связываем выполнение задачи с HTTP-запросом API, поставившим ее в очередь.
+
+    API передает X-Request-ID запроса в заголовке request_id сообщения задачи, по нему задачу
+    можно найти рядом с трассировкой запроса.
+    """
+    request_id = task.request.get('request_id')
+    if request_id:
+        logger.info('Задача %s[%s] поставлена запросом %s', task.name, task_id, request_id)
+
+
+@before_task_publish.connect
+def add_sent_at(headers=None, **kwargs):
+    """Отмечаем время постановки задач beat в очередь (API передает его сам)."""
+    if headers is not None:
+        headers.setdefault(SENT_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.time()
+
+
+@task_postrun.connect
+def record_task_metrics(task_id=None, task=None, state=None, **kwargs):
+    """Записываем ожидание в очереди и время выполнения задачи в Redis брокера.
+
+    Метрики отдает API в GET /metrics, по длине очереди и ожиданию масштабируются воркеры очереди.
+    """
+    global _metrics_redis
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    queue = (task.request.delivery_info or {}).get('routing_key') or MAINTENANCE_QUEUE
+    wait = queue_wait(task.request.get(SENT_AT_HEADER), task.request.eta, started)
+    try:
+        if _metrics_redis is None:
+            _metrics_redis = Redis.from_url(app_settings.redis_broker)
+        record_task(_metrics_redis, queue, wait, time.time() - started, failed=state == 'FAILURE')
+    except Exception:
+        logger.warning('Не удалось записать метрики задачи %s[%s]', task.name, task_id, exc_info=True)
+
+
 import tasks  # noqa: F401, E402